@@ -0,0 +1,48 @@
+import contextlib
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(app_path: str, port: int = None, ready_path: str = "/", timeout: float = 20.0):
+    """
+    Run ``uvicorn <app_path>`` in a subprocess on localhost and yield its base URL.
+    Run benchmarks from the ``backend/`` directory so both ``benchmarks`` and
+    ``py_app_service`` are importable.
+    """
+    with serve_process(app_path, port, ready_path, timeout) as (base_url, _):
+        yield base_url
+
+
+@contextlib.contextmanager
+def serve_process(app_path: str, port: int = None, ready_path: str = "/", timeout: float = 20.0):
+    """Like ``serve``, but yields ``(base_url, process)``, e.g. to watch the server's memory."""
+    port = port or free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                httpx.get(base_url + ready_path, timeout=1.0)
+                break
+            except httpx.HTTPError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{app_path} did not start on port {port}")
+                time.sleep(0.1)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
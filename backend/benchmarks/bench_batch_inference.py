@@ -0,0 +1,36 @@
+"""
+CPU throughput of ``predict_solar_panel_batch`` for different batch sizes.
+
+    cd backend && python -m benchmarks.bench_batch_inference --images 32 --batch-sizes 1,2,4,8,16
+
+Needs ultralytics and ``services/best.pt``.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import solar_farm_image
+from py_app_service.services import compvis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    args = parser.parse_args()
+
+    images = [solar_farm_image(args.width, args.height, seed=i) for i in range(args.images)]
+    # Warm up: model load and first-call allocations
+    compvis.predict_solar_panel_batch(images[:1], batch_size=1)
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        started = time.perf_counter()
+        outputs = compvis.predict_solar_panel_batch(images, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        assert len(outputs) == len(images)
+        print(f"batch_size={batch_size:3d}   {len(images) / elapsed:7.2f} images/s   {elapsed * 1000 / len(images):8.2f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Time to load many projects through ``POST /projects/bulk`` against one
+``POST /projects`` per project, and a check that re-running the import
+(by externalId, or by Idempotency-Key for items without one, reordered)
+creates no duplicates, that a JSON array body imports too, that PATCH
+writes the same record shape as create, and that the seed script runs.
+
+    cd backend && python -m benchmarks.bench_bulk_import --projects 50000 --write-latency 0.1
+
+Runs against the stub PocketBase, whose creates take ``--write-latency``
+seconds like a round trip to the hosted one; the projects router runs
+in-process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks._server import serve
+from py_app_service.config import POCKETBASE_PROJECTS_COLLECTION as COLLECTION
+from py_app_service.database.pocketbase import close_pocketbase, init_pocketbase
+from py_app_service.routers import projects
+from py_app_service.scripts.seed_projects import projects_data, seed_projects
+
+
+def _project(i: int) -> dict:
+    return {**projects_data[i % len(projects_data)], "title": f"Bulk Project {i}"}
+
+
+def _ndjson(items: list) -> bytes:
+    return b"".join(json.dumps(item).encode() + b"\n" for item in items)
+
+
+async def _bulk(client: httpx.AsyncClient, items: list, headers: dict = None) -> tuple:
+    started = time.perf_counter()
+    resp = await client.post(
+        "/projects/bulk", content=_ndjson(items), headers={"Content-Type": "application/x-ndjson", **(headers or {})}
+    )
+    elapsed = time.perf_counter() - started
+    assert resp.status_code == 200, resp.text
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[-1]["done"], lines[-1]
+    return elapsed, lines[:-1], lines[-1]["counts"]
+
+
+async def _stub_count(stub: httpx.AsyncClient) -> int:
+    return (await stub.get(f"/api/collections/{COLLECTION}/records", params={"perPage": 1})).json()["totalItems"]
+
+
+async def run(base_url: str, n_projects: int, sequential: int):
+    await init_pocketbase(base_url=base_url)
+    app = FastAPI()
+    app.include_router(projects.router)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client, \
+                httpx.AsyncClient(base_url=base_url) as stub:
+            before = await _stub_count(stub)
+
+            # Baseline: one POST /projects per project, as the seed script did
+            started = time.perf_counter()
+            for i in range(sequential):
+                assert (await client.post("/projects", json=_project(i))).status_code == 200
+            per_project = (time.perf_counter() - started) / sequential
+            print(
+                f"POST /projects x{sequential:<6d} {per_project * sequential:8.1f} s"
+                f"   -> {n_projects} projects ~ {per_project * n_projects / 60:7.1f} min"
+            )
+
+            items = [{**_project(i), "externalId": f"bench-{i}"} for i in range(n_projects)]
+            items[7] = {"title": "missing everything"}
+            elapsed, results, counts = await _bulk(client, items)
+            print(f"POST /projects/bulk x{n_projects:<6d} {elapsed:8.1f} s   {counts}")
+            assert counts["created"] == n_projects - 1 and results[7]["status"] == "invalid", counts
+
+            # Retried run: nothing new, and only a lookup per batch upstream
+            await stub.post("/stats/reset")
+            elapsed, results, counts = await _bulk(client, items)
+            creates = (await stub.get("/stats")).json()["creates"]
+            print(f"retry (externalId)       {elapsed:8.1f} s   {counts}, {creates} creates upstream")
+            assert counts["exists"] == n_projects - 1 and creates == 0, counts
+
+            # Items without externalId: idempotent per Idempotency-Key and content, even
+            # when the retry reorders or leaves out items; the repeated item is a second project
+            plain = [_project(i) for i in range(50)] + [_project(0)]
+            _, first, counts = await _bulk(client, plain, {"Idempotency-Key": "bench-run"})
+            assert counts["created"] == 51, counts
+            retry = list(reversed(plain))[::2]
+            _, second, counts = await _bulk(client, retry, {"Idempotency-Key": "bench-run"})
+            ids = {r["id"] for r in first}
+            assert counts["exists"] == len(retry) and all(r["id"] in ids for r in second), counts
+            print(f"retry (Idempotency-Key)  reordered, {len(retry)} of {len(plain)} items: {counts}")
+
+            # A JSON array body is parsed item by item too
+            resp = await client.post("/projects/bulk", json=[{**_project(i), "externalId": f"array-{i}"} for i in range(20)])
+            lines = [json.loads(line) for line in resp.text.splitlines()]
+            assert lines[-1]["counts"]["created"] == 20, lines[-1]
+
+            # PATCH writes the same record shape as create
+            record_id = first[0]["id"]
+            resp = await client.patch(f"/projects/{record_id}", json={**_project(0), "title": "Patched"})
+            assert resp.status_code == 200 and resp.json()["title"] == "Patched", resp.text
+            stored = (await stub.get(f"/api/collections/{COLLECTION}/records/{record_id}")).json()
+            assert stored["location"]["lat"] == _project(0)["location"]["latitude"] and "sdgs" not in stored, stored
+
+            # The seed script streams through the same endpoint; a second run finds everything
+            counts = await seed_projects(projects_data, "http://app", transport=transport)
+            assert counts["created"] == len(projects_data), counts
+            counts = await seed_projects(projects_data, "http://app", transport=transport)
+            assert counts["exists"] == len(projects_data), counts
+            print(f"seed script: {len(projects_data)} projects, re-run {counts}")
+
+            total = await _stub_count(stub)
+            assert total == before + sequential + (n_projects - 1) + 51 + 20 + len(projects_data), "duplicates were created"
+            print(f"no duplicates: {total} records in the stub")
+    finally:
+        await close_pocketbase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--sequential", type=int, default=50, help="projects created one at a time for the baseline")
+    parser.add_argument("--write-latency", type=float, default=0.1, help="seconds the stub takes per create")
+    args = parser.parse_args()
+
+    os.environ["STUB_POCKETBASE_WRITE_LATENCY"] = str(args.write_latency)
+    os.environ["STUB_POCKETBASE_PROJECTS"] = "0"
+    with serve("benchmarks.stub_pocketbase:app") as base_url:
+        asyncio.run(run(base_url, args.projects, args.sequential))
+
+
+if __name__ == "__main__":
+    main()
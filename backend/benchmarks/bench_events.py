@@ -0,0 +1,184 @@
+"""
+Holds many idle ``GET /events`` streams open and measures how long published
+events take to reach subscribers, against the delay of polling. Also checks
+drop-oldest on a slow consumer, heartbeats, and resuming with Last-Event-ID
+(missed events replayed, expired history answered with ``resync``),
+and that connects past EVENTS_MAX_SUBSCRIBERS get a 503.
+
+    cd backend && python -m benchmarks.bench_events --connections 2000 --events 200
+
+The events router runs on uvicorn inside this process, so the benchmark can
+publish to the same hub the streams read from.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from benchmarks._server import free_port
+from py_app_service.routers import events
+from py_app_service.services.events import HEARTBEAT, EventHub, event_hub
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def _listen(client: httpx.AsyncClient, topics: str, received: list, opened: asyncio.Event, headers=None):
+    """Read one stream, appending ``(arrival time, event, data)`` per event."""
+    async with client.stream("GET", "/events", params={"topics": topics}, headers=headers or {}) as resp:
+        assert resp.status_code == 200, resp.status_code
+        opened.set()
+        event = None
+        async for line in resp.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                received.append((time.perf_counter(), event, json.loads(line[6:])))
+
+
+async def _open(client: httpx.AsyncClient, topics: str, received: list, headers=None) -> asyncio.Task:
+    opened = asyncio.Event()
+    task = asyncio.create_task(_listen(client, topics, received, opened, headers))
+    await opened.wait()
+    return task
+
+
+async def _try_open(client: httpx.AsyncClient, statuses: list):
+    """Connect, record the status, and hold the stream open if it was accepted."""
+    async with client.stream("GET", "/events", params={"topics": "ledger"}) as resp:
+        statuses.append(resp.status_code)
+        if resp.status_code == 200:
+            await asyncio.Event().wait()
+
+
+async def _wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for events"
+        await asyncio.sleep(0.005)
+
+
+def _ms(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return f"p50 {statistics.median(latencies) * 1000:6.2f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms"
+
+
+async def run(n_connections: int, n_events: int, fanout: int, poll_interval: float):
+    app = FastAPI()
+    app.include_router(events.router)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    limits = httpx.Limits(max_connections=n_connections + fanout + 10, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None) as client:
+        tasks = []
+        try:
+            # Idle streams, one project each, as the training pages would hold
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            idle = [[] for _ in range(n_connections)]
+            for start in range(0, n_connections, 200):
+                tasks += await asyncio.gather(*(
+                    _open(client, f"training:p{i}", idle[i]) for i in range(start, min(start + 200, n_connections))
+                ))
+            print(
+                f"{n_connections} idle streams open   {time.perf_counter() - started:6.2f} s, "
+                f"{event_hub.subscribers} subscribers, ~{(_rss_mb() - rss_before) * 1024 / n_connections:.1f} KB each "
+                f"(client and server)"
+            )
+
+            # One project's job finishing: only its own stream hears about it
+            latencies = []
+            for i in range(0, n_connections, max(n_connections // n_events, 1))[:n_events]:
+                sent = time.perf_counter()
+                event_hub.publish(f"training:p{i}", "job", {"recordId": f"p{i}", "status": "succeeded"})
+                await _wait_for(lambda: idle[i])
+                latencies.append(idle[i][-1][0] - sent)
+            print(f"training:{{id}} to 1 of {n_connections} streams   {_ms(latencies)}")
+            assert sum(len(received) for received in idle) == len(latencies), "an event reached the wrong stream"
+
+            # Ledger events fanned out to every dashboard
+            dashboards = [[] for _ in range(fanout)]
+            tasks += await asyncio.gather(*(_open(client, "ledger", dashboards[i]) for i in range(fanout)))
+            latencies = []
+            for n in range(1, n_events + 1):
+                sent = time.perf_counter()
+                event_hub.publish("ledger", "transfer", {"id": str(n)})
+                await _wait_for(lambda: all(len(received) >= n for received in dashboards))
+                latencies.extend(received[n - 1][0] - sent for received in dashboards)
+            print(f"ledger to {fanout} streams            {_ms(latencies)}  (per stream)")
+            print(f"polling every {poll_interval:.0f} s                  ~{poll_interval * 500:.0f} ms average delay, "
+                  f"{(n_connections + fanout) / poll_interval:.0f} requests/s for these clients")
+
+            # Resume: a reconnect with Last-Event-ID gets exactly what it missed
+            last_id = event_hub.last_id
+            for n in range(5):
+                event_hub.publish("ledger", "transfer", {"id": f"missed-{n}"})
+            resumed = []
+            tasks.append(await _open(client, "ledger", resumed, {"Last-Event-ID": str(last_id)}))
+            await _wait_for(lambda: len(resumed) >= 5)
+            assert [data["id"] for _, _, data in resumed] == [f"missed-{n}" for n in range(5)], resumed
+            expired = []
+            tasks.append(await _open(client, "ledger", expired, {"Last-Event-ID": "1"}))
+            await _wait_for(lambda: expired)
+            assert expired[0][1] == "resync", expired
+            print("Last-Event-ID resume replays missed events; an expired id gets resync")
+
+            # A full hub: concurrent connects past the limit get 503, not a broken 200 stream
+            max_subscribers = event_hub.max_subscribers
+            event_hub.max_subscribers = event_hub.subscribers + 5
+            statuses = []
+            attempts = [asyncio.create_task(_try_open(client, statuses)) for _ in range(20)]
+            tasks += attempts
+            await _wait_for(lambda: len(statuses) == 20)
+            event_hub.max_subscribers = max_subscribers
+            assert sorted(statuses) == [200] * 5 + [503] * 15, statuses
+            print("full hub: 5 of 20 concurrent connects accepted, the rest answered 503")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    await _wait_for(lambda: event_hub.subscribers == 0)
+    server.should_exit = True
+    await serving
+
+    # A consumer that stops reading keeps only the newest frames, then hears what it lost
+    hub = EventHub(buffer_size=64)
+    slow = hub.subscribe(["ledger"])
+    for n in range(1000):
+        hub.publish("ledger", "transfer", {"id": n})
+    frames = slow.frames(heartbeat=0.05)
+    first = await frames.__anext__()
+    assert first.startswith(b"event: dropped") and b'"count":936' in first, first
+    kept = [await frames.__anext__() for _ in range(64)]
+    assert b'"id":936' in kept[0] and b'"id":999' in kept[-1], kept[0]
+    assert await frames.__anext__() == HEARTBEAT
+    print("slow consumer: 936 oldest of 1000 dropped and reported, newest 64 kept; heartbeat when idle")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=2000, help="idle training:{id} streams")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=100, help="streams following the ledger topic")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="seconds between polls, for comparison")
+    args = parser.parse_args()
+    asyncio.run(run(args.connections, args.events, args.fanout, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Latency of ``GET /projects/near`` and ``GET /projects/bbox`` (in-memory geo
+index, ``services/geo.py``) with many projects, checked against a brute-force
+scan of every project.
+
+    cd backend && python -m benchmarks.bench_geo_search --projects 50000 --queries 200
+
+The index loads from the stub PocketBase; queries go through the projects
+router in-process, response validation included.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks._server import serve
+from py_app_service.database.pocketbase import close_pocketbase, init_pocketbase
+from py_app_service.routers import projects
+from py_app_service.services.geo import haversine_km, project_geo_index
+from py_app_service.services.project_feed import project_feed
+
+
+def _brute_near(records: list, lat: float, lon: float, radius_km: float) -> list:
+    found = []
+    for record in records:
+        distance = haversine_km(lat, lon, record["location"]["lat"], record["location"]["lon"])
+        if distance <= radius_km:
+            found.append(record["id"])
+    return sorted(found)
+
+
+def _brute_box(records: list, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list:
+    def in_lon(lon):
+        return (lon >= min_lon or lon <= max_lon) if min_lon > max_lon else min_lon <= lon <= max_lon
+
+    return sorted(
+        r["id"] for r in records if min_lat <= r["location"]["lat"] <= max_lat and in_lon(r["location"]["lon"])
+    )
+
+
+async def _time(client: httpx.AsyncClient, path: str, params_list: list) -> tuple:
+    latencies = []
+    for params in params_list:
+        started = time.perf_counter()
+        resp = await client.get(path, params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code == 200, resp.text
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def run(base_url: str, queries: int, radius_km: float):
+    await init_pocketbase(base_url=base_url)
+    app = FastAPI()
+    app.include_router(projects.router)
+    try:
+        started = time.perf_counter()
+        await project_geo_index.ensure_loaded()
+        print(f"loaded {len(project_geo_index)} projects in {(time.perf_counter() - started) * 1000:.0f} ms")
+        records = list(project_geo_index.records.values())
+
+        rng = random.Random(1)
+        near = [
+            {"lat": rng.uniform(-9, 3), "lon": rng.uniform(96, 118), "radius_km": radius_km, "perPage": 50}
+            for _ in range(queries)
+        ]
+        boxes = []
+        for _ in range(queries):
+            lat, lon = rng.uniform(-9, 3), rng.uniform(96, 118)
+            boxes.append({"min_lat": lat, "min_lon": lon, "max_lat": lat + 1, "max_lon": lon + 1.5, "perPage": 50})
+
+        # Same answers as scanning every project, including across the antimeridian
+        for params in near[:20]:
+            _, found = project_geo_index.near(params["lat"], params["lon"], radius_km)
+            assert sorted(r["id"] for _, r in found) == _brute_near(records, params["lat"], params["lon"], radius_km)
+        for box in boxes[:20] + [{"min_lat": -10, "min_lon": 170, "max_lat": 10, "max_lon": -170}]:
+            _, found = project_geo_index.within_box(box["min_lat"], box["min_lon"], box["max_lat"], box["max_lon"], 0, 0)
+            assert sorted(r["id"] for _, r in found) == _brute_box(
+                records, box["min_lat"], box["min_lon"], box["max_lat"], box["max_lon"]
+            )
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+            for name, path, params_list in (("near", "/projects/near", near), ("bbox", "/projects/bbox", boxes)):
+                p50, p99 = await _time(client, path, params_list)
+                print(f"{name:6s} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+    finally:
+        await project_feed.stop()
+        await close_pocketbase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=50.0)
+    args = parser.parse_args()
+
+    os.environ["STUB_POCKETBASE_PROJECTS"] = str(args.projects)
+    with serve("benchmarks.stub_pocketbase:app", timeout=120.0) as base_url:
+        asyncio.run(run(base_url, args.queries, args.radius_km))
+
+
+if __name__ == "__main__":
+    main()
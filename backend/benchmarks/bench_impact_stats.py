@@ -0,0 +1,154 @@
+"""
+``GET /projects/stats`` over a synthetic portfolio: building the columnar
+impact store (``services/impact.py``), recomputing stats after a write, cached
+reads through the router, and the per-request rescan of every project it
+replaces. Results are checked against that rescan, including after updates
+and deletes.
+
+    cd backend && python -m benchmarks.bench_impact_stats --projects 100000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from py_app_service.routers import projects
+from py_app_service.services.impact import GROUP_FIELDS, METRICS, ImpactStore, _number
+from py_app_service.services.project_feed import ProjectFeed
+from py_app_service.services import impact
+
+PERCENTILES = (50, 90, 99)
+TYPES = ["Renewable Energy", "Education Tech", "Agriculture", "Water", "Healthcare", "Housing"]
+MAQASID = ["DIN", "NAFS", "AQL", "NASL", "MAL"]
+
+
+def make_project(rng: random.Random, i: int) -> dict:
+    metrics = {
+        "co2Yearly": rng.lognormvariate(3, 1), "energyMWh": rng.lognormvariate(4, 1), "trees": rng.randint(0, 5000),
+        "jobs": {"construction": rng.uniform(0, 200), "ops": rng.uniform(0, 40)},
+        "sroi": rng.uniform(0.5, 8), "irr": rng.uniform(-5, 25), "multiplier": rng.uniform(1, 6),
+    }
+    if rng.random() < 0.05:
+        del metrics["irr"]  # Not every project reports every metric
+    return {
+        "id": f"p{i:09d}",
+        "updated": f"2026-01-01 00:00:00.{i % 1000:03d}Z",
+        "type": rng.choice(TYPES),
+        "sgds": [str(s) for s in rng.sample(range(1, 18), rng.randint(1, 4))],
+        "maqasid": rng.sample(MAQASID, rng.randint(1, 3)),
+        "quickMetrics": {"needed": rng.uniform(1e6, 5e9), "beneficiaries": rng.randint(10, 100_000)},
+        "metrics": metrics,
+    }
+
+
+def rescan(records: list, group_by: str = None) -> dict:
+    """What a dashboard does today: walk every project and aggregate it."""
+    def summarize(subset):
+        columns = np.array([[_number(r, path) for path in METRICS.values()] for r in subset])
+        out = {"projects": len(subset), "metrics": {}}
+        for i, name in enumerate(METRICS):
+            column = columns[:, i][~np.isnan(columns[:, i])]
+            out["metrics"][name] = {
+                "count": len(column), "sum": column.sum(),
+                "percentiles": dict(zip((f"p{q}" for q in PERCENTILES), np.percentile(column, PERCENTILES))),
+            }
+        sroi, needed = columns[:, list(METRICS).index("sroi")], columns[:, list(METRICS).index("needed")]
+        out["sroiWeightedByFunding"] = np.average(sroi, weights=needed)
+        return out
+
+    groups = {}
+    if group_by is not None:
+        field = GROUP_FIELDS[group_by]
+        for record in records:
+            for label in set(record[field]) if isinstance(record[field], list) else [record[field]]:
+                groups.setdefault(label, []).append(record)
+    return {"total": summarize(records), "groups": {label: summarize(rs) for label, rs in groups.items()}}
+
+
+def check(store: ImpactStore, records: list, group_by: str = None):
+    got, want = store.stats(PERCENTILES, group_by), rescan(records, group_by)
+    pairs = [(got["total"], want["total"])] + [(got["groups"][k], v) for k, v in want["groups"].items()]
+    assert sorted(got["groups"]) == sorted(want["groups"]), "group labels differ"
+    for g, w in pairs:
+        assert g["projects"] == w["projects"]
+        assert np.isclose(g["sroiWeightedByFunding"], w["sroiWeightedByFunding"])
+        for name, wm in w["metrics"].items():
+            gm = g["metrics"][name]
+            assert gm["count"] == wm["count"] and np.isclose(gm["sum"], wm["sum"]), name
+            for key, value in wm["percentiles"].items():
+                assert np.isclose(gm["percentiles"][key], value), (name, key)
+
+
+def _ms(call, repeats: int = 5) -> float:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+async def run(n_projects: int, requests: int):
+    rng = random.Random(1)
+    records = [make_project(rng, i) for i in range(n_projects)]
+
+    # Fed directly here, so its own feed never fetches anything
+    store = ImpactStore(feed=ProjectFeed())
+    started = time.perf_counter()
+    store.replace(records)
+    print(f"build     {len(store):7d} projects  {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+    for group_by in (None, *GROUP_FIELDS):
+        label = group_by or "none"
+        rescan_ms = _ms(lambda: rescan(records, group_by), repeats=1)
+
+        def after_write():
+            store.upsert(records[0])
+            store.stats(PERCENTILES, group_by)
+
+        print(
+            f"group_by {label:8s}  rescan {rescan_ms:9.1f} ms   store after a write {_ms(after_write):7.2f} ms   "
+            f"cached {_ms(lambda: store.stats(PERCENTILES, group_by)) * 1000:7.1f} us"
+        )
+
+    # Updates and deletes keep the store identical to a rescan
+    for record in rng.sample(records, 100):
+        record["metrics"]["sroi"] = rng.uniform(0.5, 8)
+        record["sgds"] = ["3"]
+        store.upsert(record)
+    for record in rng.sample(records, 100):
+        records.remove(record)
+        store.remove(record["id"])
+    for group_by in (None, *GROUP_FIELDS):
+        check(store, records, group_by)
+    print("stats match a rescan after updates and deletes")
+
+    app = FastAPI()
+    app.include_router(projects.router)
+    impact.impact_store = projects.impact_store = store
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        latencies = []
+        for i in range(requests):
+            params = {"group_by": "sdgs", "percentiles": "50,90,99"}
+            started = time.perf_counter()
+            resp = await client.get("/projects/stats", params=params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert resp.status_code == 200, resp.text
+        print(f"GET /projects/stats?group_by=sdgs  p50 {statistics.median(latencies):7.2f} ms  ({len(resp.content)} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.projects, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Check that importing the app stays cheap: it must not pull in torch, cv2 or
+ultralytics (the model loads lazily on the inference workers) and must finish
+within a time budget. Exits non-zero if either check fails, so it can gate CI.
+
+    cd backend && python -m benchmarks.bench_import_time --budget 3.0
+
+Each run imports the app in a fresh interpreter, with ``-X importtime`` to
+list the slowest modules.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULE = "py_app_service.app"
+FORBIDDEN = ("torch", "cv2", "ultralytics")
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import {MODULE}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {FORBIDDEN!r} if m in sys.modules]}}))
+"""
+
+
+def _import_once() -> dict:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {MODULE} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # "import time: self [us] | cumulative | name" lines on stderr
+    modules = []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            modules.append((int(cumulative), name.strip()))
+    result["slowest"] = sorted(modules, reverse=True)[:10]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds allowed for the median import")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [_import_once() for _ in range(args.runs)]
+    median = statistics.median(run["seconds"] for run in runs)
+    heavy = sorted({module for run in runs for module in run["heavy"]})
+
+    print(f"import {MODULE}: median {median:.3f}s over {args.runs} runs (budget {args.budget:.1f}s)")
+    print("slowest imports (cumulative):")
+    for cumulative, name in runs[-1]["slowest"]:
+        print(f"  {cumulative / 1e6:7.3f}s  {name}")
+
+    failures = []
+    if heavy:
+        failures.append(f"importing {MODULE} pulled in {', '.join(heavy)}")
+    if median > args.budget:
+        failures.append(f"import took {median:.3f}s, over the {args.budget:.1f}s budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
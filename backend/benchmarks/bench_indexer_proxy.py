@@ -0,0 +1,109 @@
+"""
+Compare the indexer proxy with a fresh ``httpx.AsyncClient`` per query (the
+old router behaviour) against the pooled client, with and without the
+response cache, while many clients poll the same few queries.
+
+    cd backend && python -m benchmarks.bench_indexer_proxy --requests 2000 --concurrency 32
+
+The indexer is a local stub that answers every query after a fixed delay.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks._server import serve
+from py_app_service.database.indexer import init_indexer, close_indexer
+from py_app_service.routers.indexer import GraphQLRequest, proxy_indexer_query, indexer_cache
+
+# What the dashboard polls: the same query text with a handful of variable sets
+QUERY = """
+query Donations($limit: Int) {
+  donations(limit: $limit, orderBy: "blockNumber", orderDirection: "desc") {
+    items { id donor amount blockNumber }
+  }
+}
+"""
+VARIABLES = [{"limit": limit} for limit in (10, 20, 50)]
+
+
+async def _drive(call, total: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await call(VARIABLES[i % len(VARIABLES)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "req_per_s": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def run(base_url: str, total: int, concurrency: int):
+    async def per_request_client(variables):
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            (await client.post(base_url, json={"query": QUERY, "variables": variables})).raise_for_status()
+
+    async def pooled_client(variables):
+        await indexer.query({"query": QUERY, "variables": variables})
+
+    async def cached_proxy(variables):
+        await proxy_indexer_query(GraphQLRequest(query=QUERY, variables=variables))
+
+    indexer = await init_indexer(base_url=base_url, max_keepalive_connections=concurrency)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as stub:
+            for name, call in (
+                ("per-request client (before)", per_request_client),
+                ("pooled client", pooled_client),
+                ("pooled + cached proxy (after)", cached_proxy),
+            ):
+                # Warm up once so imports and the first connection don't skew results
+                await call(VARIABLES[0])
+                await stub.post("/stats/reset")
+                stats = await _drive(call, total, concurrency)
+                stats["upstream"] = (await stub.get("/stats")).json()["queries"]
+                results[name] = stats
+    finally:
+        await close_indexer()
+
+    for name, stats in results.items():
+        print(
+            f"{name:30s} {stats['req_per_s']:9.1f} req/s   p50 {stats['p50_ms']:7.2f} ms   "
+            f"p99 {stats['p99_ms']:7.2f} ms   upstream {stats['upstream']:5d}"
+        )
+    print("cache:", indexer_cache.stats())
+
+    # The cache must answer repeats without going upstream: at most one call per
+    # distinct query per TTL window, however many clients are polling
+    cached = results["pooled + cached proxy (after)"]
+    assert cached["upstream"] < total, "indexer cache did not absorb repeated queries"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the stub takes per query")
+    args = parser.parse_args()
+
+    os.environ["STUB_INDEXER_LATENCY"] = str(args.latency)
+    with serve("benchmarks.stub_indexer:app") as base_url:
+        asyncio.run(run(base_url + "/", args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Latency and accuracy of each inference backend against the PyTorch reference.
+Every backend runs the same images; its detections are matched to the
+reference ones (greedy, by box IoU) and compared on boxes, masks and
+confidences. Exits non-zero if a backend falls outside the tolerances.
+
+    cd backend && python -m benchmarks.bench_inference_backends --backends onnx,onnx-int8 --image-dir samples/
+
+Export the artifacts first (``python -m py_app_service.scripts.export_model``).
+Without ``--image-dir`` synthetic images are used; the model finds few panels
+in those, so use real aerial images for a meaningful accuracy check.
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import solar_farm_image
+from py_app_service.services import compvis
+
+
+def _box_iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(x2 - x1, 0) * max(y2 - y1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _mask_iou(a, b, shape) -> float:
+    masks = []
+    for polygon in (a, b):
+        mask = np.zeros(shape[:2], dtype=np.uint8)
+        if len(polygon):
+            cv2.fillPoly(mask, [np.round(np.asarray(polygon)).astype(np.int32)], 1)
+        masks.append(mask.astype(bool))
+    union = np.logical_or(*masks).sum()
+    return float(np.logical_and(*masks).sum() / union) if union else 1.0
+
+
+def compare(reference: list, candidate: list, shape, match_iou: float = 0.5) -> dict:
+    """Match candidate detections to reference ones, highest confidence first."""
+    unmatched = sorted(range(len(candidate)), key=lambda i: -candidate[i]["confidence"])
+    box_ious, mask_ious, conf_diffs = [], [], []
+    for ref in sorted(reference, key=lambda p: -p["confidence"]):
+        best, best_iou = None, match_iou
+        for i in unmatched:
+            iou = _box_iou(ref["bbox"], candidate[i]["bbox"])
+            if iou >= best_iou:
+                best, best_iou = i, iou
+        if best is None:
+            continue
+        unmatched.remove(best)
+        box_ious.append(best_iou)
+        mask_ious.append(_mask_iou(ref["polygon"], candidate[best]["polygon"], shape))
+        conf_diffs.append(abs(ref["confidence"] - candidate[best]["confidence"]))
+    return {
+        "reference": len(reference),
+        "matched": len(box_ious),
+        "extra": len(unmatched),
+        "box_ious": box_ious,
+        "mask_ious": mask_ious,
+        "conf_diffs": conf_diffs,
+    }
+
+
+def _load_images(args) -> list:
+    if args.image_dir:
+        paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(args.image_dir, f"*.{ext}")))
+        images = [image for image in (cv2.imread(p) for p in paths[: args.images]) if image is not None]
+        if not images:
+            raise SystemExit(f"No images in {args.image_dir}")
+        return images
+    return [solar_farm_image(args.width, args.height, seed=i) for i in range(args.images)]
+
+
+def _run(backend: str, images: list, batch_size: int, repeats: int):
+    # Warm up: model load and first-call allocations
+    compvis.predict_solar_panel_batch(images[:1], batch_size=1, backend=backend)
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        outputs = compvis.predict_solar_panel_batch(images, batch_size=batch_size, backend=backend, output_format="raw")
+        latencies.append((time.perf_counter() - started) * 1000 / len(images))
+    return [predictions for _, predictions in outputs], statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="onnx,onnx-int8", help="compared against torch")
+    parser.add_argument("--image-dir")
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-recall", type=float, default=0.9, help="share of reference detections matched")
+    parser.add_argument("--min-box-iou", type=float, default=0.85, help="mean box IoU of matched detections")
+    parser.add_argument("--min-mask-iou", type=float, default=0.8, help="mean mask IoU of matched detections")
+    parser.add_argument("--max-conf-diff", type=float, default=0.1, help="mean |confidence difference|")
+    args = parser.parse_args()
+
+    images = _load_images(args)
+    reference, reference_ms = _run("torch", images, args.batch_size, args.repeats)
+    print(f"{'torch':10s} {reference_ms:8.2f} ms/image   (reference, {sum(map(len, reference))} detections)")
+    if not any(reference):
+        print("note: the reference found nothing to compare against; pass real images with --image-dir")
+
+    failures = []
+    for backend in args.backends.split(","):
+        predictions, ms = _run(backend, images, args.batch_size, args.repeats)
+        results = [compare(ref, cand, image.shape) for ref, cand, image in zip(reference, predictions, images)]
+        total = sum(r["reference"] for r in results)
+        matched = sum(r["matched"] for r in results)
+        box_ious = [v for r in results for v in r["box_ious"]]
+        mask_ious = [v for r in results for v in r["mask_ious"]]
+        conf_diffs = [v for r in results for v in r["conf_diffs"]]
+        stats = {
+            "recall": matched / total if total else 1.0,
+            "box_iou": statistics.mean(box_ious) if box_ious else 1.0,
+            "mask_iou": statistics.mean(mask_ious) if mask_ious else 1.0,
+            "conf_diff": statistics.mean(conf_diffs) if conf_diffs else 0.0,
+        }
+        print(
+            f"{backend:10s} {ms:8.2f} ms/image   x{reference_ms / ms:5.2f}   recall {stats['recall']:.3f}   "
+            f"box IoU {stats['box_iou']:.3f}   mask IoU {stats['mask_iou']:.3f}   "
+            f"conf diff {stats['conf_diff']:.3f}   extra {sum(r['extra'] for r in results)}"
+        )
+        if stats["recall"] < args.min_recall:
+            failures.append(f"{backend}: recall {stats['recall']:.3f} < {args.min_recall}")
+        if stats["box_iou"] < args.min_box_iou:
+            failures.append(f"{backend}: box IoU {stats['box_iou']:.3f} < {args.min_box_iou}")
+        if stats["mask_iou"] < args.min_mask_iou:
+            failures.append(f"{backend}: mask IoU {stats['mask_iou']:.3f} < {args.min_mask_iou}")
+        if stats["conf_diff"] > args.max_conf_diff:
+            failures.append(f"{backend}: confidence diff {stats['conf_diff']:.3f} > {args.max_conf_diff}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
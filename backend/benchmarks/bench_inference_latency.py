@@ -0,0 +1,90 @@
+"""
+Show how a running training batch affects ``GET /projects`` latency, with YOLO
+called inline on the event loop (the old behaviour) versus on the inference
+executor.
+
+    cd backend && python -m benchmarks.bench_inference_latency --images 8 --requests 200
+
+Needs ultralytics and ``services/best.pt``; PocketBase is a local stub.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks._server import serve
+from benchmarks.synthetic import encode_jpeg, solar_farm_image
+from py_app_service.app import app
+from py_app_service.database.pocketbase import init_pocketbase, close_pocketbase
+from py_app_service.services import compvis
+from py_app_service.services.inference import run_inference, start_inference_executor, shutdown_inference_executor
+
+
+async def _inline_batch(images):
+    for image in images:
+        compvis.predict_encoded(image)
+        # Yield between images the way the old loop did between awaits
+        await asyncio.sleep(0)
+
+
+async def _executor_batch(images):
+    for image in images:
+        await run_inference(image)
+
+
+async def _probe(client: httpx.AsyncClient, total: int, interval: float) -> list:
+    # Latency is measured from when each request was due, not when it actually
+    # got sent, so time spent waiting for a blocked event loop is counted too
+    latencies = []
+    started = time.perf_counter()
+    for i in range(total):
+        due = started + i * interval
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        (await client.get("/projects")).raise_for_status()
+        latencies.append((time.perf_counter() - due) * 1000)
+    return latencies
+
+
+def _report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f"{name:28s} p50 {statistics.median(latencies):8.2f} ms   p99 {p99:8.2f} ms   max {latencies[-1]:8.2f} ms")
+
+
+async def run(base_url: str, n_images: int, total: int, interval: float):
+    await init_pocketbase(base_url=base_url)
+    start_inference_executor()
+    images = [encode_jpeg(solar_farm_image(seed=i)) for i in range(n_images)]
+    # Load the model in both the event loop thread and the executor before timing
+    compvis.predict_encoded(images[0])
+    await run_inference(images[0])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        try:
+            _report("idle", await _probe(client, total, interval))
+            for name, batch in (("inline batch (before)", _inline_batch), ("executor batch (after)", _executor_batch)):
+                batch_task = asyncio.create_task(batch(images))
+                latencies = await _probe(client, total, interval)
+                await batch_task
+                _report(name, latencies)
+        finally:
+            shutdown_inference_executor()
+            await close_pocketbase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8, help="images in the training batch")
+    parser.add_argument("--requests", type=int, default=200, help="/projects probes per phase")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between probes")
+    args = parser.parse_args()
+
+    with serve("benchmarks.stub_pocketbase:app") as base_url:
+        asyncio.run(run(base_url, args.images, args.requests, args.interval))
+
+
+if __name__ == "__main__":
+    main()
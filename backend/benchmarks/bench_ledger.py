@@ -0,0 +1,143 @@
+"""
+Replays a synthetic chain into the donation ledger block by block, with
+reorgs, and checks it against folding every event from scratch, and that a
+second process reloading the state file keeps up; then restarts from the saved state and compares the ``/ledger`` endpoints with pulling the
+whole event tables from the indexer, which is what the dashboards did.
+
+    cd backend && python -m benchmarks.bench_ledger --blocks 20000 --steps 200
+
+The indexer is the local stub (see ``benchmarks/stub_indexer.py``); the ledger
+router runs in-process and its state file goes to a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks._server import serve
+from py_app_service.database.indexer import close_indexer, get_indexer, init_indexer
+from py_app_service.routers import ledger as ledger_router
+from py_app_service.services.ledger import _QUERIES, Ledger, LedgerState, _event, ledger
+
+
+async def _chain_state(stub: httpx.AsyncClient) -> LedgerState:
+    """Fold the stub's whole chain in one go, the reference the ledger must match."""
+    chain = (await stub.get("/chain/events")).json()
+    state = LedgerState()
+    events = [_event(kind, item) for kind, (field, _) in _QUERIES.items() for item in chain[field]]
+    for event in sorted(events, key=lambda event: (event["block"], event["log"])):
+        if state.counts(event):
+            state.apply(event)
+    return state
+
+
+async def _pull_tables() -> int:
+    """What a dashboard did before: page through both event tables from block 0."""
+    rows = 0
+    async for items in Ledger(state_path=None)._pages("transfer", -1):
+        rows += len(items)
+    async for items in Ledger(state_path=None)._pages("moneyOut", -1):
+        rows += len(items)
+    return rows
+
+
+def _ms(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms"
+
+
+async def run(base_url: str, steps: int, blocks_per_step: int, reorg_every: int, reorg_depth: int, state_path: str):
+    await init_indexer(base_url=base_url)
+    ledger.state_path = state_path
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as stub:
+            started = time.perf_counter()
+            applied = await ledger.sync()
+            print(f"initial sync       {time.perf_counter() - started:8.2f} s   {applied} events to block {ledger.head_block}")
+
+            latencies, reorgs = [], 0
+            for step in range(1, steps + 1):
+                await stub.post("/chain/blocks", params={"count": blocks_per_step})
+                if reorg_every and step % reorg_every == 0:
+                    await stub.post("/chain/reorg", params={"depth": reorg_depth})
+                    reorgs += 1
+                started = time.perf_counter()
+                await ledger.sync()
+                latencies.append(time.perf_counter() - started)
+            print(f"incremental syncs  x{steps:<5d} {_ms(latencies)}   {reorgs} reorgs, {ledger.rewound} events rewound")
+
+            expected = (await _chain_state(stub)).to_json()
+            assert ledger.state.to_json() == expected, "ledger drifted from a from-scratch fold"
+            print("matches a from-scratch fold of the chain")
+
+            # Another process on the host: the writer holds the lock, this one reloads the file
+            follower = Ledger(state_path=state_path)
+            assert ledger.leader and not await asyncio.to_thread(follower._try_lead), "state file lock not held"
+            await follower.follow()
+            assert follower.state.to_json() == expected, "follower diverged from the state file"
+            print("a second process follows the state file without querying the indexer")
+
+            # Restart: resume from the state file, only the reorg window is re-read
+            restarted = Ledger(state_path=state_path)
+            assert restarted.load(), "state file was not written"
+            get_indexer().requests = 0
+            started = time.perf_counter()
+            applied = await restarted.sync()
+            print(
+                f"restart + sync     {time.perf_counter() - started:8.2f} s   {applied} events applied, "
+                f"{get_indexer().requests} indexer queries"
+            )
+            assert applied == 0 and restarted.state.to_json() == expected, "restart lost or repeated events"
+
+        wallet = ledger.top("recipients", 1)[0]["address"]
+        ledger.project_wallets = {"bench": [wallet]}
+        app = FastAPI()
+        app.include_router(ledger_router.router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+            resp = await client.get("/ledger/projects/bench")
+            assert resp.json()["inflow"] == str(expected["received"][wallet]), resp.text
+            for path in ("/ledger/summary", "/ledger/top/donors?limit=20", "/ledger/daily", "/ledger/projects/bench"):
+                latencies = []
+                for _ in range(50):
+                    started = time.perf_counter()
+                    resp = await client.get(path)
+                    latencies.append(time.perf_counter() - started)
+                    assert resp.status_code == 200, resp.text
+                print(f"GET {path:28s} {_ms(latencies)}")
+
+        latencies = []
+        for _ in range(5):
+            started = time.perf_counter()
+            rows = await _pull_tables()
+            latencies.append(time.perf_counter() - started)
+        print(f"pull both tables ({rows} rows)  {_ms(latencies)}")
+    finally:
+        await close_indexer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=20000, help="blocks on the chain before the first sync")
+    parser.add_argument("--steps", type=int, default=200, help="incremental syncs")
+    parser.add_argument("--blocks-per-step", type=int, default=3)
+    parser.add_argument("--reorg-every", type=int, default=20, help="steps between reorgs (0 for none)")
+    parser.add_argument("--reorg-depth", type=int, default=8, help="blocks replaced by each reorg")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the stub takes per query")
+    args = parser.parse_args()
+
+    os.environ["STUB_INDEXER_BLOCKS"] = str(args.blocks)
+    os.environ["STUB_INDEXER_LATENCY"] = str(args.latency)
+    with tempfile.TemporaryDirectory() as tmp, serve("benchmarks.stub_indexer:app") as base_url:
+        asyncio.run(
+            run(base_url, args.steps, args.blocks_per_step, args.reorg_every, args.reorg_depth,
+                os.path.join(tmp, "ledger", "state.json"))
+        )
+
+
+if __name__ == "__main__":
+    main()
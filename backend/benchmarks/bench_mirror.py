@@ -0,0 +1,133 @@
+"""
+List/get latency from PocketBase against the MongoDB read-model mirror
+(``services/mirror.py``), plus a check that backfill, incremental sync,
+write-through and the full-sync cleanup of deleted records keep the mirror
+identical to PocketBase.
+
+    cd backend && python -m benchmarks.bench_mirror --projects 2000 --latency 0.05 --mongomock
+
+Runs against the stub PocketBase. ``--mongomock`` uses an in-process
+``mongomock_motor`` client (pip install mongomock-motor); without it the
+mirror writes to the mongod at MONGODB_URI (docker compose up -d mongodb),
+into a throwaway database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+
+from benchmarks._server import serve
+from py_app_service.config import POCKETBASE_PROJECTS_COLLECTION as COLLECTION
+from py_app_service.database import mongo
+from py_app_service.database.pocketbase import close_pocketbase, get_pocketbase, init_pocketbase
+from py_app_service.services.mirror import CollectionMirror
+
+
+async def _time(call, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies) * 1000
+
+
+async def _pocketbase_ids() -> set:
+    return {record["id"] async for record in get_pocketbase().iter_records(COLLECTION, fields="id,updated")}
+
+
+async def _mirror_ids(mirror: CollectionMirror) -> set:
+    return {record["id"] async for page in mirror.iter_pages(500) for record in page}
+
+
+async def run(base_url: str, projects: int, repeats: int):
+    await init_pocketbase(base_url=base_url)
+    mirror = CollectionMirror(COLLECTION, indexes=[[("created", 1), ("_id", 1)]], enabled=True)
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as stub:
+            for i in range(projects):
+                await stub.post(f"/api/collections/{COLLECTION}/records", json={"title": f"Project {i}", "type": "Solar"})
+
+            await mirror.ensure_indexes()
+            started = time.perf_counter()
+            written = await mirror.sync()
+            print(f"backfill            {written:6d} records  {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+            some_id = next(iter(await _pocketbase_ids()))
+            pocketbase = get_pocketbase()
+            for name, pb_call, mirror_call in (
+                (
+                    "list page (30)",
+                    lambda: pocketbase.list_records(COLLECTION, page=5, per_page=30, sort="-created"),
+                    lambda: mirror.list(5, 30, sort="-created"),
+                ),
+                ("get by id", lambda: pocketbase.get_record(COLLECTION, some_id), lambda: mirror.get(some_id)),
+            ):
+                pb_ms = await _time(pb_call, repeats)
+                mirror_ms = await _time(mirror_call, repeats)
+                print(f"{name:18s}  pocketbase {pb_ms:8.2f} ms   mirror {mirror_ms:8.2f} ms")
+
+            # Changes made behind the mirror's back show up on the next incremental sync
+            ids = sorted(await _pocketbase_ids())
+            await asyncio.sleep(0.01)
+            for record_id in ids[:10]:
+                await stub.patch(f"/api/collections/{COLLECTION}/records/{record_id}", json={"title": "renamed"})
+            started = time.perf_counter()
+            written = await mirror.sync(full=False)
+            print(f"incremental sync    {written:6d} records  {(time.perf_counter() - started) * 1000:9.1f} ms")
+            assert (await mirror.get(ids[0]))["title"] == "renamed", "incremental sync missed an update"
+
+            # Write-through, as the routers do after writing to PocketBase
+            created = (await stub.post(f"/api/collections/{COLLECTION}/records", json={"title": "new"})).json()
+            await mirror.upsert(created)
+            assert await mirror.get(created["id"]) is not None, "write-through did not land"
+            await stub.delete(f"/api/collections/{COLLECTION}/records/{ids[1]}")
+            await mirror.delete(ids[1])
+
+            # A write-through newer than what the sync reads from PocketBase: the sync
+            # must keep the newer copy, and not drop it as unseen
+            newer = {**(await pocketbase.get_record(COLLECTION, ids[3])), "title": "newer", "updated": "9999-12-31 00:00:00.000Z"}
+            await mirror.upsert(newer)
+            await mirror.sync(full=True)
+            assert (await mirror.get(ids[3]))["title"] == "newer", "full sync overwrote or dropped a newer write-through"
+
+            # Deleted elsewhere: only a full sync notices
+            await stub.delete(f"/api/collections/{COLLECTION}/records/{ids[2]}")
+            await mirror.sync(full=True)
+            assert await _mirror_ids(mirror) == await _pocketbase_ids(), "mirror and PocketBase disagree"
+            print("mirror matches PocketBase after write-through and full sync:", mirror.stats())
+    finally:
+        await close_pocketbase()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stub takes per record read")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock_motor instead of a local mongod")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        mongo.init_mongo(AsyncMongoMockClient())
+    mongo.settings.DATABASE_NAME = f"bench_mirror_{uuid.uuid4().hex[:8]}"
+
+    os.environ["STUB_POCKETBASE_LATENCY"] = str(args.latency)
+    with serve("benchmarks.stub_pocketbase:app") as base_url:
+        try:
+            asyncio.run(run(base_url, args.projects, args.repeats))
+        finally:
+            if not args.mongomock:
+                client = mongo.get_database().client
+                client.drop_database(mongo.settings.DATABASE_NAME)
+            mongo.close_mongo()
+
+
+if __name__ == "__main__":
+    main()
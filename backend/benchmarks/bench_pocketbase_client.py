@@ -0,0 +1,109 @@
+"""
+Compare PocketBase request throughput with a fresh ``httpx.AsyncClient`` per
+request (the old router behaviour) against the shared, pooled client.
+
+    cd backend && python -m benchmarks.bench_pocketbase_client --requests 2000 --concurrency 32
+
+The stub runs on plain HTTP over loopback, so there is no TLS handshake here;
+against the hosted PocketBase the gap is larger than what this reports.
+
+It also walks an ``isTrained=false`` listing while flipping each record it
+sees to trained, as the training scan does, and checks that paging by cursor
+(``iter_pages_after``) sees every record where paging by number skips some.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks._server import serve
+from py_app_service.database.pocketbase import PocketBaseClient
+
+COLLECTION = "projects"
+PENDING = "selected_project"
+PENDING_RECORDS = 200
+
+
+async def _drive(call, total: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "req_per_s": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def run(base_url: str, total: int, concurrency: int):
+    path = f"/api/collections/{COLLECTION}/records"
+
+    async def per_request_client():
+        async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+            (await client.get(path)).raise_for_status()
+
+    pooled = PocketBaseClient(base_url=base_url, max_keepalive_connections=concurrency)
+
+    async def pooled_client():
+        await pooled.list_records(COLLECTION)
+
+    try:
+        # Warm up both paths once so imports and the stub's first response don't skew results
+        await per_request_client()
+        await pooled_client()
+        results = {
+            "per-request client (before)": await _drive(per_request_client, total, concurrency),
+            "pooled client (after)": await _drive(pooled_client, total, concurrency),
+        }
+    finally:
+        await pooled.aclose()
+
+    for name, stats in results.items():
+        print(f"{name:30s} {stats['req_per_s']:9.1f} req/s   p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms")
+
+    client = PocketBaseClient(base_url=base_url)
+    try:
+        for after in (False, True):
+            ids = {
+                (await client.create_record(PENDING, json={"isTrained": False}))["id"] for _ in range(PENDING_RECORDS)
+            }
+            if after:
+                pages = client.iter_pages_after(PENDING, per_page=20, filter="isTrained=false")
+            else:
+                pages = client.iter_pages(PENDING, per_page=20, filter="isTrained=false", sort="created", concurrency=1)
+            seen = set()
+            async for page in pages:
+                for record in page:
+                    seen.add(record["id"])
+                    await client.update_record(PENDING, record["id"], json={"isTrained": True})
+            label = "by cursor (after)" if after else "by page number (before)"
+            print(f"isTrained=false walk, {label:24s} {len(seen & ids)} of {len(ids)} records seen")
+        assert seen >= ids, "paging by cursor skipped records"
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with serve("benchmarks.stub_pocketbase:app") as base_url:
+        asyncio.run(run(base_url, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
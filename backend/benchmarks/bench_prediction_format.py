@@ -0,0 +1,89 @@
+"""
+Size and formatting time of the stored prediction formats (``PREDICTION_FORMAT``
+and ``PREDICTION_ENCODING`` in ``config.py``) on synthetic detections with
+dense, pixel-stepped mask outlines like YOLO's.
+
+    cd backend && python -m benchmarks.bench_prediction_format --detections 500 --vertices 200
+
+Needs numpy and cv2, not the model. The "drift" column is the largest distance
+between an original vertex and the outline of the decoded polygon.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from py_app_service.services.predictions import decode_compact, format_predictions
+
+
+def synthetic_predictions(count: int, vertices: int, width: int, height: int, seed: int = 0) -> list:
+    """Rotated panel outlines traced one pixel step at a time, like ``masks.xy``."""
+    rng = np.random.default_rng(seed)
+    predictions = []
+    for _ in range(count):
+        cx, cy = rng.uniform(50, width - 50), rng.uniform(50, height - 50)
+        w, h, angle = rng.uniform(20, 60), rng.uniform(10, 30), rng.uniform(0, np.pi)
+        t = np.linspace(0, 4, vertices, endpoint=False)
+        side = t.astype(int)
+        frac = t - side
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1], [-1, -1]], dtype=np.float64) * [w / 2, h / 2]
+        points = corners[side] + (corners[side + 1] - corners[side]) * frac[:, None]
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        polygon = (np.round(points @ rotation.T) + [cx, cy]).astype(np.float32)
+        predictions.append({
+            "confidence": float(rng.uniform(0.25, 1.0)),
+            "bbox": np.concatenate([polygon.min(axis=0), polygon.max(axis=0)]).astype(np.int32),
+            "polygon": polygon,
+        })
+    return predictions
+
+
+def _drift(original: list, decoded: list) -> float:
+    worst = 0.0
+    for a, b in zip(original, decoded):
+        contour = np.asarray(b["polygon"], dtype=np.float32).reshape(-1, 1, 2)
+        for x, y in a["polygon"]:
+            worst = max(worst, abs(cv2.pointPolygonTest(contour, (float(x), float(y)), True)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detections", type=int, default=500)
+    parser.add_argument("--vertices", type=int, default=200)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    predictions = synthetic_predictions(args.detections, args.vertices, args.width, args.height)
+    image_size = (args.width, args.height)
+    variants = [("verbose", None)] + [("compact", encoding) for encoding in ("int16", "float32", "polyline")]
+
+    baseline = None
+    for output_format, encoding in variants:
+        kwargs = {"encoding": encoding, "tolerance": args.tolerance} if encoding else {}
+        latencies = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            formatted = format_predictions(predictions, image_size, output_format, **kwargs)
+            payload = json.dumps(formatted)
+            latencies.append(time.perf_counter() - started)
+        size = len(payload.encode())
+        baseline = baseline or size
+        decoded = decode_compact(formatted) if output_format == "compact" else [
+            {**p, "polygon": np.asarray(p["polygon"])} for p in formatted
+        ]
+        print(
+            f"{output_format + (':' + encoding if encoding else ''):>16s}  "
+            f"{statistics.median(latencies) * 1000:8.1f} ms  {size / 1024:9.1f} KiB  "
+            f"{size / baseline:6.1%} of verbose  drift {_drift(predictions, decoded):.2f} px"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+CPU time to map and serialise PocketBase project records into the
+``GET /projects`` response body: the previous path (build a ProjectResponse
+per record, dump it, let FastAPI validate the list again against
+``response_model`` and encode it), the validate-once path now used by the
+projects router, trusted records (PROJECTS_VALIDATE_RESPONSES off) and a
+``fields=`` card projection without ``metrics``.
+
+    cd backend && python -m benchmarks.bench_project_serialization --records 10000
+
+Runs in-process; no PocketBase needed.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.stub_pocketbase import make_project
+from py_app_service.models.project import ProjectResponse
+from py_app_service.routers import projects
+from py_app_service.routers.projects import (
+    _encode_projects,
+    _map_pb_to_project_response,
+    _parse_fields,
+    _pb_to_project_fields,
+    _project_projection,
+)
+from py_app_service.utils.responses import EncodedJSONResponse, dumps
+
+CARD_FIELDS = "id,title,location,type,verified,image,quickMetrics"
+
+
+def _records(n: int) -> list:
+    stamp = "2026-01-01 00:00:00.000Z"
+    return [
+        {**make_project(i), "id": f"p{i:014d}", "collectionId": "pbc_projects", "collectionName": "projects",
+         "created": stamp, "updated": stamp}
+        for i in range(n)
+    ]
+
+
+def _ms(call, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+async def _endpoint_ms(app: FastAPI, path: str, repeats: int) -> tuple:
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            resp = await client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert resp.status_code == 200, resp.text
+    return statistics.median(latencies), resp.json()
+
+
+def run(n_records: int, repeats: int):
+    records = _records(n_records)
+    card = _parse_fields(CARD_FIELDS)
+
+    def previous() -> bytes:
+        return json.dumps([_map_pb_to_project_response(r).model_dump() for r in records]).encode()
+
+    def trusted() -> bytes:
+        projects.PROJECTS_VALIDATE_RESPONSES = False
+        try:
+            return _encode_projects(records)
+        finally:
+            projects.PROJECTS_VALIDATE_RESPONSES = True
+
+    for name, call in (
+        ("model + model_dump + json.dumps (previous, before response_model)", previous),
+        ("validate once + dump_json (router)", lambda: _encode_projects(records)),
+        ("trusted, no validation (PROJECTS_VALIDATE_RESPONSES off)", trusted),
+        (f"fields={CARD_FIELDS}", lambda: dumps([_project_projection(r, card) for r in records])),
+    ):
+        print(f"{name:66s} {_ms(call, repeats):8.1f} ms")
+    assert json.loads(trusted()) == json.loads(_encode_projects(records)), "trusted path changed the output"
+
+    # End to end through FastAPI: the response_model pass is where the rest went
+    app = FastAPI()
+
+    @app.get("/previous", response_model=List[ProjectResponse])
+    async def previous_route():
+        return [_map_pb_to_project_response(r).model_dump() for r in records]
+
+    @app.get("/fast", response_model=List[ProjectResponse])
+    async def fast_route():
+        return EncodedJSONResponse(_encode_projects(records))
+
+    @app.get("/card")
+    async def card_route():
+        return EncodedJSONResponse(dumps([_project_projection(r, card) for r in records]))
+
+    results = {}
+    for path in ("/previous", "/fast", "/card"):
+        ms, results[path] = asyncio.run(_endpoint_ms(app, path, repeats))
+        print(f"GET {path:62s} {ms:8.1f} ms")
+    assert results["/previous"] == results["/fast"], "fast path changed the response body"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.records, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
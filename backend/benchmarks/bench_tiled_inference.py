@@ -0,0 +1,56 @@
+"""
+Tiled versus whole-image inference on large aerial images: tiles per second,
+end-to-end latency and detections found, by image size.
+
+    cd backend && python -m benchmarks.bench_tiled_inference --sizes 1280x960,2560x1920,5120x3840 --tile-size 640
+
+Needs ultralytics and ``services/best.pt``.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import solar_farm_image
+from py_app_service.services import compvis
+
+
+def _time(call, repeats: int):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = call()
+        latencies.append(time.perf_counter() - started)
+    return output, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1280x960,2560x1920,5120x3840")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm up: model load and first-call allocations
+    compvis.predict_solar_panel_batch([solar_farm_image(640, 640)], batch_size=1, tile_size=0)
+
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.split("x"))
+        image = solar_farm_image(width, height)
+        tiles = len(compvis.tile_origins(width, height, args.tile_size, args.overlap))
+
+        (_, whole), whole_s = _time(lambda: compvis.predict_solar_panel_batch([image], 1, tile_size=0, output_format="raw")[0], args.repeats)
+        (_, tiled), tiled_s = _time(
+            lambda: compvis.predict_solar_panel_tiled(image, args.tile_size, args.overlap, args.batch_size, output_format="raw"),
+            args.repeats,
+        )
+        print(
+            f"{size:>10s}  whole {whole_s * 1000:8.1f} ms  {len(whole):4d} panels   "
+            f"tiled {tiled_s * 1000:8.1f} ms  {len(tiled):4d} panels  "
+            f"{tiles:3d} tiles  {tiles / tiled_s:6.1f} tiles/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
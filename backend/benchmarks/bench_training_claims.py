@@ -0,0 +1,121 @@
+"""
+Runs several training worker processes against one backlog of pending
+selected_projects and counts how many times each record gets trained: with
+per-process "memory" claims every worker trains everything, with "file"
+claims (``services/claims.py``) each record should be trained exactly once.
+
+    cd backend && python -m benchmarks.bench_training_claims --workers 4 --records 200 --work 0.05
+
+PocketBase is the local stub (see ``benchmarks/stub_pocketbase.py``). Each
+worker runs the real scheduler scan and job queue; only ``process_project`` is
+replaced by a sleep of ``--work`` seconds that marks the record trained, so no
+model is needed.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks._server import serve
+from py_app_service.config import POCKETBASE_SELECTED_PROJECTS_COLLECTION
+from py_app_service.services.claims import FileClaims, MemoryClaims
+
+RECORDS = f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records"
+
+
+async def _work(base_url: str, backend: str, claim_dir: str, log_path: str, work: float):
+    """One worker process: scan and train until nothing is pending."""
+    from py_app_service.database.pocketbase import close_pocketbase, get_pocketbase, init_pocketbase
+    from py_app_service.services import training
+
+    async def process_project(project: dict):
+        await asyncio.sleep(work)
+        with open(log_path, "a") as log:
+            log.write(f"{project['id']}\n")
+        await get_pocketbase().update_record(POCKETBASE_SELECTED_PROJECTS_COLLECTION, project["id"], json={"isTrained": True})
+
+    training.process_project = process_project
+    training.training_claims = FileClaims(directory=claim_dir) if backend == "file" else MemoryClaims()
+    # A failing job would leave its record pending forever: fail the run instead
+    training.training_jobs.max_attempts = 1
+    await init_pocketbase(base_url=base_url)
+    await training.training_jobs.start()
+    try:
+        while True:
+            await training.training_scheduler.scan()
+            while training.training_jobs.qsize() or training.training_jobs.running:
+                await asyncio.sleep(0.01)
+            failed = [job for job in training.training_jobs.jobs.values() if job.status == "failed"]
+            assert not failed, f"{len(failed)} jobs failed: {failed[0].error}"
+            pending = await get_pocketbase().list_records(
+                POCKETBASE_SELECTED_PROJECTS_COLLECTION, per_page=1, filter="isTrained=false"
+            )
+            if not pending["totalItems"]:
+                return
+            await asyncio.sleep(0.05)
+    finally:
+        await training.training_jobs.stop()
+        await close_pocketbase()
+
+
+def _seed(base_url: str, n_records: int):
+    with httpx.Client(base_url=base_url) as client:
+        for i in range(n_records):
+            resp = client.post(RECORDS, json={"name": f"Solar farm {i}", "isTrained": False})
+            assert resp.status_code == 200, resp.text
+
+
+def run(backend: str, n_workers: int, n_records: int, work: float):
+    with tempfile.TemporaryDirectory() as tmp, serve("benchmarks.stub_pocketbase:app") as base_url:
+        _seed(base_url, n_records)
+        log_path = os.path.join(tmp, "trained.log")
+        open(log_path, "w").close()
+        started = time.perf_counter()
+        workers = [
+            subprocess.Popen([
+                sys.executable, "-m", "benchmarks.bench_training_claims",
+                "--worker", backend, base_url, os.path.join(tmp, "claims"), log_path, str(work),
+            ])
+            for _ in range(n_workers)
+        ]
+        for worker in workers:
+            assert worker.wait() == 0, f"worker exited with {worker.returncode}"
+        elapsed = time.perf_counter() - started
+        with open(log_path) as log:
+            trained = collections.Counter(line.strip() for line in log)
+
+    duplicates = sum(count - 1 for count in trained.values())
+    print(
+        f"{backend:6s} claims, {n_workers} workers  {elapsed:6.2f} s   {len(trained)} of {n_records} records trained, "
+        f"{sum(trained.values())} trainings, {duplicates} duplicates"
+    )
+    assert len(trained) == n_records, "some records were never trained"
+    return duplicates
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        backend, base_url, claim_dir, log_path, work = sys.argv[2:]
+        asyncio.run(_work(base_url, backend, claim_dir, log_path, float(work)))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes")
+    parser.add_argument("--records", type=int, default=200, help="pending selected_projects")
+    parser.add_argument("--work", type=float, default=0.05, help="seconds each training takes")
+    args = parser.parse_args()
+
+    run("memory", args.workers, args.records, args.work)
+    duplicates = run("file", args.workers, args.records, args.work)
+    assert duplicates == 0, "file claims let a record be trained twice"
+    print("file claims: every record trained exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Time to turn a list of explicit ids (POST /training/process) into queued
+training jobs: one sequential ``get_record`` per id (the old path) against
+``TrainingScheduler.submit``'s chunked, concurrent ``id="a" || id="b"`` lookups.
+
+    cd backend && python -m benchmarks.bench_training_fanout --ids 500 --latency 0.02
+
+Runs against the stub PocketBase; the jobs are queued but nothing is trained.
+A share of the ids is already trained, repeated, or doesn't exist.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks._server import serve
+from py_app_service.config import POCKETBASE_SELECTED_PROJECTS_COLLECTION as COLLECTION
+from py_app_service.database.pocketbase import close_pocketbase, get_pocketbase, init_pocketbase
+from py_app_service.models.job import TrainingBatchStatus
+from py_app_service.services.jobs import JobQueue
+from py_app_service.services.training import TRAINING_RECORD_FIELDS, TrainingScheduler
+
+
+async def _noop(record_id, payload):
+    return None
+
+
+async def _seed(stub: httpx.AsyncClient, count: int, trained_share: float) -> list:
+    ids = []
+    for i in range(count):
+        resp = await stub.post(
+            f"/api/collections/{COLLECTION}/records",
+            json={"beforeTrain": f"before_{i}.jpg", "isTrained": random.random() < trained_share},
+        )
+        ids.append(resp.json()["id"])
+    return ids
+
+
+async def sequential(ids: list) -> int:
+    """The old path: one awaited lookup per id before queueing it."""
+    queued = 0
+    for record_id in dict.fromkeys(ids):
+        try:
+            record = await get_pocketbase().get_record(COLLECTION, record_id, fields=TRAINING_RECORD_FIELDS)
+        except Exception:
+            continue
+        if not record.get("isTrained"):
+            queued += 1
+    return queued
+
+
+async def fan_out(ids: list) -> int:
+    scheduler = TrainingScheduler(JobQueue(_noop, concurrency=1))
+    await scheduler.queue.start()
+    try:
+        batch = scheduler.submit(ids)
+        while batch.status == TrainingBatchStatus.resolving:
+            await asyncio.sleep(0.001)
+        assert batch.status == TrainingBatchStatus.submitted, batch.error
+        return len(batch.jobs)
+    finally:
+        await scheduler.stop()
+
+
+async def run(base_url: str, count: int, trained_share: float):
+    await init_pocketbase(base_url=base_url)
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as stub:
+            ids = await _seed(stub, count, trained_share)
+            # Some ids twice, some that don't exist
+            requested = ids + random.sample(ids, count // 10) + [f"missing{i:08d}" for i in range(count // 20)]
+            random.shuffle(requested)
+
+            results = {}
+            for name, call in (("sequential get_record (before)", sequential), ("chunked fan-out (after)", fan_out)):
+                await stub.post("/stats/reset")
+                started = time.perf_counter()
+                queued = await call(requested)
+                elapsed = time.perf_counter() - started
+                upstream = (await stub.get("/stats")).json()["requests"]
+                results[name] = queued
+                print(f"{name:32s} {elapsed * 1000:9.1f} ms   {queued:5d} queued   upstream {upstream:5d}")
+    finally:
+        await close_pocketbase()
+
+    assert len(set(results.values())) == 1, "both paths must queue the same records"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=500)
+    parser.add_argument("--trained-share", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the stub takes per record read")
+    args = parser.parse_args()
+
+    os.environ["STUB_POCKETBASE_LATENCY"] = str(args.latency)
+    with serve("benchmarks.stub_pocketbase:app") as base_url:
+        asyncio.run(run(base_url, args.ids, args.trained_share))
+
+
+if __name__ == "__main__":
+    main()
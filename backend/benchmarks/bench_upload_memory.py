@@ -0,0 +1,150 @@
+"""
+Peak memory of the image ingest paths, old vs new, against the stub PocketBase.
+
+    cd backend && python -m benchmarks.bench_upload_memory --megapixels 40
+
+Each mode runs in its own subprocess. After imports the peak RSS (VmHWM) is
+reset to the current RSS, so the figure reported is how far the mode itself
+pushed the peak. Linux only.
+
+- ``upload-bytes`` / ``upload-stream``: forwarding an upload to PocketBase by
+  reading it into memory first vs passing the file object to httpx.
+- ``decode-copy`` / ``decode-buffer`` / ``decode-reduced``: downloading and
+  decoding an image via ``resp.content`` -> bytearray -> array, vs streaming
+  into one preallocated buffer, optionally decoding at reduced scale.
+
+The decode modes import ``services.training``, which needs ultralytics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks._server import serve
+from benchmarks.synthetic import encode_jpeg, solar_farm_image
+
+MODES = ["upload-bytes", "upload-stream", "decode-copy", "decode-buffer", "decode-reduced"]
+
+
+def _status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not in /proc/self/status")
+
+
+def _reset_peak_rss() -> float:
+    """Reset VmHWM to the current RSS (so import-time peaks don't mask the mode) and return it."""
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    return _status_mb("VmRSS")
+
+
+def _peak_rss_mb() -> float:
+    return _status_mb("VmHWM")
+
+
+async def _upload(base_url: str, path: str, streamed: bool):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        with open(path, "rb") as f:
+            content = f if streamed else f.read()
+            resp = await client.post(
+                "/api/collections/selected_projects/records",
+                data={"isTrained": "false"},
+                files={"beforeTrain": (os.path.basename(path), content, "image/jpeg")},
+            )
+            resp.raise_for_status()
+
+
+async def _decode(base_url: str, url: str, mode: str, target_size: int):
+    import cv2
+    import numpy as np
+
+    from py_app_service.database.pocketbase import close_pocketbase, init_pocketbase
+    from py_app_service.services import compvis, training
+
+    pocketbase = await init_pocketbase(base_url=base_url)
+    baseline = _reset_peak_rss()
+    try:
+        if mode == "decode-copy":
+            # The previous fetch_image_as_numpy
+            resp = await pocketbase.http.get(url)
+            image_array = np.asarray(bytearray(resp.content), dtype=np.uint8)
+            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+        else:
+            buffer = await training.fetch_image_bytes(url)
+            image, _ = compvis.decode_image(buffer, target_size=target_size if mode == "decode-reduced" else 0)
+        assert image is not None
+        return baseline, image.shape
+    finally:
+        await close_pocketbase()
+
+
+def run_child(args):
+    if args.mode.startswith("upload"):
+        baseline = _reset_peak_rss()
+        asyncio.run(_upload(args.base_url, args.file, streamed=args.mode == "upload-stream"))
+        shape = None
+    else:
+        baseline, shape = asyncio.run(_decode(args.base_url, args.url, args.mode, args.target_size))
+    print(json.dumps({"mode": args.mode, "baseline_mb": baseline, "peak_mb": _peak_rss_mb(), "shape": shape}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=40.0)
+    parser.add_argument("--target-size", type=int, default=1280)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_child(args)
+        return
+
+    width = int((args.megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "before.jpg")
+        with open(path, "wb") as f:
+            f.write(encode_jpeg(solar_farm_image(width, height), quality=95))
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"image {width}x{height}, {size_mb:.1f} MiB JPEG")
+
+        with serve("benchmarks.stub_pocketbase:app") as base_url:
+            record = httpx.post(
+                f"{base_url}/api/collections/selected_projects/records",
+                files={"beforeTrain": ("before.jpg", open(path, "rb"), "image/jpeg")},
+                timeout=60.0,
+            ).json()
+            url = f"/api/files/{record['collectionId']}/{record['id']}/{record['beforeTrain']}"
+
+            for mode in args.modes.split(","):
+                out = subprocess.run(
+                    [
+                        sys.executable, "-m", "benchmarks.bench_upload_memory",
+                        "--mode", mode, "--base-url", base_url, "--file", path, "--url", url,
+                        "--target-size", str(args.target_size),
+                    ],
+                    capture_output=True, text=True,
+                )
+                if out.returncode != 0:
+                    print(f"{mode:15s} failed: {out.stderr.strip().splitlines()[-1:]}")
+                    continue
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                growth = result["peak_mb"] - result["baseline_mb"]
+                shape = f"   decoded {result['shape'][1]}x{result['shape'][0]}" if result["shape"] else ""
+                print(f"{mode:15s} peak +{growth:8.1f} MiB{shape}")
+
+
+if __name__ == "__main__":
+    main()
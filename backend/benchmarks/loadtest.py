@@ -0,0 +1,425 @@
+"""
+Load test of the whole app against local stand-ins: the stub PocketBase
+(records, filters, pagination, file upload/download) seeded with synthetic
+projects, and the stub Ponder indexer with a synthetic chain. Drives each
+endpoint scenario at a fixed concurrency and reports throughput, p50/p95/p99
+latency and the server's peak RSS; the ``training`` scenario uploads
+synthetic solar-farm images through ``POST /selected-projects`` and follows
+them through the training pipeline over ``/events``.
+
+    cd backend && python -m benchmarks.loadtest --requests 2000 --concurrency 32
+    python -m benchmarks.loadtest --scenarios projects.list,training --images 32 --baseline benchmarks/results/old.json
+    python -m benchmarks.loadtest --compare benchmarks/results/old.json benchmarks/results/new.json
+
+Results are written as JSON (``--output``, by default under
+``benchmarks/results/``) with the git commit and settings of the run, so runs
+can be compared later with ``--baseline`` or ``--compare``. The app runs as
+``benchmarks.loadtest_app`` in its own process; RSS is read from /proc (Linux),
+including any inference worker processes. ``training`` needs ultralytics and
+the model for INFERENCE_BACKEND and is skipped without them.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks._server import serve, serve_process
+from benchmarks.synthetic import encode_jpeg, solar_farm_image
+from py_app_service import config
+from py_app_service.config import POCKETBASE_PROJECTS_COLLECTION
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# (method, path, JSON body)
+Call = Tuple[str, str, Optional[dict]]
+
+DONATIONS_QUERY = """
+query Donations($limit: Int) {
+  donations(limit: $limit, orderBy: "blockNumber", orderDirection: "desc") {
+    items { id donor amount blockNumber }
+  }
+}
+"""
+
+# What the frontend calls, each as a request factory: (rng, project ids) -> Call
+SCENARIOS: Dict[str, Callable[[random.Random, List[str]], Call]] = {
+    # Calibration: what the app and this client manage on a request that does nothing
+    "root": lambda rng, ids: ("GET", "/", None),
+    "projects.list": lambda rng, ids: ("GET", f"/projects?page={rng.randint(1, max(len(ids) // 30, 1))}&perPage=30", None),
+    "projects.get": lambda rng, ids: ("GET", f"/projects/{rng.choice(ids)}", None),
+    "projects.near": lambda rng, ids: (
+        "GET", f"/projects/near?lat={-6.2 + rng.uniform(-3, 3):.4f}&lon={106.8 + rng.uniform(-8, 8):.4f}&radius_km=100", None,
+    ),
+    "projects.stats": lambda rng, ids: ("GET", f"/projects/stats?group_by={rng.choice(['sdgs', 'maqasid', 'type'])}", None),
+    "selected_projects.list": lambda rng, ids: ("GET", "/selected-projects?perPage=30", None),
+    "indexer.query": lambda rng, ids: (
+        "POST", "/indexer/query", {"query": DONATIONS_QUERY, "variables": {"limit": rng.choice([10, 20, 50])}},
+    ),
+    "ledger.summary": lambda rng, ids: ("GET", "/ledger/summary", None),
+    "ledger.top": lambda rng, ids: ("GET", "/ledger/top/donors?limit=20", None),
+}
+
+
+def _percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[min(len(values) - 1, max(math.ceil(p / 100 * len(values)) - 1, 0))]
+
+
+def _latency_stats(latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {}
+    return {
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def _rss_kb(pid: int) -> int:
+    """Resident memory of ``pid`` and its child processes (inference workers), in KB."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+                    break
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                total += sum(_rss_kb(int(child)) for child in f.read().split())
+    except (OSError, ValueError):
+        pass
+    return total
+
+
+class PeakRSS:
+    """Samples the server's RSS in a thread while the block runs; ``peak_mb`` is the highest seen."""
+
+    def __init__(self, pid: int, interval: float = 0.01):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, _rss_kb(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = _rss_kb(self.pid)
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak_kb / 1024
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_call: Callable[[random.Random, List[str]], Call],
+    ids: List[str],
+    total: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict:
+    """``total`` requests from ``make_call`` with ``concurrency`` in flight (closed loop)."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            method, path, body = make_call(rng, ids)
+            started = time.perf_counter()
+            try:
+                resp = await client.request(method, path, json=body)
+                await resp.aread()
+                statuses[str(resp.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+        "statuses": dict(statuses),
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed,
+        **_latency_stats(latencies),
+    }
+
+
+def model_available() -> Tuple[bool, str]:
+    """Whether the training pipeline can run inference here, and why not."""
+    from py_app_service.services.compvis import get_backend
+
+    backend = get_backend()
+    if importlib.util.find_spec("ultralytics") is None:
+        return False, "ultralytics is not installed"
+    if importlib.util.find_spec(backend.requires) is None:
+        return False, f"{backend.requires} is not installed"
+    if not os.path.exists(backend.path):
+        return False, f"no model at {backend.path}"
+    return True, ""
+
+
+async def _follow_training(client: httpx.AsyncClient, done: Dict[str, Tuple[float, str]], opened: asyncio.Event):
+    """Record when each selected project's job finished, from the training:* event stream."""
+    async with client.stream("GET", "/events", params={"topics": "training:*"}) as resp:
+        opened.set()
+        event = None
+        async for line in resp.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "job":
+                data = json.loads(line[6:])
+                if data["status"] in ("succeeded", "failed"):
+                    done[data["recordId"]] = (time.perf_counter(), data["status"])
+
+
+async def drive_training(
+    client: httpx.AsyncClient, ids: List[str], images: List[bytes], concurrency: int, timeout: float, rng: random.Random
+) -> dict:
+    """Upload ``images`` as selected projects and wait for the pipeline to train them all."""
+    done: Dict[str, Tuple[float, str]] = {}
+    uploaded: Dict[str, float] = {}
+    upload_latencies: List[float] = []
+    opened = asyncio.Event()
+    follower = asyncio.create_task(_follow_training(client, done, opened))
+    await opened.wait()
+    remaining = iter(enumerate(images))
+
+    async def worker():
+        for i, image in remaining:
+            started = time.perf_counter()
+            resp = await client.post(
+                "/selected-projects",
+                data={"project_id": rng.choice(ids)},
+                files={"beforeTrain": (f"farm_{i}.jpg", image, "image/jpeg")},
+            )
+            upload_latencies.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+            uploaded[resp.json()["id"]] = time.perf_counter()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        deadline = time.monotonic() + timeout
+        while not set(uploaded) <= set(done) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        follower.cancel()
+        await asyncio.gather(follower, return_exceptions=True)
+
+    finished = [done[record_id] for record_id in uploaded if record_id in done]
+    elapsed = (max(at for at, _ in finished) if finished else time.perf_counter()) - started
+    succeeded = sum(1 for _, status in finished if status == "succeeded")
+    return {
+        "images": len(images),
+        "concurrency": concurrency,
+        "succeeded": succeeded,
+        "failed": len(finished) - succeeded,
+        "timed_out": len(uploaded) - len(finished),
+        "seconds": elapsed,
+        "throughput_images_per_s": succeeded / elapsed if elapsed else 0.0,
+        "upload": _latency_stats(upload_latencies),
+        # Upload response to the job's succeeded/failed event
+        "end_to_end": _latency_stats([done[record_id][0] - at for record_id, at in uploaded.items() if record_id in done]),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _meta(args: argparse.Namespace) -> dict:
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key not in ("compare", "baseline", "output")},
+        # The knobs most likely to explain a difference between two runs
+        "config": {
+            name: getattr(config, name)
+            for name in (
+                "INFERENCE_BACKEND", "INFERENCE_EXECUTOR", "TRAINING_CONCURRENCY", "TRAINING_BATCH_SIZE",
+                "CACHE_BACKEND", "MIRROR_ENABLED", "PROJECTS_VALIDATE_RESPONSES",
+            )
+            if hasattr(config, name)
+        },
+    }
+
+
+async def run(args: argparse.Namespace, pocketbase_url: str, app_url: str, pid: int) -> dict:
+    rng = random.Random(args.seed)
+    results = {"meta": _meta(args), "scenarios": {}}
+    scenarios = args.scenarios.split(",")
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=app_url, timeout=60.0, limits=limits) as client, \
+            httpx.AsyncClient(base_url=pocketbase_url) as stub:
+        page = (await stub.get(
+            f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records", params={"perPage": args.projects}
+        )).json()
+        ids = [record["id"] for record in page["items"]]
+        results["meta"]["idle_rss_mb"] = _rss_kb(pid) / 1024
+        print(f"{'scenario':24s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s} {'peak RSS':>10s}")
+
+        for name in scenarios:
+            if name == "training":
+                available, reason = model_available()
+                if not available:
+                    print(f"{name:24s} skipped: {reason}")
+                    results["scenarios"][name] = {"skipped": reason}
+                    continue
+                images = [
+                    encode_jpeg(solar_farm_image(args.image_width, args.image_height, seed=args.seed + i))
+                    for i in range(args.images)
+                ]
+                with PeakRSS(pid) as rss:
+                    result = await drive_training(
+                        client, ids, images, min(args.concurrency, args.images), args.training_timeout, rng
+                    )
+                result["peak_rss_mb"] = rss.peak_mb
+                results["scenarios"][name] = result
+                print(
+                    f"{name:24s} {result['throughput_images_per_s']:7.2f}/s {result['end_to_end'].get('p50_ms', 0):9.0f} "
+                    f"{result['end_to_end'].get('p95_ms', 0):9.0f} {result['end_to_end'].get('p99_ms', 0):9.0f} "
+                    f"{result['failed'] + result['timed_out']:7d} {rss.peak_mb:7.0f} MB   (images, upload to trained)"
+                )
+                continue
+
+            make_call = SCENARIOS[name]
+            # Warm-up: first requests load the geo index, impact store, ledger and caches
+            await drive(client, make_call, ids, args.warmup, min(args.concurrency, args.warmup), rng)
+            with PeakRSS(pid) as rss:
+                result = await drive(client, make_call, ids, args.requests, args.concurrency, rng)
+            result["peak_rss_mb"] = rss.peak_mb
+            results["scenarios"][name] = result
+            print(
+                f"{name:24s} {result['throughput_rps']:9.0f} {result.get('p50_ms', 0):9.1f} {result.get('p95_ms', 0):9.1f} "
+                f"{result.get('p99_ms', 0):9.1f} {result['errors']:7d} {rss.peak_mb:7.0f} MB"
+            )
+    return results
+
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if not old or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def compare(baseline: dict, current: dict):
+    """Print each scenario's throughput, p50/p99 and peak RSS next to the baseline's."""
+    print(
+        f"comparing against {baseline['meta'].get('git_commit') or '?'} ({baseline['meta'].get('started_at')}), "
+        f"now {current['meta'].get('git_commit') or '?'}"
+    )
+    print(f"{'scenario':24s} {'metric':16s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or "skipped" in before or "skipped" in result:
+            continue
+        if name == "training":
+            metrics = [("images/s", before["throughput_images_per_s"], result["throughput_images_per_s"]),
+                       ("p50 ms", before["end_to_end"].get("p50_ms"), result["end_to_end"].get("p50_ms")),
+                       ("p99 ms", before["end_to_end"].get("p99_ms"), result["end_to_end"].get("p99_ms"))]
+        else:
+            metrics = [("req/s", before["throughput_rps"], result["throughput_rps"]),
+                       ("p50 ms", before.get("p50_ms"), result.get("p50_ms")),
+                       ("p99 ms", before.get("p99_ms"), result.get("p99_ms"))]
+        metrics.append(("peak RSS MB", before.get("peak_rss_mb"), result.get("peak_rss_mb")))
+        for metric, old, new in metrics:
+            print(f"{name:24s} {metric:16s} {old or 0:10.1f} {new or 0:10.1f} {_change(old, new):>8s}")
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join([*SCENARIOS, "training"]),
+                        help=f"comma separated, from: {', '.join([*SCENARIOS, 'training'])}")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50, help="requests per scenario before measuring")
+    parser.add_argument("--projects", type=int, default=5000, help="synthetic projects in the stub PocketBase")
+    parser.add_argument("--blocks", type=int, default=5000, help="blocks of synthetic chain in the stub indexer")
+    parser.add_argument("--pocketbase-latency", type=float, default=0.02, help="seconds per stub PocketBase read")
+    parser.add_argument("--indexer-latency", type=float, default=0.02, help="seconds per stub indexer query")
+    parser.add_argument("--images", type=int, default=16, help="synthetic images for the training scenario")
+    parser.add_argument("--image-width", type=int, default=1280)
+    parser.add_argument("--image-height", type=int, default=960)
+    parser.add_argument("--training-timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the JSON results (default: benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(_load(args.compare[0]), _load(args.compare[1]))
+        return
+    unknown = set(args.scenarios.split(",")) - {*SCENARIOS, "training"}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    os.environ.update(
+        STUB_POCKETBASE_PROJECTS=str(args.projects),
+        STUB_POCKETBASE_SEED=str(args.seed),
+        STUB_POCKETBASE_LATENCY=str(args.pocketbase_latency),
+        STUB_INDEXER_BLOCKS=str(args.blocks),
+        STUB_INDEXER_LATENCY=str(args.indexer_latency),
+    )
+    with serve("benchmarks.stub_pocketbase:app") as pocketbase_url, serve("benchmarks.stub_indexer:app") as indexer_url:
+        os.environ.update(LOADTEST_POCKETBASE_URL=pocketbase_url, LOADTEST_INDEXER_URL=indexer_url)
+        with serve_process("benchmarks.loadtest_app:app", timeout=60.0) as (app_url, proc):
+            results = asyncio.run(run(args, pocketbase_url, app_url, proc.pid))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+    if args.baseline:
+        compare(_load(args.baseline), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+The real FastAPI app, wired to the local stand-ins instead of the hosted
+services, for ``benchmarks.loadtest``:
+
+    LOADTEST_POCKETBASE_URL=http://127.0.0.1:8090 LOADTEST_INDEXER_URL=http://127.0.0.1:42069 \\
+        python -m uvicorn benchmarks.loadtest_app:app --port 8000
+
+The PocketBase and indexer clients are created with the stand-ins' URLs before
+the app's own lifespan runs (which then reuses them). The donation ledger and
+the inference result cache don't touch disk, so every run starts cold.
+"""
+import os
+from contextlib import asynccontextmanager
+
+from py_app_service.app import app
+from py_app_service.database.indexer import init_indexer
+from py_app_service.database.pocketbase import init_pocketbase
+from py_app_service.services import training
+from py_app_service.services.ledger import ledger
+
+_app_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    await init_pocketbase(base_url=os.environ["LOADTEST_POCKETBASE_URL"])
+    await init_indexer(base_url=os.environ["LOADTEST_INDEXER_URL"])
+    ledger.state_path = None
+    training.result_cache = None
+    async with _app_lifespan(app) as state:
+        yield state
+
+
+app.router.lifespan_context = _lifespan
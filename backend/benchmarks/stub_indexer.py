@@ -0,0 +1,155 @@
+"""
+Minimal stand-in for the Ponder GraphQL endpoint, for local benchmarks. It
+doesn't parse GraphQL: every query gets the same canned donations page back,
+after an optional delay that mimics the indexer's query time.
+
+Queries on ``mocKIDRTransfers`` / ``wakafMoneyOutEvents`` (what the donation
+ledger reads) are answered from a synthetic chain instead, honouring the
+``from`` (blockNumber_gt), ``after`` and ``limit`` variables. ``POST /chain/blocks``
+mines more blocks and ``POST /chain/reorg`` replaces the last few.
+
+    python -m uvicorn benchmarks.stub_indexer:app --port 42069
+"""
+import asyncio
+import bisect
+import os
+import random
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+
+app = FastAPI()
+
+# Seconds each POST takes, like a Ponder query against its database
+LATENCY = float(os.environ.get("STUB_INDEXER_LATENCY", "0.02"))
+
+# Upstream calls seen, so benchmarks can check how many the proxy let through
+counters = {"queries": 0}
+
+DONATIONS = [
+    {"id": f"0x{i:064x}", "donor": f"0x{i:040x}", "amount": str(1_000_000 * (i + 1)), "blockNumber": str(1000 + i)}
+    for i in range(50)
+]
+
+
+# Synthetic chain: STUB_INDEXER_BLOCKS blocks to start with, a few events each
+WAKAF = "0x1066756013ef4e42c9ff464a28567f78fa679d99"
+TOKEN = "0xbfea7ef2e068e017ae1ac39479e7d12a74d742f5"
+ZERO = "0x" + "0" * 40
+GENESIS_TIMESTAMP = 1_750_000_000
+BLOCK_TIME = 600
+USERS = [f"0x{0xd0 << 152 | i:040x}" for i in range(2000)]
+NAZIRS = [f"0x{0xa0 << 152 | i:040x}" for i in range(5)]
+PROJECTS = [f"0x{0xb0 << 152 | i:040x}" for i in range(200)]
+
+chain: Dict[str, List[dict]] = {"mocKIDRTransfers": [], "wakafMoneyOutEvents": []}
+head = {"block": 0, "fork": 0}
+
+
+def _mine(block: int, fork: int):
+    rng = random.Random(block * 1000 + fork)
+    timestamp = str(GENESIS_TIMESTAMP + block * BLOCK_TIME)
+    log = 0
+
+    def transfer(sender: str, to: str, value: int):
+        nonlocal log
+        chain["mocKIDRTransfers"].append(
+            {"id": f"{block}-{log}", "from": sender, "to": to, "value": str(value),
+             "blockNumber": str(block), "blockTimestamp": timestamp}
+        )
+        log += 1
+
+    for _ in range(rng.randint(1, 6)):
+        user = rng.choice(USERS)
+        roll = rng.random()
+        if roll < 0.2:
+            transfer(ZERO, user, rng.randint(1, 100) * 1_000_000)
+        elif roll < 0.7:
+            transfer(user, WAKAF, rng.randint(1, 50) * 100_000)
+        else:
+            transfer(user, rng.choice(USERS), rng.randint(1, 20) * 10_000)
+    if rng.random() < 0.3:
+        nazir, project, amount = rng.choice(NAZIRS), rng.choice(PROJECTS), rng.randint(1, 30) * 100_000
+        transfer(WAKAF, project, amount)
+        chain["wakafMoneyOutEvents"].append(
+            {"id": f"{block}-{log}", "nazir": nazir, "sendTo": project, "amount": str(amount),
+             "tokenAddress": TOKEN if rng.random() < 0.95 else ZERO, "reason": "disbursement",
+             "blockNumber": str(block), "blockTimestamp": timestamp}
+        )
+
+
+def mine(count: int):
+    for _ in range(count):
+        head["block"] += 1
+        _mine(head["block"], head["fork"])
+
+
+def reorg(depth: int):
+    """Drop the last ``depth`` blocks and mine different ones in their place."""
+    first = head["block"] - depth + 1
+    for field in chain:
+        chain[field] = [item for item in chain[field] if int(item["blockNumber"]) < first]
+    head["fork"] += 1
+    head["block"] = first - 1
+    mine(depth)
+
+
+mine(int(os.environ.get("STUB_INDEXER_BLOCKS", "1000")))
+
+
+def _event_page(field: str, variables: dict) -> dict:
+    items = chain[field]
+    blocks = [int(item["blockNumber"]) for item in items]
+    start = bisect.bisect_right(blocks, int(variables.get("from", -1)))
+    start = max(start, int(variables.get("after") or 0))
+    end = start + int(variables.get("limit", 50))
+    return {
+        "items": items[start:end],
+        "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(min(end, len(items)))},
+    }
+
+
+@app.post("/chain/blocks")
+async def chain_blocks(count: int = 1):
+    mine(count)
+    return head
+
+
+@app.post("/chain/reorg")
+async def chain_reorg(depth: int = 1):
+    reorg(depth)
+    return head
+
+
+@app.get("/chain/events")
+async def chain_events():
+    return chain
+
+
+@app.get("/")
+async def health():
+    return {"ok": True}
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.post("/stats/reset")
+async def reset():
+    counters["queries"] = 0
+    return counters
+
+
+@app.post("/")
+async def graphql(request: Request):
+    body = await request.json()
+    counters["queries"] += 1
+    await asyncio.sleep(LATENCY)
+    if "mutation" in body.get("query", ""):
+        return {"data": None, "errors": [{"message": "Mutations are not supported"}]}
+    for field in chain:
+        if field in body.get("query", ""):
+            return {"data": {field: _event_page(field, body.get("variables") or {})}}
+    return {"data": {"donations": {"items": DONATIONS}}}
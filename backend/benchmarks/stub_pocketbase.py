@@ -0,0 +1,221 @@
+"""
+Minimal in-memory stand-in for the PocketBase records API, for local benchmarks.
+
+    python -m uvicorn benchmarks.stub_pocketbase:app --port 8090
+"""
+import asyncio
+import math
+import os
+import random
+import re
+import string
+import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.datastructures import UploadFile
+
+app = FastAPI()
+
+# Seconds each record read takes, like a round trip to the hosted PocketBase
+LATENCY = float(os.environ.get("STUB_POCKETBASE_LATENCY", "0"))
+
+# Seconds each record create takes
+WRITE_LATENCY = float(os.environ.get("STUB_POCKETBASE_WRITE_LATENCY", "0"))
+
+# Record reads (list and get) and creates seen, so benchmarks can count upstream requests
+counters = {"requests": 0, "creates": 0}
+
+# The only filters understood: `id="a" || id="b" ...`, `isTrained=false`,
+# `updated >= "..."` and the `created,id` cursor of `iter_pages_after`; sort
+# only by plain fields
+_ID_FILTER_RE = re.compile(r'(?<!\w)id="((?:\\.|[^"\\])*)"')
+_UPDATED_FILTER_RE = re.compile(r'updated >= "([^"]*)"')
+_AFTER_FILTER_RE = re.compile(r'created>"([^"]*)" \|\| \(created="[^"]*" && id>"([^"]*)"\)')
+
+# {collection: {record_id: record}}
+records = {}
+
+# {(collectionId, record_id, filename): bytes}
+files = {}
+
+SEED_PROJECTS = int(os.environ.get("STUB_POCKETBASE_PROJECTS", "200"))
+
+# Seeds the synthetic projects and record ids, so runs get the same dataset
+random.seed(int(os.environ.get("STUB_POCKETBASE_SEED", "0")))
+
+
+def _new_id() -> str:
+    return "".join(random.choices(string.ascii_lowercase + string.digits, k=15))
+
+
+def _now() -> str:
+    now = time.time()
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}Z"
+
+
+def make_project(i: int) -> dict:
+    return {
+        "title": f"Synthetic Project {i}",
+        "location": {"lat": -6.2 + random.uniform(-3, 3), "lon": 106.8 + random.uniform(-8, 8)},
+        "address": f"Synthetic Address {i}",
+        "type": random.choice(["Renewable Energy", "Education Tech", "Agriculture"]),
+        "verified": True,
+        "sgds": ["7", "13"],
+        "maqasid": ["NAFS", "MAL"],
+        "imageFile": "https://example.com/image.jpg",
+        "quickMetrics": {"needed": 1_000_000_000, "allocation": "100% Waqf", "beneficiaries": 1000, "timeline": "12 Months"},
+        "metrics": {
+            "co2Yearly": 0.1, "energyMWh": 0.2, "trees": 5,
+            "jobs": {"construction": 0.05, "ops": 0.01},
+            "sroi": 3.2, "irr": 12.5, "multiplier": 4.0,
+        },
+    }
+
+
+def insert(collection: str, data: dict) -> dict:
+    record = dict(data)
+    record.setdefault("id", _new_id())
+    record.update(
+        collectionId=f"pbc_{collection}",
+        collectionName=collection,
+        created=_now(),
+        updated=_now(),
+    )
+    records.setdefault(collection, {})[record["id"]] = record
+    return record
+
+
+def seed(n_projects: int = SEED_PROJECTS):
+    records.clear()
+    files.clear()
+    for i in range(n_projects):
+        insert("projects", make_project(i))
+
+
+seed()
+
+
+@app.get("/")
+async def health():
+    return {"ok": True}
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.post("/stats/reset")
+async def reset():
+    counters["requests"] = 0
+    counters["creates"] = 0
+    return counters
+
+
+async def _count():
+    counters["requests"] += 1
+    await asyncio.sleep(LATENCY)
+
+
+@app.get("/api/collections/{collection}/records")
+async def list_records(collection: str, page: int = 1, perPage: int = 30, filter: str = "", sort: str = ""):
+    await _count()
+    items = list(records.get(collection, {}).values())
+    ids = {re.sub(r"\\(.)", r"\1", m) for m in _ID_FILTER_RE.findall(filter)}
+    if ids:
+        items = [item for item in items if item["id"] in ids]
+    if "isTrained=false" in filter:
+        items = [item for item in items if not item.get("isTrained")]
+    updated = _UPDATED_FILTER_RE.search(filter)
+    if updated:
+        items = [item for item in items if item["updated"] >= updated.group(1)]
+    after = _AFTER_FILTER_RE.search(filter)
+    if after:
+        items = [item for item in items if (item["created"], item["id"]) > after.groups()]
+    for key in reversed(sort.split(",") if sort else []):
+        items.sort(key=lambda item: item.get(key.lstrip("+-"), ""), reverse=key.startswith("-"))
+    start = (page - 1) * perPage
+    return {
+        "page": page,
+        "perPage": perPage,
+        "totalItems": len(items),
+        "totalPages": math.ceil(len(items) / perPage) if perPage else 0,
+        "items": items[start:start + perPage],
+    }
+
+
+@app.get("/api/collections/{collection}/records/{record_id}")
+async def get_record(collection: str, record_id: str):
+    await _count()
+    record = records.get(collection, {}).get(record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="The requested resource wasn't found.")
+    return record
+
+
+async def _read_body(request: Request) -> tuple:
+    """Returns ``(fields, uploads)`` for either a JSON or a multipart body."""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return await request.json(), {}
+    form = await request.form()
+    fields, uploads = {}, {}
+    for name, value in form.multi_items():
+        if isinstance(value, UploadFile):
+            uploads[name] = (value.filename or f"{name}.bin", await value.read())
+        elif value in ("true", "false"):
+            fields[name] = value == "true"
+        else:
+            fields[name] = value
+    return fields, uploads
+
+
+def _store_files(record: dict, uploads: dict):
+    for field, (filename, content) in uploads.items():
+        files[(record["collectionId"], record["id"], filename)] = content
+        record[field] = filename
+
+
+@app.post("/api/collections/{collection}/records")
+async def create_record(collection: str, request: Request):
+    counters["creates"] += 1
+    await asyncio.sleep(WRITE_LATENCY)
+    fields, uploads = await _read_body(request)
+    if fields.get("id") in records.get(collection, {}):
+        return JSONResponse(
+            {
+                "code": 400,
+                "message": "Failed to create record.",
+                "data": {"id": {"code": "validation_not_unique", "message": "Value must be unique."}},
+            },
+            status_code=400,
+        )
+    record = insert(collection, fields)
+    _store_files(record, uploads)
+    return record
+
+
+@app.patch("/api/collections/{collection}/records/{record_id}")
+async def update_record(collection: str, record_id: str, request: Request):
+    record = records.get(collection, {}).get(record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="The requested resource wasn't found.")
+    fields, uploads = await _read_body(request)
+    record.update(fields)
+    _store_files(record, uploads)
+    record["updated"] = _now()
+    return record
+
+
+@app.get("/api/files/{collection_id}/{record_id}/{filename}")
+async def get_file(collection_id: str, record_id: str, filename: str):
+    content = files.get((collection_id, record_id, filename))
+    if content is None:
+        raise HTTPException(status_code=404, detail="The requested resource wasn't found.")
+    return Response(content, media_type="application/octet-stream")
+
+
+@app.delete("/api/collections/{collection}/records/{record_id}", status_code=204)
+async def delete_record(collection: str, record_id: str):
+    if records.get(collection, {}).pop(record_id, None) is None:
+        raise HTTPException(status_code=404, detail="The requested resource wasn't found.")
@@ -0,0 +1,32 @@
+import random
+
+import cv2
+import numpy as np
+
+
+def solar_farm_image(width: int = 1280, height: int = 960, seed: int = 0) -> np.ndarray:
+    """
+    A BGR image that looks vaguely like an aerial shot of a solar farm: rows of
+    dark blue panels with light frames on a grass/soil background.
+    """
+    rng = random.Random(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = (60, 110, 90)
+    noise = np.random.default_rng(seed).integers(0, 30, size=(height, width, 1), dtype=np.uint8)
+    image += noise
+
+    panel_w, panel_h, gap = max(width // 40, 8), max(height // 60, 6), 4
+    for y in range(gap * 4, height - panel_h, panel_h + gap * 3):
+        if rng.random() < 0.15:
+            continue
+        for x in range(gap * 4, width - panel_w, panel_w + gap):
+            cv2.rectangle(image, (x, y), (x + panel_w, y + panel_h), (110, 45, 20), thickness=-1)
+            cv2.rectangle(image, (x, y), (x + panel_w, y + panel_h), (200, 200, 200), thickness=1)
+    return image
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    success, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise RuntimeError("Failed to encode synthetic image")
+    return encoded.tobytes()
@@ -1,12 +1,63 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import asyncio
-from py_app_service.routers import projects, indexer, users, selected_projects, training
-from py_app_service.services.training import process_training_job
+from py_app_service.routers import projects, indexer, ledger, events, users, selected_projects, training, cache, metrics, health
+from py_app_service.database.pocketbase import init_pocketbase, close_pocketbase
+from py_app_service.database.indexer import init_indexer, close_indexer
+from py_app_service.database.mongo import close_mongo
+from py_app_service.database.redis import close_redis
+from py_app_service.database.rabbit import close_rabbit
+from py_app_service.services.mirror import mirror_sync
+from py_app_service.services.project_feed import project_feed
+from py_app_service.services.ledger import ledger as donation_ledger
+from py_app_service.services.training_bus import training_bus
+from py_app_service.utils.limits import BodySizeLimitMiddleware
+from py_app_service.utils.metrics import MetricsMiddleware
+from py_app_service.utils.profiler import profiler
+from py_app_service.workers.training import start_training, stop_training
+from py_app_service.config import SELECTED_PROJECT_MAX_UPLOAD_BYTES, TRAINING_RUNNER
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled PocketBase client for the whole app, shared by routers and the worker
+    await init_pocketbase()
+    await init_indexer()
+    # No-op unless MIRROR_ENABLED; reads fall back to PocketBase until the first sync
+    await mirror_sync.start()
+    # No-op unless LEDGER_ENABLED. Resumes from the saved state; then one process per host
+    # follows the indexer and the rest reload its state file
+    await donation_ledger.start()
+    # No-op unless PROFILE_SLOW_REQUEST_SECONDS is set; samples this (the event loop's) thread
+    profiler.start()
+
+    # Start the training job queue and its scheduler in the background without blocking FastAPI,
+    # unless separate `python -m py_app_service.workers` processes do the training
+    if TRAINING_RUNNER == "embedded":
+        await start_training()
+        print("Worker started in the background.")
+    else:
+        # The workers' job and stage events, for /events and the training routes
+        await training_bus.start_relay()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        if TRAINING_RUNNER == "embedded":
+            await stop_training()
+        else:
+            await training_bus.stop()
+        await mirror_sync.stop()
+        await project_feed.stop()
+        await donation_ledger.stop()
+        await close_pocketbase()
+        await close_indexer()
+        close_mongo()
+        await close_redis()
+        await close_rabbit()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow all origins and methods
 app.add_middleware(
@@ -17,12 +68,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def worker_runner():
-    global worker_task  # Ensure the task can be accessed globally if needed
-    # Start the prompting_worker in the background without blocking FastAPI
-    worker_task = asyncio.create_task(process_training_job())
-    print("Worker started in the background.")
+# Reject oversized uploads before they are buffered and parsed.
+# Allow some headroom over the file limit for the multipart framing and other form fields.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={("POST", "/selected-projects"): SELECTED_PROJECT_MAX_UPLOAD_BYTES + 64 * 1024},
+)
+
+# Outermost, so measured latency includes the other middleware
+app.add_middleware(MetricsMiddleware, on_request_done=profiler.on_request_done)
 
 @app.get("/")
 async def root():
@@ -31,5 +85,10 @@ async def root():
 app.include_router(projects.router)
 app.include_router(selected_projects.router)
 app.include_router(indexer.router)
+app.include_router(ledger.router)
+app.include_router(events.router)
 app.include_router(users.router)
 app.include_router(training.router)
+app.include_router(cache.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
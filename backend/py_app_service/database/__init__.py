@@ -1 +1 @@
-from .mongo import database as mongo_instance
\ No newline at end of file
+from .mongo import get_database
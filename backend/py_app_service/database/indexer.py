@@ -0,0 +1,120 @@
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import (
+    INDEXER_BASE_URL,
+    INDEXER_TIMEOUT,
+    INDEXER_CONNECT_TIMEOUT,
+    INDEXER_MAX_CONNECTIONS,
+    INDEXER_MAX_KEEPALIVE_CONNECTIONS,
+    INDEXER_KEEPALIVE_EXPIRY,
+)
+from ..utils.metrics import time_upstream
+
+
+class IndexerError(Exception):
+    """Error from a call to the Ponder indexer. ``str(error)`` is safe to use as an HTTP detail."""
+
+    def __init__(self, detail: str, status_code: Optional[int] = None, body: str = ""):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.body = body
+
+
+class IndexerClient:
+    """
+    One long-lived ``httpx.AsyncClient`` for the Ponder GraphQL endpoint, so
+    proxied queries reuse keep-alive connections instead of opening a new one
+    each time. Keeps simple upstream counters for ``/indexer/stats``.
+    """
+
+    def __init__(
+        self,
+        base_url: str = INDEXER_BASE_URL,
+        timeout: float = INDEXER_TIMEOUT,
+        connect_timeout: float = INDEXER_CONNECT_TIMEOUT,
+        max_connections: int = INDEXER_MAX_CONNECTIONS,
+        max_keepalive_connections: int = INDEXER_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = INDEXER_KEEPALIVE_EXPIRY,
+    ):
+        self.base_url = base_url
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._client
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def query(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a GraphQL payload and return the decoded response body."""
+        self.requests += 1
+        started = time.monotonic()
+        with time_upstream("indexer", "graphql", "POST") as outcome:
+            try:
+                resp = await self._client.post(
+                    self.base_url,
+                    json=payload,
+                    headers={
+                        "accept": "application/json, multipart/mixed",
+                        "content-type": "application/json",
+                    },
+                )
+            except httpx.HTTPError as e:
+                self.errors += 1
+                raise IndexerError(f"Indexer connection error: {str(e)}") from e
+            finally:
+                self.total_seconds += time.monotonic() - started
+            outcome["status"] = resp.status_code
+
+        if resp.status_code != 200:
+            self.errors += 1
+            raise IndexerError(
+                f"Indexer error: {resp.status_code} {resp.text}", status_code=resp.status_code, body=resp.text
+            )
+        return resp.json()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": self.total_seconds * 1000 / self.requests if self.requests else 0.0,
+        }
+
+
+# App-scoped client, created and closed by the FastAPI lifespan (see app.py)
+_client: Optional[IndexerClient] = None
+
+
+async def init_indexer(**kwargs) -> IndexerClient:
+    global _client
+    if _client is None:
+        _client = IndexerClient(**kwargs)
+    return _client
+
+
+async def close_indexer():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_indexer() -> IndexerClient:
+    if _client is None:
+        raise RuntimeError("Indexer client is not initialised; call init_indexer() first")
+    return _client
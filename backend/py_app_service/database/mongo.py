@@ -1,5 +1,3 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
 from pydantic import BaseModel
 from ..config import MONGODB_URI, MONGODB_NAME
 
@@ -9,5 +7,32 @@ class Settings(BaseModel):
 
 settings = Settings(MONGO_DB_URL=MONGODB_URI, DATABASE_NAME=MONGODB_NAME)
 
-client = AsyncIOMotorClient(settings.MONGO_DB_URL)
-database = client[settings.DATABASE_NAME]
+# App-scoped Motor client, created on first use so importing this module (and
+# motor itself) stays cheap when nothing needs MongoDB
+_client = None
+
+
+def init_mongo(client=None):
+    """
+    Use ``client`` as the shared client, e.g. a ``mongomock_motor.AsyncMongoMockClient``
+    in benchmarks; by default one is created for MONGODB_URI on first use.
+    """
+    global _client
+    if client is not None:
+        _client = client
+    return get_database()
+
+
+def get_database():
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _client = AsyncIOMotorClient(settings.MONGO_DB_URL)
+    return _client[settings.DATABASE_NAME]
+
+
+def close_mongo():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,339 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, TypedDict
+from urllib.parse import quote
+
+import httpx
+
+from ..config import (
+    POCKETBASE_BASE_URL,
+    POCKETBASE_TIMEOUT,
+    POCKETBASE_CONNECT_TIMEOUT,
+    POCKETBASE_MAX_CONNECTIONS,
+    POCKETBASE_MAX_KEEPALIVE_CONNECTIONS,
+    POCKETBASE_KEEPALIVE_EXPIRY,
+    POCKETBASE_HTTP2,
+    POCKETBASE_PAGE_SIZE,
+    POCKETBASE_PAGE_CONCURRENCY,
+    POCKETBASE_FILTER_MAX_LENGTH,
+)
+from ..utils.metrics import time_upstream
+
+
+class RecordList(TypedDict):
+    page: int
+    perPage: int
+    totalItems: int
+    totalPages: int
+    items: List[Dict[str, Any]]
+
+
+class PocketBaseError(Exception):
+    """Base error for PocketBase calls. ``str(error)`` is safe to use as an HTTP detail."""
+
+    def __init__(self, detail: str, status_code: Optional[int] = None, body: str = ""):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.body = body
+
+
+class PocketBaseConnectionError(PocketBaseError):
+    pass
+
+
+class PocketBaseNotFound(PocketBaseError):
+    pass
+
+
+class PocketBaseClient:
+    """
+    Thin wrapper around one long-lived ``httpx.AsyncClient`` so every caller
+    shares the same keep-alive (or HTTP/2) connection pool to PocketBase.
+    """
+
+    def __init__(
+        self,
+        base_url: str = POCKETBASE_BASE_URL,
+        timeout: float = POCKETBASE_TIMEOUT,
+        connect_timeout: float = POCKETBASE_CONNECT_TIMEOUT,
+        max_connections: int = POCKETBASE_MAX_CONNECTIONS,
+        max_keepalive_connections: int = POCKETBASE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = POCKETBASE_KEEPALIVE_EXPIRY,
+        http2: bool = POCKETBASE_HTTP2,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._client
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def records_path(self, collection: str, record_id: Optional[str] = None) -> str:
+        path = f"/api/collections/{collection}/records"
+        if record_id is not None:
+            path = f"{path}/{record_id}"
+        return path
+
+    def file_url(self, collection_id: str, record_id: str, filename: str) -> str:
+        return f"{self.base_url}/api/files/{collection_id}/{record_id}/{filename}"
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        with time_upstream("pocketbase", _collection_for_path(path), method) as outcome:
+            try:
+                resp = await self._client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                raise PocketBaseConnectionError(f"PocketBase connection error: {str(e)}") from e
+            outcome["status"] = resp.status_code
+            return resp
+
+    async def list_records(
+        self,
+        collection: str,
+        *,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        filter: Optional[str] = None,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> RecordList:
+        params = _params(page=page, perPage=per_page, filter=filter, sort=sort, fields=fields)
+        resp = await self.request("GET", self.records_path(collection), params=params, **_timeout(timeout))
+        _raise_for_status(resp, ok=(200,))
+        return resp.json()
+
+    async def iter_pages(
+        self,
+        collection: str,
+        *,
+        per_page: int = POCKETBASE_PAGE_SIZE,
+        filter: Optional[str] = None,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+        concurrency: int = POCKETBASE_PAGE_CONCURRENCY,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield every page of a listing, in order. After the first page tells us
+        ``totalPages``, up to ``concurrency`` of the following pages are fetched
+        ahead at once, so memory stays bounded by that window.
+        """
+        query = dict(per_page=per_page, filter=filter, sort=sort, fields=fields)
+        first = await self.list_records(collection, page=1, **query)
+        yield first.get("items", [])
+
+        total_pages = first.get("totalPages", 1)
+        next_page = 2
+        window: "deque[asyncio.Task]" = deque()
+        try:
+            while next_page <= total_pages or window:
+                while next_page <= total_pages and len(window) < concurrency:
+                    window.append(asyncio.create_task(self.list_records(collection, page=next_page, **query)))
+                    next_page += 1
+                page = await window.popleft()
+                yield page.get("items", [])
+        finally:
+            for task in window:
+                task.cancel()
+            # Retrieve their results (or errors), so none is left pending or unreported
+            await asyncio.gather(*window, return_exceptions=True)
+
+    async def iter_pages_after(
+        self,
+        collection: str,
+        *,
+        per_page: int = POCKETBASE_PAGE_SIZE,
+        filter: Optional[str] = None,
+        fields: Optional[str] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield every page of a listing in ``created,id`` order, asking each time
+        for the records after the last one seen rather than for page N. Pages
+        are fetched one after another, but unlike ``iter_pages`` nothing is
+        skipped when records stop matching ``filter`` during the walk (e.g.
+        ``isTrained=false`` while training flips records to true).
+        """
+        if fields is not None:
+            fields = ",".join(dict.fromkeys([*fields.split(","), "id", "created"]))
+        cursor = None
+        while True:
+            page_filter = filter
+            if cursor is not None:
+                created, record_id = (_quote(value) for value in cursor)
+                after = f'(created>"{created}" || (created="{created}" && id>"{record_id}"))'
+                page_filter = f"({filter}) && {after}" if filter else after
+            page = await self.list_records(
+                collection, per_page=per_page, filter=page_filter, sort="created,id", fields=fields
+            )
+            items = page.get("items", [])
+            if items:
+                yield items
+            if len(items) < per_page:
+                return
+            cursor = (items[-1]["created"], items[-1]["id"])
+
+    async def iter_records(self, collection: str, *, after: bool = False, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like ``iter_pages`` (or ``iter_pages_after`` with ``after=True``) but
+        yields one record at a time.
+        """
+        pages = self.iter_pages_after(collection, **kwargs) if after else self.iter_pages(collection, **kwargs)
+        async for items in pages:
+            for item in items:
+                yield item
+
+    async def get_record(
+        self,
+        collection: str,
+        record_id: str,
+        *,
+        fields: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        params = _params(fields=fields)
+        resp = await self.request(
+            "GET", self.records_path(collection, record_id), params=params, **_timeout(timeout)
+        )
+        _raise_for_status(resp, ok=(200,))
+        return resp.json()
+
+    async def create_record(
+        self,
+        collection: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        resp = await self.request(
+            "POST",
+            self.records_path(collection),
+            json=json,
+            data=data,
+            files=files,
+            **_timeout(timeout),
+        )
+        _raise_for_status(resp, ok=(200, 201))
+        return resp.json()
+
+    async def update_record(
+        self,
+        collection: str,
+        record_id: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        resp = await self.request(
+            "PATCH",
+            self.records_path(collection, record_id),
+            json=json,
+            data=data,
+            files=files,
+            **_timeout(timeout),
+        )
+        _raise_for_status(resp, ok=(200,))
+        return resp.json()
+
+    async def delete_record(
+        self,
+        collection: str,
+        record_id: str,
+        *,
+        timeout: Optional[float] = None,
+    ) -> None:
+        resp = await self.request("DELETE", self.records_path(collection, record_id), **_timeout(timeout))
+        _raise_for_status(resp, ok=(200, 204))
+
+
+def id_filters(ids: List[str], max_length: int = POCKETBASE_FILTER_MAX_LENGTH) -> Iterator[Tuple[List[str], str]]:
+    """
+    Split ``ids`` into ``id="a" || id="b" || ...`` filters whose URL-encoded
+    length stays under ``max_length``, so each fits in one list request.
+    Yields ``(ids in the chunk, filter)``.
+    """
+    chunk: List[str] = []
+    terms: List[str] = []
+    length = 0
+    separator = len(quote(" || ", safe=""))
+    for record_id in ids:
+        term = f'id="{_quote(record_id)}"'
+        term_length = len(quote(term, safe=""))
+        if terms and length + separator + term_length > max_length:
+            yield chunk, " || ".join(terms)
+            chunk, terms, length = [], [], 0
+        length += (separator if terms else 0) + term_length
+        chunk.append(record_id)
+        terms.append(term)
+    if terms:
+        yield chunk, " || ".join(terms)
+
+
+def _quote(value: str) -> str:
+    """Escape ``value`` for a double-quoted string in a PocketBase filter."""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _collection_for_path(path: str) -> str:
+    # "/api/collections/{collection}/records/..." -> collection; file downloads -> "files"
+    parts = path.strip("/").split("/")
+    if len(parts) >= 3 and parts[:2] == ["api", "collections"]:
+        return parts[2]
+    if parts[:2] == ["api", "files"]:
+        return "files"
+    return "other"
+
+
+def _params(**kwargs) -> Dict[str, Any]:
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def _timeout(timeout: Optional[float]) -> Dict[str, Any]:
+    return {} if timeout is None else {"timeout": timeout}
+
+
+def _raise_for_status(resp: httpx.Response, ok: tuple):
+    if resp.status_code in ok:
+        return
+    if resp.status_code == 404:
+        raise PocketBaseNotFound(f"PocketBase error: {resp.text}", status_code=404, body=resp.text)
+    raise PocketBaseError(f"PocketBase error: {resp.text}", status_code=resp.status_code, body=resp.text)
+
+
+# App-scoped client, created and closed by the FastAPI lifespan (see app.py)
+_client: Optional[PocketBaseClient] = None
+
+
+async def init_pocketbase(**kwargs) -> PocketBaseClient:
+    global _client
+    if _client is None:
+        _client = PocketBaseClient(**kwargs)
+    return _client
+
+
+async def close_pocketbase():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_pocketbase() -> PocketBaseClient:
+    if _client is None:
+        raise RuntimeError("PocketBase client is not initialised; call init_pocketbase() first")
+    return _client
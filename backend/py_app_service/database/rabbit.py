@@ -0,0 +1,23 @@
+from ..config import RABBITMQ_URI
+
+# aio-pika is optional: only needed when TRAINING_QUEUE_BACKEND = "rabbitmq"
+_connection = None
+
+
+async def get_rabbit():
+    """Return the shared robust aio-pika connection, connecting on first use."""
+    global _connection
+    if _connection is None:
+        try:
+            import aio_pika
+        except ImportError as e:
+            raise RuntimeError("The 'aio-pika' package is required for the RabbitMQ job backend (pip install aio-pika)") from e
+        _connection = await aio_pika.connect_robust(RABBITMQ_URI)
+    return _connection
+
+
+async def close_rabbit():
+    global _connection
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
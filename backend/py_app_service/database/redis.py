@@ -0,0 +1,23 @@
+from ..config import REDIS_URI
+
+# redis is optional: only needed when a Redis-backed feature is enabled in config.
+_client = None
+
+
+def get_redis():
+    """Return the shared ``redis.asyncio`` client, creating it on first use."""
+    global _client
+    if _client is None:
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' package is required for Redis-backed features (pip install redis)") from e
+        _client = aioredis.from_url(REDIS_URI)
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
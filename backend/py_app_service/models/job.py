@@ -0,0 +1,64 @@
+import time
+import uuid
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    retrying = "retrying"
+    succeeded = "succeeded"
+    # The handler had nothing to do, e.g. another worker holds the record
+    skipped = "skipped"
+    failed = "failed"
+
+class Job(BaseModel):
+    id: str
+    record_id: str
+    status: JobStatus = JobStatus.queued
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    next_attempt_at: Optional[float] = None
+    # Record snapshot handed to the job handler, if the submitter already had it
+    payload: Optional[Dict[str, Any]] = Field(default=None, exclude=True)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatus.queued, JobStatus.running, JobStatus.retrying)
+
+class TrainingBatchStatus(str, Enum):
+    resolving = "resolving"
+    submitted = "submitted"
+    failed = "failed"
+
+class TrainingBatch(BaseModel):
+    """
+    Handle for one POST /training/process call with explicit ids. The records
+    are looked up in the background; once ``submitted``, ``jobs`` maps every id
+    that needs training to its job and ``skipped`` every other id to the reason.
+    """
+    id: str
+    status: TrainingBatchStatus = TrainingBatchStatus.resolving
+    record_ids: List[str]
+    duplicates: int = 0
+    jobs: Dict[str, str] = Field(default_factory=dict)
+    skipped: Dict[str, str] = Field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def new(cls, record_ids: List[str], id: Optional[str] = None) -> "TrainingBatch":
+        """A resolving batch for ``record_ids``, duplicates dropped and counted."""
+        unique = list(dict.fromkeys(record_ids))
+        now = time.time()
+        return cls(
+            id=id or uuid.uuid4().hex,
+            record_ids=unique,
+            duplicates=len(record_ids) - len(unique),
+            created_at=now,
+            updated_at=now,
+        )
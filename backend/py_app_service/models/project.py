@@ -39,9 +39,40 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     pass
 
+class ProjectBulkItem(ProjectCreate):
+    # Caller's own id for the project; importing it again reports the existing record
+    externalId: Optional[str] = None
+
 class ProjectResponse(ProjectBase):
     id: str
     collectionId: str
     collectionName: str
     created: str
     updated: str
+
+class ProjectDistanceResponse(ProjectResponse):
+    # Great-circle distance from the query point, in kilometres
+    distanceKm: float
+
+class MetricStats(BaseModel):
+    # Projects that have this metric; the rest are left out of every figure
+    count: int
+    sum: float
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # {"p50": ..., "p90": ...}
+    percentiles: Dict[str, Optional[float]]
+
+class ImpactSummary(BaseModel):
+    projects: int
+    # Keyed by metric: co2Yearly, energyMWh, trees, jobsConstruction, jobsOps,
+    # sroi, irr, multiplier, needed, beneficiaries
+    metrics: Dict[str, MetricStats]
+    sroiWeightedByFunding: Optional[float] = None
+
+class ProjectStatsResponse(BaseModel):
+    total: ImpactSummary
+    groupBy: Optional[str] = None
+    # One summary per label of groupBy
+    groups: Dict[str, ImpactSummary]
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from py_app_service.utils.cache import caches
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+@router.get("/stats")
+async def cache_stats():
+    """
+    Hit/miss/eviction counters for every response cache, for sizing TTLs and
+    CACHE_MAX_ENTRIES.
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from py_app_service.config import EVENTS_MAX_TOPICS, EVENTS_RETRY_MS
+from py_app_service.services.events import HubFull, event_hub
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("")
+async def stream_events(
+    topics: str = Query(..., description="Comma-separated topics, e.g. training:{id},ledger or training:*"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    lastEventId: Optional[str] = Query(None, description="Same as the Last-Event-ID header, for the first connect"),
+):
+    """
+    Server-Sent Events stream of the given topics, instead of polling:
+
+    - ``training:{id}``: ``job`` (queued, running, retrying, succeeded, skipped, failed)
+      and ``stage`` (download, inference, upload) events of a selected project
+    - ``ledger``: ``transfer``, ``moneyOut`` and ``rewind`` events as the donation
+      ledger folds them in from the indexer
+
+    Browsers resend ``Last-Event-ID`` when they reconnect and get the events they
+    missed. A ``resync`` event means those are no longer available and ``dropped``
+    that the client read too slowly; refetch the state in both cases.
+    """
+    wanted = list(dict.fromkeys(topic.strip() for topic in topics.split(",") if topic.strip()))
+    if not wanted:
+        raise HTTPException(status_code=400, detail="At least one topic is required")
+    if len(wanted) > EVENTS_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {EVENTS_MAX_TOPICS} topics per stream")
+    resume = last_event_id or lastEventId
+    if resume is not None:
+        try:
+            resume = int(resume)
+        except ValueError:
+            # Not one of ours: the client gets a resync
+            resume = -1
+    try:
+        subscription = event_hub.subscribe(wanted, resume)
+    except HubFull:
+        raise HTTPException(status_code=503, detail="Too many open event streams")
+
+    return StreamingResponse(
+        event_hub.stream(subscription, retry_ms=EVENTS_RETRY_MS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also when the client is gone before the body starts, and the stream's own cleanup never runs
+        background=BackgroundTask(event_hub.unsubscribe, subscription),
+    )
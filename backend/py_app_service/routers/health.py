@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+from py_app_service.services.inference import model_state, ModelStatus
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def liveness():
+    """The process is up and its event loop is responding."""
+    return {"status": "ok", "model": model_state.as_dict()}
+
+@router.get("/ready")
+async def readiness(require_model: bool = Query(False, description="Also wait for the inference model to be loaded")):
+    """
+    Ready to serve the API. The model loads in the background and isn't needed
+    for that, so it only gates readiness with ``require_model=true`` (e.g. for a
+    replica that should only take traffic once it can run inference).
+    """
+    body = {"status": "ok", "model": model_state.as_dict()}
+    if require_model and model_state.status is not ModelStatus.ready:
+        body["status"] = "model_not_ready"
+        return JSONResponse(body, status_code=503)
+    return body
@@ -1,44 +1,85 @@
+import hashlib
+import json
+import re
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import httpx
-from py_app_service.config import INDEXER_BASE_URL
+from py_app_service.config import INDEXER_CACHE_TTL
+from py_app_service.database.indexer import get_indexer, IndexerError
+from py_app_service.utils.cache import ResponseCache
 
 router = APIRouter(prefix="/indexer", tags=["indexer"])
 
+# Decoded GraphQL responses, keyed "query:{sha256 of normalised query + variables}"
+indexer_cache = ResponseCache("indexer", ttl=INDEXER_CACHE_TTL)
+
+# String literals (block strings first), comments, and everything else
+_TOKEN_RE = re.compile(r'"""(?:\\.|[^\\])*?"""|"(?:\\.|[^"\\])*"|#[^\n]*|[^"#]+')
+_OPERATION_RE = re.compile(r"^\s*(query|mutation|subscription)\b")
+
 class GraphQLRequest(BaseModel):
     query: str
     variables: dict | None = None
 
+
+def _normalise_query(query: str) -> str:
+    """Drop comments and collapse whitespace and commas outside string literals."""
+    parts = []
+    for token in _TOKEN_RE.findall(query):
+        if token.startswith('"'):
+            parts.append(token)
+        elif not token.startswith("#"):
+            parts.append(re.sub(r"\s*([{}()\[\]:=@!$|&])\s*", r"\1", " ".join(token.replace(",", " ").split())))
+    return "".join(parts).strip()
+
+
+def _is_cacheable(normalised: str) -> bool:
+    """Only plain queries are cached; mutations, subscriptions and introspection go straight upstream."""
+    unquoted = "".join(t for t in _TOKEN_RE.findall(normalised) if not t.startswith('"'))
+    if "__schema" in unquoted or "__type" in unquoted:
+        return False
+    for operation in re.split(r"(?<=})(?=\w)", unquoted):
+        match = _OPERATION_RE.match(operation)
+        if match and match.group(1) != "query":
+            return False
+    return True
+
+
+def _cache_key(normalised: str, variables: dict | None) -> str:
+    raw = json.dumps([normalised, variables or {}], sort_keys=True, separators=(",", ":"))
+    return "query:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
 @router.post("/query")
 async def proxy_indexer_query(body: GraphQLRequest):
     """
     Proxy endpoint to forward GraphQL queries to the Ponder indexer.
-    
-    Frontend can POST { "query": "...", "variables": { ... } } here instead of 
-    calling the indexer directly.
+
+    Frontend can POST { "query": "...", "variables": { ... } } here instead of
+    calling the indexer directly. Identical queries are answered from a short
+    TTL cache (about one block time) and concurrent duplicates share one
+    upstream call.
     """
     payload: dict = {"query": body.query}
     if body.variables is not None:
         payload["variables"] = body.variables
 
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.post(
-                INDEXER_BASE_URL,
-                json=payload,
-                headers={
-                    "accept": "application/json, multipart/mixed",
-                    "content-type": "application/json",
-                },
-            )
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"Indexer connection error: {str(e)}")
-
-    if resp.status_code != 200:
-        raise HTTPException(
-            status_code=502,
-            detail=f"Indexer error: {resp.status_code} {resp.text}",
-        )
-
-    return resp.json()
+    async def load():
+        try:
+            return await get_indexer().query(payload)
+        except IndexerError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+    normalised = _normalise_query(body.query)
+    if not _is_cacheable(normalised):
+        return await load()
+    # GraphQL errors come back with a 200; return them but don't cache them
+    return await indexer_cache.get_or_load(
+        _cache_key(normalised, body.variables), load, cacheable=lambda result: not result.get("errors")
+    )
+
 
+@router.get("/stats")
+async def indexer_stats():
+    """Upstream call counters and latency for the indexer, plus its response cache stats."""
+    return {"upstream": get_indexer().stats(), "cache": indexer_cache.stats()}
@@ -0,0 +1,63 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from py_app_service.database.indexer import IndexerError
+from py_app_service.services.ledger import ledger
+
+router = APIRouter(prefix="/ledger", tags=["ledger"])
+
+_DAY = r"^\d{4}-\d{2}-\d{2}$"
+
+
+async def _loaded_ledger():
+    if not ledger.enabled:
+        raise HTTPException(status_code=503, detail="The donation ledger is disabled (LEDGER_ENABLED)")
+    try:
+        await ledger.ensure_loaded()
+    except IndexerError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return ledger
+
+
+@router.get("/summary")
+async def ledger_summary():
+    """Donated and paid-out totals, the wakaf contract's balance, and the synced block range."""
+    return (await _loaded_ledger()).summary()
+
+
+@router.get("/accounts/{address}")
+async def ledger_account(address: str):
+    """Balance, donations, nazir payouts made and payouts received for one address."""
+    return (await _loaded_ledger()).account(address)
+
+
+@router.get("/projects")
+async def ledger_projects():
+    """Inflow, outflow, balance and payouts received per project, over its wallets."""
+    return (await _loaded_ledger()).projects()
+
+
+@router.get("/projects/{project_id}")
+async def ledger_project(project_id: str):
+    """Inflow, outflow, balance and payouts received over one project's wallets."""
+    if project_id not in ledger.project_wallets:
+        raise HTTPException(status_code=404, detail="No wallets configured for this project (LEDGER_PROJECT_WALLETS)")
+    return (await _loaded_ledger()).project(project_id)
+
+
+@router.get("/top/{kind}")
+async def ledger_top(
+    kind: Literal["balances", "donors", "nazirs", "recipients"],
+    limit: int = Query(20, ge=1, le=1000),
+):
+    """Largest balances, donors, nazirs (by amount paid out) or payout recipients."""
+    return (await _loaded_ledger()).top(kind, limit)
+
+
+@router.get("/daily")
+async def ledger_daily(
+    start: Optional[str] = Query(None, pattern=_DAY, description="First day, YYYY-MM-DD (UTC)"),
+    end: Optional[str] = Query(None, pattern=_DAY, description="Last day, YYYY-MM-DD (UTC)"),
+):
+    """Donated and paid-out amounts and counts, and transfer volume, per UTC day."""
+    return (await _loaded_ledger()).daily(start, end)
@@ -1,91 +1,202 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import httpx
-from py_app_service.models.project import ProjectCreate, ProjectResponse
-from py_app_service.config import POCKETBASE_BASE_URL, POCKETBASE_PROJECTS_COLLECTION
+import math
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from typing import Any, Dict, List, Optional, Tuple
+from py_app_service.models.project import ProjectCreate, ProjectResponse, ProjectDistanceResponse, ProjectStatsResponse
+from py_app_service.config import (
+    POCKETBASE_PROJECTS_COLLECTION,
+    POCKETBASE_PAGE_SIZE,
+    PROJECTS_CACHE_TTL,
+    PROJECTS_VALIDATE_RESPONSES,
+    GEO_MAX_RADIUS_KM,
+)
+from py_app_service.database.pocketbase import get_pocketbase, PocketBaseError, PocketBaseNotFound
+from py_app_service.services.geo import project_geo_index
+from py_app_service.services.impact import GROUP_FIELDS, impact_store
+from py_app_service.services.mirror import project_mirror, read_mirror
+from py_app_service.services.project_import import ProjectImport, parse_items, project_to_pb
+from py_app_service.utils.cache import ResponseCache
+from py_app_service.utils.responses import EncodedJSONResponse, dumps
+from py_app_service.utils.streaming import NDJSON_MEDIA_TYPE, DuplexStreamingResponse, ndjson_response
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Mapped responses, keyed "list:{query}" and "get:{id}"
+projects_cache = ResponseCache("projects", ttl=PROJECTS_CACHE_TTL)
+
+async def _invalidate_project_cache(id: str = None):
+    if id is not None:
+        await projects_cache.invalidate(f"get:{id}")
+    await projects_cache.invalidate_prefix("list")
+
 @router.get("", response_model=List[ProjectResponse])
-async def list_projects():
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
+async def list_projects(
+    page: Optional[int] = Query(None, ge=1),
+    perPage: Optional[int] = Query(None, ge=1, le=500),
+    filter: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated ProjectResponse fields to return"),
+    all: bool = Query(False, description="Stream every page as NDJSON instead of returning one page"),
+):
+    """
+    One page of projects (PocketBase paging, totals in X-Total-Count / X-Total-Pages),
+    or every project streamed as NDJSON with ``all=true``. Served from the MongoDB
+    mirror when it is enabled and fresh, unless there is a filter.
+    """
+    selected = _parse_fields(fields)
+    query = dict(filter=filter, sort=sort, fields=_pb_fields(selected))
+    mirror = read_mirror(project_mirror) if filter is None else None
+
+    def transform(item: dict):
+        if selected:
+            return _project_projection(item, selected)
+        return _encode_project(item)
+
+    if all:
+        pages = None
+        if mirror is not None:
+            pages = mirror.iter_pages(perPage or POCKETBASE_PAGE_SIZE, sort=sort, fields=query["fields"])
+        if pages is None:
+            pages = get_pocketbase().iter_pages(
+                POCKETBASE_PROJECTS_COLLECTION, per_page=perPage or POCKETBASE_PAGE_SIZE, **query
+            )
         try:
-            resp = await client.get(f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records")
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-        
-        if resp.status_code != 200:
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        data = resp.json().get("items", [])
-        # Parse JSON fields
-        mapped_items = [_map_pb_to_project_response(item) for item in data]
-        return mapped_items
+            return await ndjson_response(pages, transform)
+        except PocketBaseError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+    async def load():
+        result = None
+        if mirror is not None:
+            result = await mirror.list(page, perPage, sort=sort, fields=query["fields"])
+        if result is None:
+            try:
+                result = await get_pocketbase().list_records(
+                    POCKETBASE_PROJECTS_COLLECTION, page=page, per_page=perPage, **query
+                )
+            except PocketBaseError as e:
+                raise HTTPException(status_code=502, detail=str(e))
+
+        items = result.get("items", [])
+        # Cached already encoded, so a hit is served without touching the items again
+        body = dumps([transform(item) for item in items]) if selected else _encode_projects(items)
+        return {
+            "totalItems": result.get("totalItems", 0),
+            "totalPages": result.get("totalPages", 0),
+            "body": body.decode(),
+        }
+
+    cache_key = "list:" + "|".join(str(v) for v in (page, perPage, filter, sort, fields))
+    result = await projects_cache.get_or_load(cache_key, load)
+    headers = {"X-Total-Count": str(result["totalItems"]), "X-Total-Pages": str(result["totalPages"])}
+    return EncodedJSONResponse(result["body"], headers=headers)
 
 
 @router.post("", response_model=ProjectResponse)
 async def create_project(project: ProjectCreate):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        # Transform ProjectCreate to match PocketBase schema
-        # PocketBase schema provided:
-        # "location": {"lon": 0, "lat": 0}, "address": "test", "type": "test", "verified": true,
-        # "metrics": "JSON", "quickMetrics": "JSON", "sgds": "JSON", "maqasid": "JSON",
-        # "neededFund": 123, "currentFund": 123, "projectStartedAt": "...", "finishEstimationAt": "..."
-        
-        import json
-        from datetime import datetime, timedelta
-        import random
-
-        now = datetime.utcnow()
-        started_at = now - timedelta(days=random.randint(13, 30))
-        finish_at = now + timedelta(days=random.randint(180, 550))
-
-        # Map Pydantic model to PB schema
-        pb_data = {
-            "location": {
-                "lon": project.location.longitude,
-                "lat": project.location.latitude
-            },
-            "address": project.location.address,
-            "type": project.type,
-            "verified": project.verified,
-            "metrics": project.metrics.dict(), # PB JSON field
-            "quickMetrics": project.quickMetrics.dict(), # PB JSON field
-            "sgds": [str(sdg) for sdg in project.sdgs], # PB JSON field
-            "maqasid": project.maqasid, # PB JSON field
-            "neededFund": project.quickMetrics.needed, # Assuming mapping from quickMetrics
-            "currentFund": project.quickMetrics.beneficiaries, # Default or calculated?
-            "projectStartedAt": started_at.isoformat() + "Z",
-            "finishEstimationAt": finish_at.isoformat() + "Z",
-            "title": project.title,
-            "imageFile": project.image,
-        }
+    pb_data = project_to_pb(project)
+
+    try:
+        pb_record = await get_pocketbase().create_record(POCKETBASE_PROJECTS_COLLECTION, json=pb_data)
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
+    await project_mirror.upsert(pb_record)
+    project_geo_index.upsert(pb_record)
+    impact_store.upsert(pb_record)
+    await _invalidate_project_cache()
+
+    # We need to map the PB response back to ProjectResponse to satisfy the contract
+    # or update ProjectResponse to match PB structure if the frontend changes.
+    # For now, let's return the created record, assuming frontend can handle it
+    # OR map it back to ProjectResponse structure.
+    # The user query implies "update python code ... especially for get and post parsing".
+
+    # Reconstruct ProjectResponse from PB record
+    return _map_pb_to_project_response(pb_record)
+
+
+@router.post("/bulk")
+async def bulk_create_projects(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, description="Makes items without an externalId safe to retry"),
+):
+    """
+    Create many projects from an NDJSON body (``Content-Type: application/x-ndjson``,
+    one ProjectCreate per line, optionally with an ``externalId``) or a JSON array.
+    Streams back one NDJSON result per item as its batch completes, then a final
+    ``{"done": true, "counts": {...}}`` line. Re-sending the same items with the
+    same externalIds (or Idempotency-Key) reports them as ``exists`` instead of
+    creating duplicates; see services/project_import.py.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    importer = ProjectImport(idempotency_key=idempotency_key)
+
+    async def body():
         try:
-            resp = await client.post(
-                f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records",
-                json=pb_data
-            )
-        except httpx.HTTPError as e:
-             raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if resp.status_code not in (200, 201):
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        # We need to map the PB response back to ProjectResponse to satisfy the contract
-        # or update ProjectResponse to match PB structure if the frontend changes.
-        # For now, let's return the created record, assuming frontend can handle it 
-        # OR map it back to ProjectResponse structure.
-        # The user query implies "update python code ... especially for get and post parsing".
-        
-        pb_record = resp.json()
-        
-        # Reconstruct ProjectResponse from PB record
-        return _map_pb_to_project_response(pb_record)
+            async for result in importer.run(parse_items(request.stream(), ndjson)):
+                yield dumps(result) + b"\n"
+            yield dumps({"done": True, "counts": importer.counts}) + b"\n"
+        finally:
+            if importer.counts["created"]:
+                await _invalidate_project_cache()
+
+    return DuplexStreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+# ProjectResponse field -> PocketBase fields it is built from
+_PB_FIELD_SOURCES = {
+    "location": ["location", "address"],
+    "sdgs": ["sgds"],
+    "image": ["imageFile"],
+}
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return []
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in ProjectResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def _pb_fields(selected: List[str]) -> Optional[str]:
+    if not selected:
+        return None
+    return ",".join(pb for f in selected for pb in _PB_FIELD_SOURCES.get(f, [f]))
+
+def _project_projection(record: dict, selected: List[str]) -> dict:
+    data = _pb_to_project_fields(record)
+    return {f: data[f] for f in selected}
 
 def _map_pb_to_project_response(record: dict) -> ProjectResponse:
     # Map PB record back to internal model
-    return ProjectResponse(
+    return ProjectResponse(**_pb_to_project_fields(record))
+
+# Read paths validate each mapped PocketBase record once and encode it straight
+# to JSON in pydantic-core, then return the bytes as an EncodedJSONResponse, so
+# FastAPI doesn't validate and encode everything again against response_model
+# (which still documents the route). With PROJECTS_VALIDATE_RESPONSES off,
+# upstream records are trusted and the mapped dicts are encoded as they are.
+_project_adapter = TypeAdapter(ProjectResponse)
+_project_list_adapter = TypeAdapter(List[ProjectResponse])
+_distance_list_adapter = TypeAdapter(List[ProjectDistanceResponse])
+
+def _encode_project(record: dict) -> bytes:
+    fields = _pb_to_project_fields(record)
+    if not PROJECTS_VALIDATE_RESPONSES:
+        return dumps(fields)
+    return _project_adapter.dump_json(_project_adapter.validate_python(fields))
+
+def _encode_projects(records: List[dict], adapter: TypeAdapter = _project_list_adapter, extra: List[dict] = None) -> bytes:
+    fields = [_pb_to_project_fields(record) for record in records]
+    if extra is not None:
+        fields = [{**f, **e} for f, e in zip(fields, extra)]
+    if not PROJECTS_VALIDATE_RESPONSES:
+        return dumps(fields)
+    return adapter.dump_json(adapter.validate_python(fields))
+
+def _pb_to_project_fields(record: dict) -> dict:
+    return dict(
         id=record.get("id"),
         collectionId=record.get("collectionId"),
         collectionName=record.get("collectionName"),
@@ -106,54 +217,138 @@ def _map_pb_to_project_response(record: dict) -> ProjectResponse:
         metrics=record.get("metrics", {})
     )
 
+async def _loaded_geo_index():
+    if not project_geo_index.enabled:
+        raise HTTPException(status_code=503, detail="The geo index is disabled (GEO_ENABLED)")
+    try:
+        await project_geo_index.ensure_loaded()
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return project_geo_index
+
+def _distance_page(total: int, found: List[Tuple[float, Dict[str, Any]]], perPage: int) -> EncodedJSONResponse:
+    body = _encode_projects(
+        [record for _, record in found],
+        adapter=_distance_list_adapter,
+        extra=[{"distanceKm": round(distance, 3)} for distance, _ in found],
+    )
+    headers = {"X-Total-Count": str(total), "X-Total-Pages": str(math.ceil(total / perPage))}
+    return EncodedJSONResponse(body, headers=headers)
+
+@router.get("/near", response_model=List[ProjectDistanceResponse])
+async def list_projects_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=GEO_MAX_RADIUS_KM),
+    page: int = Query(1, ge=1),
+    perPage: int = Query(30, ge=1, le=500),
+):
+    """
+    Projects within ``radius_km`` of (lat, lon), nearest first, from the in-memory
+    geo index. Totals are in X-Total-Count / X-Total-Pages.
+    """
+    index = await _loaded_geo_index()
+    total, found = index.near(lat, lon, radius_km, offset=(page - 1) * perPage, limit=perPage)
+    return _distance_page(total, found, perPage)
+
+@router.get("/bbox", response_model=List[ProjectDistanceResponse])
+async def list_projects_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    page: int = Query(1, ge=1),
+    perPage: int = Query(30, ge=1, le=500),
+):
+    """
+    Projects inside the box, nearest to its centre first (``distanceKm``). A box
+    with ``min_lon > max_lon`` crosses the antimeridian.
+    """
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not be greater than max_lat")
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2 if min_lon <= max_lon else (min_lon + max_lon + 360) / 2
+    center_lon = (center_lon + 180) % 360 - 180
+    index = await _loaded_geo_index()
+    total, found = index.within_box(
+        min_lat, min_lon, max_lat, max_lon, center_lat, center_lon, offset=(page - 1) * perPage, limit=perPage
+    )
+    return _distance_page(total, found, perPage)
+
+@router.get("/stats", response_model=ProjectStatsResponse)
+async def project_stats(
+    group_by: Optional[str] = Query(None, description=f"One of {', '.join(GROUP_FIELDS)}"),
+    percentiles: str = Query("50,90", description="Comma separated percentiles, 0-100"),
+):
+    """
+    Portfolio totals, means, min/max, percentiles and funding-weighted SROI of the
+    project metrics, overall and per ``group_by`` label, from the in-memory
+    impact store rather than a scan of every project.
+    """
+    if group_by is not None and group_by not in GROUP_FIELDS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUP_FIELDS)}")
+    try:
+        qs = tuple(float(q) for q in percentiles.split(",") if q.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles must be comma separated numbers")
+    if any(not 0 <= q <= 100 for q in qs):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    if not impact_store.enabled:
+        raise HTTPException(status_code=503, detail="The impact store is disabled (IMPACT_ENABLED)")
+    try:
+        await impact_store.ensure_loaded()
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return impact_store.stats(qs, group_by)
+
 @router.get("/{id}", response_model=ProjectResponse)
 async def get_project(id: str):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
+    async def load():
+        mirror = read_mirror(project_mirror)
+        record = await mirror.get(id) if mirror is not None else None
+        if record is not None:
+            return _encode_project(record).decode()
         try:
-            resp = await client.get(f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records/{id}")
-        except httpx.HTTPError as e:
-             raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if resp.status_code == 404:
+            record = await get_pocketbase().get_record(POCKETBASE_PROJECTS_COLLECTION, id)
+        except PocketBaseNotFound:
             raise HTTPException(status_code=404, detail="Project not found")
-        if resp.status_code != 200:
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return _map_pb_to_project_response(resp.json())
+        except PocketBaseError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+        return _encode_project(record).decode()
+
+    return EncodedJSONResponse(await projects_cache.get_or_load(f"get:{id}", load))
 
 
 @router.patch("/{id}", response_model=ProjectResponse)
 async def update_project(id: str, project: ProjectCreate):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        project_data = project.dict(exclude_unset=True)
-        try:
-            resp = await client.patch(
-                f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records/{id}",
-                json=project_data
-            )
-        except httpx.HTTPError as e:
-             raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
+    # The same PocketBase field shapes as create and bulk import
+    pb_data = project_to_pb(project, new=False)
+    try:
+        record = await get_pocketbase().update_record(POCKETBASE_PROJECTS_COLLECTION, id, json=pb_data)
+    except PocketBaseNotFound:
+        raise HTTPException(status_code=404, detail="Project not found")
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
-        if resp.status_code == 404:
-            raise HTTPException(status_code=404, detail="Project not found")
-        if resp.status_code != 200:
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return resp.json()
+    await project_mirror.upsert(record)
+    project_geo_index.upsert(record)
+    impact_store.upsert(record)
+    await _invalidate_project_cache(id)
+    return _map_pb_to_project_response(record)
 
 
 @router.delete("/{id}")
 async def delete_project(id: str):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        try:
-            resp = await client.delete(f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records/{id}")
-        except httpx.HTTPError as e:
-             raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if resp.status_code == 404:
-            raise HTTPException(status_code=404, detail="Project not found")
-        if resp.status_code not in (200, 204):
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return {"message": "Project deleted successfully"}
+    try:
+        await get_pocketbase().delete_record(POCKETBASE_PROJECTS_COLLECTION, id)
+    except PocketBaseNotFound:
+        raise HTTPException(status_code=404, detail="Project not found")
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
+    await project_mirror.delete(id)
+    project_geo_index.remove(id)
+    impact_store.remove(id)
+    await _invalidate_project_cache(id)
+    return {"message": "Project deleted successfully"}
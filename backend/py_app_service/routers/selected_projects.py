@@ -1,89 +1,125 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-import httpx
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Response
 import json
 from typing import List, Optional
-from py_app_service.config import POCKETBASE_BASE_URL, POCKETBASE_PROJECTS_COLLECTION, POCKETBASE_SELECTED_PROJECTS_COLLECTION
+from py_app_service.config import POCKETBASE_PROJECTS_COLLECTION, POCKETBASE_SELECTED_PROJECTS_COLLECTION, POCKETBASE_UPLOAD_TIMEOUT, POCKETBASE_PAGE_SIZE, SELECTED_PROJECT_MAX_UPLOAD_BYTES
+from py_app_service.database.pocketbase import get_pocketbase, PocketBaseError, PocketBaseNotFound
+from py_app_service.utils.streaming import ndjson_response
+from py_app_service.services.mirror import project_mirror, selected_project_mirror, read_mirror
+from py_app_service.services.training import wake_training
 
 router = APIRouter(prefix="/selected-projects", tags=["selected-projects"])
 
 @router.get("")
-async def list_selected_projects():
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        try:
-            resp = await client.get(f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records")
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-        
-        if resp.status_code != 200:
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return resp.json().get("items", [])
+async def list_selected_projects(
+    response: Response,
+    page: Optional[int] = Query(None, ge=1),
+    perPage: Optional[int] = Query(None, ge=1, le=500),
+    filter: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    all: bool = Query(False, description="Stream every page as NDJSON instead of returning one page"),
+):
+    """
+    Query parameters are passed straight through to PocketBase. Totals are in
+    X-Total-Count / X-Total-Pages; ``all=true`` streams every page as NDJSON.
+    Served from the MongoDB mirror when it is enabled and fresh, unless there is a filter.
+    """
+    pocketbase = get_pocketbase()
+    query = dict(filter=filter, sort=sort, fields=fields)
+    mirror = read_mirror(selected_project_mirror) if filter is None else None
+    try:
+        if all:
+            pages = mirror.iter_pages(perPage or POCKETBASE_PAGE_SIZE, sort=sort, fields=fields) if mirror else None
+            if pages is None:
+                pages = pocketbase.iter_pages(
+                    POCKETBASE_SELECTED_PROJECTS_COLLECTION, per_page=perPage or POCKETBASE_PAGE_SIZE, **query
+                )
+            return await ndjson_response(pages)
+
+        result = await mirror.list(page, perPage, sort=sort, fields=fields) if mirror else None
+        if result is None:
+            result = await pocketbase.list_records(
+                POCKETBASE_SELECTED_PROJECTS_COLLECTION, page=page, per_page=perPage, **query
+            )
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    response.headers["X-Total-Count"] = str(result.get("totalItems", 0))
+    response.headers["X-Total-Pages"] = str(result.get("totalPages", 0))
+    return result.get("items", [])
 
 @router.post("")
 async def create_selected_project(
     project_id: str = Form(...),
     beforeTrain: UploadFile = File(...)
 ):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=30.0) as client:
-        # 1. Fetch project details
-        try:
-            project_resp = await client.get(f"/api/collections/{POCKETBASE_PROJECTS_COLLECTION}/records/{project_id}")
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
+    # The body size middleware already rejects oversized requests early; this
+    # catches a file that is over the limit on its own
+    if beforeTrain.size is not None and beforeTrain.size > SELECTED_PROJECT_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"beforeTrain is too large (limit {SELECTED_PROJECT_MAX_UPLOAD_BYTES} bytes)",
+        )
 
-        if project_resp.status_code == 404:
-            raise HTTPException(status_code=404, detail="Project not found")
-        if project_resp.status_code != 200:
-            raise HTTPException(status_code=502, detail=f"Error fetching project: {project_resp.text}")
-            
-        project_data = project_resp.json()
-        
-        # 2. Prepare payload for selected_project
-        # User requirement: 
-        # - field: relation record id (project_id)
-        # - beforeTrain: file object
-        # - afterTrain: null (empty)
-        # - isTrained: False
-        # - metadata: copy data from project
-        
-        # PocketBase expects multipart/form-data for file uploads
-        files = {
-            "beforeTrain": (beforeTrain.filename, await beforeTrain.read(), beforeTrain.content_type)
-        }
-        
-        data = {
-            "field": project_id,
-            "isTrained": "false", # Multipart form data bools as strings
-            "metadata": json.dumps(project_data),
-            # "afterTrain": "" # Empty string to clear/set null if needed, or omit
-        }
+    pocketbase = get_pocketbase()
 
+    # 1. Fetch project details (from the mirror if it is fresh and has it)
+    mirror = read_mirror(project_mirror)
+    project_data = await mirror.get(project_id) if mirror else None
+    if project_data is None:
         try:
-            resp = await client.post(
-                f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records",
-                data=data,
-                files=files
-            )
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-            
-        if resp.status_code not in (200, 201):
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return resp.json()
+            project_data = await pocketbase.get_record(POCKETBASE_PROJECTS_COLLECTION, project_id)
+        except PocketBaseNotFound:
+            raise HTTPException(status_code=404, detail="Project not found")
+        except PocketBaseError as e:
+            raise HTTPException(status_code=502, detail=f"Error fetching project: {e.body}")
+
+    # 2. Prepare payload for selected_project
+    # User requirement:
+    # - field: relation record id (project_id)
+    # - beforeTrain: file object
+    # - afterTrain: null (empty)
+    # - isTrained: False
+    # - metadata: copy data from project
+
+    # PocketBase expects multipart/form-data for file uploads.
+    # Pass the spooled upload file itself rather than its bytes: httpx then streams
+    # it to PocketBase in chunks instead of holding the whole image in memory.
+    await beforeTrain.seek(0)
+    files = {
+        "beforeTrain": (beforeTrain.filename, beforeTrain.file, beforeTrain.content_type)
+    }
+
+    data = {
+        "field": project_id,
+        "isTrained": "false", # Multipart form data bools as strings
+        "metadata": json.dumps(project_data),
+        # "afterTrain": "" # Empty string to clear/set null if needed, or omit
+    }
+
+    try:
+        record = await pocketbase.create_record(
+            POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+            data=data,
+            files=files,
+            timeout=POCKETBASE_UPLOAD_TIMEOUT,
+        )
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    await selected_project_mirror.upsert(record)
+    # Let training pick the new image up without waiting for the next poll, wherever it runs
+    await wake_training()
+    return record
 
 @router.delete("/{id}")
 async def delete_selected_project(id: str):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        try:
-            resp = await client.delete(f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records/{id}")
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if resp.status_code == 404:
-            raise HTTPException(status_code=404, detail="Selected project not found")
-        if resp.status_code not in (200, 204):
-             raise HTTPException(status_code=502, detail=f"PocketBase error: {resp.text}")
-             
-        return {"message": "Selected project deleted successfully"}
+    try:
+        await get_pocketbase().delete_record(POCKETBASE_SELECTED_PROJECTS_COLLECTION, id)
+    except PocketBaseNotFound:
+        raise HTTPException(status_code=404, detail="Selected project not found")
+    except PocketBaseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
+    await selected_project_mirror.delete(id)
+    return {"message": "Selected project deleted successfully"}
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List
-from py_app_service.services.training import process_training_job
+from py_app_service.config import TRAINING_RUNNER
+from py_app_service.models.job import Job, TrainingBatch
+from py_app_service.services.training import training_jobs, training_scheduler, training_pipeline, result_cache, wake_training
+from py_app_service.services.training_bus import training_bus
 
 router = APIRouter(prefix="/training", tags=["training"])
 
@@ -9,11 +12,50 @@ class TrainingRequest(BaseModel):
     ids: List[str]
 
 @router.post("/process")
-async def trigger_training_process(request: TrainingRequest, background_tasks: BackgroundTasks):
+async def trigger_training_process(request: TrainingRequest):
     """
     Trigger the training process for specific IDs or all pending ("*").
-    The process runs in the background.
+    Specific IDs return a batch handle straight away; poll
+    GET /training/batches/{id} for the job queued per record, or why it was
+    skipped (already trained, not found). "*" wakes the scheduler to scan for
+    pending projects now.
+
+    With TRAINING_RUNNER = "worker" the scan and the batch go to the separate
+    workers over the training bus, and batch and job states come back from them.
     """
-    background_tasks.add_task(process_training_job, request.ids)
-    return {"message": "Training process started in background", "targets": request.ids}
+    if not request.ids or "*" in request.ids:
+        await wake_training()
+        return {"message": "Scan for pending projects triggered", "targets": ["*"], "batch": None}
+
+    if TRAINING_RUNNER == "embedded":
+        batch = training_scheduler.submit(request.ids)
+    else:
+        try:
+            batch = await training_bus.submit(request.ids)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Could not reach the training workers: {e}")
+    return {"message": "Training batch accepted", "targets": batch.record_ids, "batch": batch}
+
+@router.get("/batches/{id}", response_model=TrainingBatch)
+async def get_training_batch(id: str):
+    batch = training_scheduler.get_batch(id) if TRAINING_RUNNER == "embedded" else training_bus.get_batch(id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+@router.get("/jobs/{id}", response_model=Job)
+async def get_training_job(id: str):
+    job = training_jobs.get(id) if TRAINING_RUNNER == "embedded" else training_bus.get_job(id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
+@router.get("/pipeline")
+async def get_training_pipeline_stats():
+    """Per-stage throughput, queue depth and in-flight counts of the training pipeline."""
+    return {
+        "runner": TRAINING_RUNNER,
+        "jobs": {"queued": training_jobs.qsize(), "running": training_jobs.running},
+        "stages": training_pipeline.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+    }
@@ -1,48 +1,37 @@
 from fastapi import APIRouter, HTTPException
-import httpx
 from py_app_service.models import UserCreate
-from py_app_service.config import POCKETBASE_BASE_URL, POCKETBASE_USERS_COLLECTION
+from py_app_service.config import POCKETBASE_USERS_COLLECTION
+from py_app_service.database.pocketbase import get_pocketbase, PocketBaseConnectionError, PocketBaseError
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/ignore-this")
 async def create_new_user(user: UserCreate):
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=10.0) as client:
-        # Check if a user with this email already exists in PocketBase
-        try:
-            filter_query = f'email="{user.email}"'
-            list_resp = await client.get(
-                f"/api/collections/{POCKETBASE_USERS_COLLECTION}/records",
-                params={"filter": filter_query},
-            )
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if list_resp.status_code != 200:
-            raise HTTPException(
-                status_code=502,
-                detail=f"PocketBase list error: {list_resp.status_code} {list_resp.text}",
-            )
-
-        list_data = list_resp.json()
-        existing_items = list_data.get("items", [])
-        if existing_items:
-            raise HTTPException(status_code=400, detail="Email already registered")
-
-        # Create new user record in PocketBase
-        try:
-            create_resp = await client.post(
-                f"/api/collections/{POCKETBASE_USERS_COLLECTION}/records",
-                json=user.dict(),
-            )
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=502, detail=f"PocketBase connection error: {str(e)}")
-
-        if create_resp.status_code not in (200, 201):
-            raise HTTPException(
-                status_code=502,
-                detail=f"PocketBase create error: {create_resp.status_code} {create_resp.text}",
-            )
-
-        return create_resp.json()
-
+    pocketbase = get_pocketbase()
+
+    # Check if a user with this email already exists in PocketBase
+    try:
+        filter_query = f'email="{user.email}"'
+        list_data = await pocketbase.list_records(POCKETBASE_USERS_COLLECTION, filter=filter_query)
+    except PocketBaseConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except PocketBaseError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"PocketBase list error: {e.status_code} {e.body}",
+        )
+
+    existing_items = list_data.get("items", [])
+    if existing_items:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Create new user record in PocketBase
+    try:
+        return await pocketbase.create_record(POCKETBASE_USERS_COLLECTION, json=user.dict())
+    except PocketBaseConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except PocketBaseError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"PocketBase create error: {e.status_code} {e.body}",
+        )
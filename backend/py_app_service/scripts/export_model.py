@@ -0,0 +1,123 @@
+"""
+Export ``services/best.pt`` to the artifacts the CPU inference backends load
+(see ``compvis.BACKENDS``):
+
+    cd backend && python -m py_app_service.scripts.export_model --formats onnx,onnx-int8,openvino
+
+- onnx:      best.onnx, dynamic batch, for onnxruntime
+- onnx-int8: best.int8.onnx, INT8 weights and activations. Static quantization
+             calibrated on ``--calibration-dir`` images when given (recommended,
+             use real aerial images), otherwise weight-only dynamic quantization.
+- openvino:  best_openvino_model/, OpenVINO IR
+
+Needs ultralytics plus onnx/onnxruntime (and openvino for that format). Check
+the result with ``python -m benchmarks.bench_inference_backends``.
+"""
+import argparse
+import glob
+import os
+
+from py_app_service.services import compvis
+
+IMGSZ = 640
+
+
+def export_onnx():
+    from ultralytics import YOLO
+
+    path = YOLO(compvis.MODEL_PATH).export(format="onnx", imgsz=IMGSZ, dynamic=True, simplify=True)
+    print(f"onnx: {path}")
+
+
+def export_openvino():
+    from ultralytics import YOLO
+
+    path = YOLO(compvis.MODEL_PATH).export(format="openvino", imgsz=IMGSZ, dynamic=True)
+    print(f"openvino: {path}")
+
+
+class _CalibrationReader:
+    """Feeds letterboxed calibration images to onnxruntime's static quantizer, one at a time."""
+
+    def __init__(self, input_name: str, paths: list):
+        self.input_name = input_name
+        self.paths = iter(paths)
+
+    def get_next(self):
+        import cv2
+        import numpy as np
+
+        for path in self.paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            # Same letterbox as ultralytics: keep aspect, pad to IMGSZ with gray
+            scale = IMGSZ / max(image.shape[:2])
+            resized = cv2.resize(image, (round(image.shape[1] * scale), round(image.shape[0] * scale)))
+            canvas = np.full((IMGSZ, IMGSZ, 3), 114, dtype=np.uint8)
+            top = (IMGSZ - resized.shape[0]) // 2
+            left = (IMGSZ - resized.shape[1]) // 2
+            canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+            tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(tensor)}
+        return None
+
+
+def export_onnx_int8(calibration_dir: str = None, calibration_images: int = 64):
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic, quantize_static
+
+    if not os.path.exists(compvis.ONNX_MODEL_PATH):
+        export_onnx()
+
+    if calibration_dir:
+        paths = sorted(
+            p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(calibration_dir, f"*.{ext}"))
+        )[:calibration_images]
+        if not paths:
+            raise SystemExit(f"No calibration images in {calibration_dir}")
+        input_name = onnxruntime.InferenceSession(
+            compvis.ONNX_MODEL_PATH, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+        quantize_static(
+            compvis.ONNX_MODEL_PATH,
+            compvis.ONNX_INT8_MODEL_PATH,
+            _CalibrationReader(input_name, paths),
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    else:
+        print("onnx-int8: no --calibration-dir, falling back to weight-only dynamic quantization")
+        quantize_dynamic(compvis.ONNX_MODEL_PATH, compvis.ONNX_INT8_MODEL_PATH, weight_type=QuantType.QUInt8)
+
+    # ultralytics reads class names, stride and task from the model metadata; keep it
+    source = onnx.load(compvis.ONNX_MODEL_PATH)
+    quantized = onnx.load(compvis.ONNX_INT8_MODEL_PATH)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, compvis.ONNX_INT8_MODEL_PATH)
+    print(f"onnx-int8: {compvis.ONNX_INT8_MODEL_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default="onnx,onnx-int8", help="comma separated: onnx, onnx-int8, openvino")
+    parser.add_argument("--calibration-dir", help="images for static INT8 calibration")
+    parser.add_argument("--calibration-images", type=int, default=64)
+    args = parser.parse_args()
+
+    for name in args.formats.split(","):
+        if name == "onnx":
+            export_onnx()
+        elif name == "onnx-int8":
+            export_onnx_int8(args.calibration_dir, args.calibration_images)
+        elif name == "openvino":
+            export_openvino()
+        else:
+            raise SystemExit(f"Unknown format: {name} (choose from onnx, onnx-int8, openvino)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import httpx
 import asyncio
 import json
+import re
+import sys
 
 # Project Data to Seed
 projects_data = [
@@ -92,20 +94,61 @@ projects_data = [
 
 BACKEND_URL = "http://localhost:8000" # Assuming backend is running locally
 
-async def seed_projects():
-    print("Seeding projects...")
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for project in projects_data:
-            try:
-                print(f"Creating project: {project['title']}")
-                resp = await client.post(f"{BACKEND_URL}/projects", json=project)
-                if resp.status_code in (200, 201):
-                    print(f"Successfully created: {project['title']}")
+
+def _external_id(project: dict) -> str:
+    # Stable per project, so re-running the seed doesn't create duplicates
+    return "seed-" + re.sub(r"[^a-z0-9]+", "-", project["title"].lower()).strip("-")
+
+
+async def _ndjson_lines(projects):
+    # An AsyncClient streams only async iterables
+    for project in projects:
+        yield json.dumps({"externalId": _external_id(project), **project}).encode() + b"\n"
+
+
+async def seed_projects(projects=projects_data, backend_url: str = BACKEND_URL, transport=None):
+    """
+    Create ``projects`` in one POST /projects/bulk call, printing the result of
+    each. ``transport`` is handed to httpx, e.g. to call an app in-process.
+    """
+    print(f"Seeding {len(projects)} projects...")
+    counts = {}
+    async with httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(30.0, read=None)) as client:
+        async with client.stream(
+            "POST",
+            f"{backend_url}/projects/bulk",
+            content=_ndjson_lines(projects),
+            headers={"Content-Type": "application/x-ndjson"},
+        ) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                print(f"Bulk import failed: {resp.status_code} - {resp.text}")
+                return counts
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                result = json.loads(line)
+                if result.get("done"):
+                    counts = result["counts"]
+                    continue
+                title = projects[result["index"]]["title"]
+                if result["status"] in ("created", "exists"):
+                    print(f"{result['status'].capitalize()}: {title} ({result['id']})")
                 else:
-                    print(f"Failed to create {project['title']}: {resp.status_code} - {resp.text}")
-            except Exception as e:
-                print(f"Error creating {project['title']}: {str(e)}")
+                    print(f"Failed to create {title}: {result['status']} - {result.get('error')}")
+    print(f"Done: {counts}")
+    return counts
 
-if __name__ == "__main__":
-    asyncio.run(seed_projects())
 
+def _load(path: str) -> list:
+    # A JSON array or NDJSON file of ProjectCreate objects
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+if __name__ == "__main__":
+    # python -m py_app_service.scripts.seed_projects [projects.json|projects.ndjson]
+    asyncio.run(seed_projects(_load(sys.argv[1]) if len(sys.argv) > 1 else projects_data))
@@ -0,0 +1,227 @@
+import abc
+import asyncio
+import fcntl
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from py_app_service.config import TRAINING_CLAIM_BACKEND, TRAINING_CLAIM_DIR, TRAINING_CLAIM_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class Claims(abc.ABC):
+    """
+    Exclusive, expiring claims on keys (selected_project record ids), so that
+    several training processes can split one backlog without training a record
+    twice. ``claim(key)`` yields whether this process got the key; while it is
+    held, the claim is renewed every third of ``ttl`` so long jobs keep it, and
+    a process that dies loses it when the ttl runs out (or straight away for
+    file claims).
+
+    ``shared`` tells whether other processes can see these claims at all; if
+    they can, a record snapshot taken before claiming may already be stale.
+    """
+
+    shared = True
+
+    def __init__(self, ttl: float = TRAINING_CLAIM_TTL):
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @abc.abstractmethod
+    async def acquire(self, key: str) -> bool:
+        ...
+
+    async def renew(self, key: str) -> bool:
+        return True
+
+    @abc.abstractmethod
+    async def release(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    async def is_claimed(self, key: str) -> bool:
+        """
+        Whether some process (this one included) seems to hold ``key``: a cheap
+        check that never takes the claim, so it can't make a concurrent
+        ``acquire`` fail. Only ``acquire`` is authoritative.
+        """
+
+    @asynccontextmanager
+    async def claim(self, key: str) -> AsyncIterator[bool]:
+        if not await self.acquire(key):
+            yield False
+            return
+        keeper = asyncio.create_task(self._keep(key))
+        try:
+            yield True
+        finally:
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+            try:
+                await self.release(key)
+            except Exception as e:
+                # It expires on its own
+                logger.warning(f"Could not release claim on {key}: {e}")
+
+    async def _keep(self, key: str):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                if not await self.renew(key):
+                    logger.warning(f"Lost the claim on {key}; another worker may pick it up")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew claim on {key}: {e}")
+
+
+class MemoryClaims(Claims):
+    """Claims within this process only: enough when a single process trains."""
+
+    shared = False
+
+    def __init__(self, ttl: float = TRAINING_CLAIM_TTL):
+        super().__init__(ttl)
+        self._held: set = set()
+
+    async def acquire(self, key: str) -> bool:
+        if key in self._held:
+            return False
+        self._held.add(key)
+        return True
+
+    async def release(self, key: str):
+        self._held.discard(key)
+
+    async def is_claimed(self, key: str) -> bool:
+        return key in self._held
+
+
+class FileClaims(Claims):
+    """
+    ``flock``-ed files in ``directory``, for processes on one host (e.g.
+    ``uvicorn --workers N``, or worker containers sharing the directory). The
+    kernel drops the lock when its process dies, so ``acquire`` needs no expiry.
+
+    ``is_claimed`` only looks at the file: the holder touches it on every
+    renewal, so a file left behind by a dead process stops counting once it
+    is ``ttl`` old.
+    """
+
+    def __init__(self, directory: str = TRAINING_CLAIM_DIR, ttl: float = TRAINING_CLAIM_TTL):
+        super().__init__(ttl)
+        self.directory = directory
+        self._fds: Dict[str, int] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".lock")
+
+    def _try_lock(self, path: str):
+        """An fd holding the lock on ``path``, or None if another process holds it."""
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            try:
+                # The holder before us may have unlinked the file after we opened it:
+                # a lock on that orphaned inode would exclude nobody
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    async def acquire(self, key: str) -> bool:
+        if key in self._fds:
+            return False
+        fd = self._try_lock(self._path(key))
+        if fd is None:
+            return False
+        os.write(fd, self.owner.encode())
+        self._fds[key] = fd
+        return True
+
+    async def renew(self, key: str) -> bool:
+        fd = self._fds.get(key)
+        if fd is None:
+            return False
+        os.utime(fd)
+        return True
+
+    async def release(self, key: str):
+        fd = self._fds.pop(key, None)
+        if fd is None:
+            return
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+    async def is_claimed(self, key: str) -> bool:
+        if key in self._fds:
+            return True
+        try:
+            return time.time() - os.stat(self._path(key)).st_mtime < self.ttl
+        except FileNotFoundError:
+            return False
+
+
+# Only touch the key if this process still owns it
+_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+  return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+  return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisClaims(Claims):
+    """``SET NX PX`` keys on the Redis from docker-compose, for workers on any number of hosts."""
+
+    def __init__(self, prefix: str = "claims:", ttl: float = TRAINING_CLAIM_TTL):
+        super().__init__(ttl)
+        self.prefix = prefix
+
+    def _redis(self):
+        from py_app_service.database.redis import get_redis
+
+        return get_redis()
+
+    async def acquire(self, key: str) -> bool:
+        return bool(await self._redis().set(self.prefix + key, self.owner, nx=True, px=int(self.ttl * 1000)))
+
+    async def renew(self, key: str) -> bool:
+        return bool(await self._redis().eval(_RENEW_SCRIPT, 1, self.prefix + key, self.owner, int(self.ttl * 1000)))
+
+    async def release(self, key: str):
+        await self._redis().eval(_RELEASE_SCRIPT, 1, self.prefix + key, self.owner)
+
+    async def is_claimed(self, key: str) -> bool:
+        return bool(await self._redis().exists(self.prefix + key))
+
+
+def create_claims(backend: str = TRAINING_CLAIM_BACKEND) -> Claims:
+    if backend == "memory":
+        return MemoryClaims()
+    if backend == "file":
+        return FileClaims()
+    if backend == "redis":
+        return RedisClaims()
+    raise ValueError(f"Unknown claim backend: {backend}")
@@ -1,64 +1,514 @@
 # simpan sebagai: solar_panel_predict.py
 # atau langsung taruh di file utils/inference.py
 
-from ultralytics import YOLO
-import cv2
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, TYPE_CHECKING
 
 import os
+import hashlib
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from py_app_service.config import (
+    INFERENCE_DECODE_TARGET_SIZE,
+    INFERENCE_BACKEND,
+    INFERENCE_TILE_SIZE,
+    INFERENCE_TILE_OVERLAP,
+    INFERENCE_TILE_MIN_SIDE,
+    INFERENCE_TILE_MERGE_THRESHOLD,
+)
+from py_app_service.services.predictions import Predictions, format_predictions
+
+# cv2 dan ultralytics (yang ikut menarik torch) di-import di dalam fungsi yang
+# memakainya, supaya import app / router tidak ikut memuat library berat ini.
+# Yang bayar cuma worker inference, saat inference pertama atau warm-up.
+if TYPE_CHECKING:
+    from ultralytics import YOLO
 
 # GANTI PATH INI SESUAI LETAK best.pt DI SERVER / LOCAL
 # Use absolute path relative to this file to avoid CWD issues
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "best.pt")
 # Kalau nanti di server Linux: "/home/user/models/best.pt"
 
-# Load model sekali di awal (biar cepet pas dipanggil berkali-kali)
-model = YOLO(MODEL_PATH)
+# Artifact hasil export dari best.pt (lihat scripts/export_model.py)
+ONNX_MODEL_PATH = os.path.join(os.path.dirname(__file__), "best.onnx")
+ONNX_INT8_MODEL_PATH = os.path.join(os.path.dirname(__file__), "best.int8.onnx")
+OPENVINO_MODEL_DIR = os.path.join(os.path.dirname(__file__), "best_openvino_model")
+
+
+@dataclass(frozen=True)
+class InferenceBackend:
+    """
+    Satu cara menjalankan model segmentasi. Semua backend di-load lewat ultralytics
+    (AutoBackend memilih runtime dari format file), jadi pre/post-processing, NMS,
+    mask dan `result.plot()` sama persis; yang beda cuma runtime forward pass-nya.
+    """
+    name: str
+    path: str
+    # Modul Python yang dibutuhkan runtime ini, untuk pesan error yang jelas
+    requires: str
+    # Dibuat dari best.pt oleh scripts/export_model.py (torch memakai best.pt langsung)
+    exported: bool = True
+
+    def load(self) -> "YOLO":
+        if not os.path.exists(self.path):
+            if not self.exported:
+                raise FileNotFoundError(
+                    f"Model untuk backend '{self.name}' tidak ada di {self.path}; "
+                    f"taruh best.pt hasil training di sana (MODEL_PATH di services/compvis.py)"
+                )
+            raise FileNotFoundError(
+                f"Model untuk backend '{self.name}' tidak ada di {self.path}; "
+                f"buat dulu dari best.pt dengan: python -m py_app_service.scripts.export_model --formats {self.name}"
+            )
+        try:
+            __import__(self.requires)
+        except ImportError as e:
+            raise RuntimeError(f"Backend '{self.name}' butuh package '{self.requires}' (pip install {self.requires})") from e
+        from ultralytics import YOLO
+        return YOLO(self.path, task="segment")
+
+
+BACKENDS: Dict[str, InferenceBackend] = {
+    # PyTorch, best.pt apa adanya
+    "torch": InferenceBackend("torch", MODEL_PATH, "torch", exported=False),
+    # ONNX di onnxruntime CPUExecutionProvider
+    "onnx": InferenceBackend("onnx", ONNX_MODEL_PATH, "onnxruntime"),
+    # ONNX dengan weight INT8 (quantization onnxruntime)
+    "onnx-int8": InferenceBackend("onnx-int8", ONNX_INT8_MODEL_PATH, "onnxruntime"),
+    # OpenVINO IR, biasanya paling cepat di CPU Intel
+    "openvino": InferenceBackend("openvino", OPENVINO_MODEL_DIR, "openvino"),
+}
+
+
+def get_backend(name: Optional[str] = None) -> InferenceBackend:
+    name = name or INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (pilihan: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+
+# Model dimuat sekali per worker thread / proses inference (lihat services/inference.py),
+# karena satu instance YOLO tidak aman dipakai beberapa thread sekaligus
+_local = threading.local()
+
+def load_model(backend: Optional[str] = None) -> "YOLO":
+    backend = get_backend(backend)
+    models = getattr(_local, "models", None)
+    if models is None:
+        models = _local.models = {}
+    model = models.get(backend.name)
+    if model is None:
+        model = models[backend.name] = backend.load()
+    return model
+
+
+def warm_up() -> str:
+    """
+    Muat model di worker ini lalu jalankan satu forward pass kosong, supaya setup
+    predictor ultralytics (fuse layer, alokasi memori) tidak dibayar request pertama.
+    Return checksum weights (bukan model-nya, supaya hasilnya bisa dikirim balik dari process pool).
+    """
+    load_model()(np.zeros((640, 640, 3), dtype=np.uint8), imgsz=640, verbose=False)
+    return model_checksum()
+
+@lru_cache(maxsize=None)
+def model_checksum(path: Optional[str] = None) -> str:
+    """
+    SHA-256 file weights backend yang aktif, dipakai sebagai bagian key cache hasil
+    inference. Untuk model berbentuk folder (OpenVINO) semua file di dalamnya ikut di-hash.
+    """
+    path = path or get_backend().path
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    digest = hashlib.sha256()
+    for file in files:
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# JPEG start-of-frame markers (SOF0..SOF15 minus DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_REDUCED_FLAGS = ((8, "IMREAD_REDUCED_COLOR_8"), (4, "IMREAD_REDUCED_COLOR_4"), (2, "IMREAD_REDUCED_COLOR_2"))
+
+
+def _jpeg_size(buf) -> Optional[Tuple[int, int]]:
+    """(width, height) dari header JPEG tanpa decode, None kalau bukan JPEG / tidak ketemu."""
+    data = memoryview(buf)
+    if bytes(data[:2]) != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # fill byte / marker tanpa payload
+            i += 1 if marker == 0xFF else 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        i += 2 + length
+    return None
+
+
+def decode_image(buf, target_size: int = INFERENCE_DECODE_TARGET_SIZE) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Decode langsung dari buffer (bytes / bytearray / memoryview) tanpa copy tambahan.
+    Kalau `target_size` > 0 dan gambarnya JPEG besar, decode pakai skala 1/2, 1/4 atau 1/8
+    (libjpeg scaled decoding, jauh lebih hemat memori) selama sisi panjang masih >= target_size.
+    Output: (image BGR atau None, faktor skala yang dipakai)
+    """
+    import cv2
+
+    array = np.frombuffer(buf, dtype=np.uint8)
+    if target_size > 0:
+        size = _jpeg_size(buf)
+        if size is not None:
+            for factor, flag in _REDUCED_FLAGS:
+                if max(size) // factor >= target_size:
+                    return cv2.imdecode(array, getattr(cv2, flag)), factor
+    return cv2.imdecode(array, cv2.IMREAD_COLOR), 1
+
+
+def _scale_predictions(predictions: List[Dict], factor: int) -> List[Dict]:
+    # Kembalikan koordinat ke ukuran gambar asli setelah decode yang di-downscale
+    if factor == 1:
+        return predictions
+    for pred in predictions:
+        pred["bbox"] = pred["bbox"] * factor
+        pred["polygon"] = pred["polygon"] * factor
+    return predictions
+
+
+def _result_to_predictions(result) -> List[Dict]:
+    """
+    Prediksi "raw" (lihat services/predictions.py): array numpy langsung dari tensor
+    hasil YOLO, tanpa ubah tiap titik polygon jadi list Python. Konversi ke format
+    output (verbose / compact) baru dilakukan sekali di akhir, lewat `format_predictions`.
+    """
+    # Tanpa mask (bukan model segmentasi) tidak ada prediksi, sama seperti dulu
+    if result.boxes is None or result.masks is None:
+        return []
+    boxes = result.boxes.xyxy.cpu().numpy().astype(np.int32)   # [x1, y1, x2, y2]
+    confidences = result.boxes.conf.cpu().numpy()
+    # masks.xy = list array (K, 2) titik polygon per deteksi
+    return [
+        {"confidence": float(confidence), "bbox": box, "polygon": polygon}
+        for confidence, box, polygon in zip(confidences, boxes, result.masks.xy)
+    ]
+
+
+Timings = Dict[str, List[float]]
+
+
+def _timed(timings: Optional[Timings], step: str, started: float):
+    if timings is not None:
+        timings.setdefault(step, []).append(time.perf_counter() - started)
+
+
+def predict_solar_panel_batch(
+    images: List[np.ndarray],
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45,
+    timings: Optional[Timings] = None,
+    backend: Optional[str] = None,
+    tile_size: Optional[int] = None,
+    output_format: Optional[str] = None,
+) -> List[Tuple[np.ndarray, Predictions]]:
+    """
+    Input:  images = list numpy array BGR (ukuran boleh beda-beda)
+    Output: list (annotated_image, predictions) per gambar, urutannya sama dengan input
+
+    Tiap potongan `batch_size` gambar jalan dalam satu forward pass. Ultralytics
+    me-letterbox semua gambar di batch ke imgsz=640 sebelum di-stack jadi satu tensor.
+    Kalau `timings` diisi dict, durasi tiap forward pass ("inference") dan tiap
+    plot ("plot") ditambahkan ke situ dalam detik. `backend` default-nya INFERENCE_BACKEND.
+
+    Kalau tiling aktif (`tile_size`, default INFERENCE_TILE_SIZE, > 0), gambar yang sisi
+    panjangnya lebih dari INFERENCE_TILE_MIN_SIDE diproses per tile lewat
+    `predict_solar_panel_tiled`, sisanya tetap utuh seperti biasa.
+
+    `output_format` (default PREDICTION_FORMAT): "verbose", "compact" atau "raw"
+    (array numpy, lihat services/predictions.py).
+    """
+    tile_size = INFERENCE_TILE_SIZE if tile_size is None else tile_size
+    tiled = [tile_size > 0 and max(image.shape[:2]) > INFERENCE_TILE_MIN_SIDE for image in images]
+    if not any(tiled):
+        outputs = _predict_whole(images, batch_size, conf_threshold, iou_threshold, timings, backend)
+        return _format_outputs(images, outputs, output_format)
+
+    outputs: List[Tuple[np.ndarray, List[Dict]]] = [None] * len(images)
+    whole = [i for i, t in enumerate(tiled) if not t]
+    results = _predict_whole([images[i] for i in whole], batch_size, conf_threshold, iou_threshold, timings, backend)
+    for i, output in zip(whole, results):
+        outputs[i] = output
+    for i in (i for i, t in enumerate(tiled) if t):
+        outputs[i] = predict_solar_panel_tiled(
+            images[i], tile_size, INFERENCE_TILE_OVERLAP, batch_size, conf_threshold, iou_threshold,
+            timings=timings, backend=backend, output_format="raw",
+        )
+    return _format_outputs(images, outputs, output_format)
+
+
+def _format_outputs(images: List[np.ndarray], outputs, output_format: Optional[str]):
+    return [
+        (annotated_image, format_predictions(predictions, (image.shape[1], image.shape[0]), output_format))
+        for image, (annotated_image, predictions) in zip(images, outputs)
+    ]
+
+
+def _predict_whole(
+    images: List[np.ndarray],
+    batch_size: int,
+    conf_threshold: float,
+    iou_threshold: float,
+    timings: Optional[Timings],
+    backend: Optional[str],
+) -> List[Tuple[np.ndarray, List[Dict]]]:
+    outputs = []
+    for start in range(0, len(images), batch_size):
+        started = time.perf_counter()
+        results = load_model(backend)(
+            images[start:start + batch_size],
+            imgsz=640,
+            conf=conf_threshold,
+            iou=iou_threshold,
+            verbose=False
+        )
+        _timed(timings, "inference", started)
+        for result in results:
+            # Gambar hasil dengan mask + box (warna cantik), langsung BGR
+            started = time.perf_counter()
+            annotated_image = result.plot()
+            _timed(timings, "plot", started)
+            outputs.append((annotated_image, _result_to_predictions(result)))
+    return outputs
+
+
+def tile_origins(width: int, height: int, tile_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Pojok kiri-atas (x, y) tiap tile, bergeser `tile_size - overlap` piksel.
+    Tile terakhir di tiap baris / kolom ditempel ke tepi gambar supaya tidak ada
+    tile yang keluar dari gambar.
+    """
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        step = max(tile_size - overlap, 1)
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y) for y in starts(height) for x in starts(width)]
+
+
+def predict_solar_panel_tiled(
+    image: np.ndarray,
+    tile_size: int = INFERENCE_TILE_SIZE,
+    overlap: int = INFERENCE_TILE_OVERLAP,
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45,
+    merge_threshold: float = INFERENCE_TILE_MERGE_THRESHOLD,
+    timings: Optional[Timings] = None,
+    backend: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> Tuple[np.ndarray, Predictions]:
+    """
+    Inference per tile untuk gambar udara yang besar, supaya panel kecil tidak hilang
+    karena gambar di-downscale ke 640.
+
+    Tile (view numpy, tanpa copy) dijalankan per `batch_size` sekaligus, jadi memori
+    cuma sebesar satu batch tile berapapun ukuran gambarnya. bbox dan polygon digeser
+    ke koordinat global, lalu deteksi ganda di area overlap digabung dengan NMS
+    (lihat `merge_tile_predictions`). Gambar anotasi digambar ulang dari hasil gabungan.
+    Output sama seperti `predict_solar_panel`, dengan `output_format` seperti di
+    `predict_solar_panel_batch`.
+    """
+    height, width = image.shape[:2]
+    origins = tile_origins(width, height, tile_size, overlap)
+    predictions: List[Dict] = []
+    for start in range(0, len(origins), batch_size):
+        chunk = origins[start:start + batch_size]
+        tiles = [image[y:y + tile_size, x:x + tile_size] for x, y in chunk]
+        started = time.perf_counter()
+        results = load_model(backend)(tiles, imgsz=tile_size, conf=conf_threshold, iou=iou_threshold, verbose=False)
+        _timed(timings, "inference", started)
+        for (x, y), tile, result in zip(chunk, tiles, results):
+            tile_h, tile_w = tile.shape[:2]
+            for pred in _result_to_predictions(result):
+                x1, y1, x2, y2 = pred["bbox"]
+                # Menyentuh tepi tile yang bukan tepi gambar: kemungkinan panel-nya terpotong
+                pred["_cut"] = (
+                    (x1 <= 1 and x > 0) or (y1 <= 1 and y > 0)
+                    or (x2 >= tile_w - 2 and x + tile_w < width) or (y2 >= tile_h - 2 and y + tile_h < height)
+                )
+                pred["bbox"] = pred["bbox"] + np.array([x, y, x, y], dtype=np.int32)
+                pred["polygon"] = pred["polygon"] + np.array([x, y], dtype=np.float32)
+                predictions.append(pred)
+
+    predictions = merge_tile_predictions(predictions, merge_threshold)
+    started = time.perf_counter()
+    annotated_image = plot_predictions(image, predictions)
+    _timed(timings, "plot", started)
+    return annotated_image, format_predictions(predictions, (width, height), output_format)
+
+
+def merge_tile_predictions(predictions: List[Dict], threshold: float = INFERENCE_TILE_MERGE_THRESHOLD) -> List[Dict]:
+    """
+    NMS lintas tile. Overlap diukur sebagai intersection / luas box yang lebih kecil,
+    bukan IoU biasa, supaya potongan panel di tepi tile (box kecil di dalam box panel
+    utuh) ikut terhapus. Deteksi yang tidak terpotong tepi tile menang duluan,
+    baru setelah itu confidence tertinggi.
+    """
+    if not predictions:
+        return predictions
+    boxes = np.array([p["bbox"] for p in predictions], dtype=np.float32)
+    confidences = np.array([p["confidence"] for p in predictions], dtype=np.float32)
+    cut = np.array([p.get("_cut", False) for p in predictions], dtype=bool)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    # np.lexsort: key terakhir paling utama -> tidak terpotong dulu, lalu confidence turun
+    order = np.lexsort((-confidences, cut))
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        inter_h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        order = rest[inter_w * inter_h / smaller <= threshold]
+
+    merged = []
+    for i in sorted(keep):
+        pred = predictions[i]
+        pred.pop("_cut", None)
+        merged.append(pred)
+    return merged
+
+
+def plot_predictions(image: np.ndarray, predictions: List[Dict], color: Tuple[int, int, int] = (255, 56, 56)) -> np.ndarray:
+    """Gambar mask (semi transparan) + box + confidence di atas copy `image`, BGR."""
+    import cv2
+
+    annotated = image.copy()
+    polygons = [np.round(np.asarray(p["polygon"])).astype(np.int32) for p in predictions if len(p["polygon"])]
+    if polygons:
+        overlay = annotated.copy()
+        cv2.fillPoly(overlay, polygons, color)
+        cv2.addWeighted(overlay, 0.4, annotated, 0.6, 0, dst=annotated)
+    thickness = max(round(sum(image.shape[:2]) / 2 * 0.002), 2)
+    for pred in predictions:
+        x1, y1, x2, y2 = (int(v) for v in pred["bbox"])
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness)
+        cv2.putText(
+            annotated, f"{pred['confidence']:.2f}", (x1, max(y1 - 4, 12)),
+            cv2.FONT_HERSHEY_SIMPLEX, thickness / 3, color, max(thickness - 1, 1),
+        )
+    return annotated
+
 
 def predict_solar_panel(
     image: np.ndarray, 
     conf_threshold: float = 0.25,
     iou_threshold: float = 0.45
-) -> Tuple[np.ndarray, List[Dict]]:
+) -> Tuple[np.ndarray, Predictions]:
     """
     Input:  image = numpy array (BGR dari cv2.imread atau dari bytes)
     Output: 
         - annotated_image  = gambar dengan mask + bounding box
         - predictions      = list of dict berisi koordinat polygon + bbox + confidence
+                             (format PREDICTION_FORMAT, lihat services/predictions.py)
+    """
+    return predict_solar_panel_batch([image], 1, conf_threshold, iou_threshold)[0]
+
+
+def _encode_jpeg(image: np.ndarray) -> Optional[bytes]:
+    import cv2
+
+    success, encoded_image = cv2.imencode(".jpg", image)
+    return encoded_image.tobytes() if success else None
+
+
+def predict_encoded(
+    image_bytes,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45
+) -> Tuple[Optional[bytes], Predictions]:
+    """
+    Versi end-to-end untuk dijalankan di inference executor:
+    decode bytes -> inference -> plot -> encode JPEG.
+    Output: (jpeg_bytes atau None kalau gambar tidak bisa di-decode / di-encode, predictions)
+    """
+    return predict_encoded_batch([image_bytes], 1, conf_threshold, iou_threshold)[0]
+
+
+def predict_encoded_batch(
+    images_bytes: List,
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45
+) -> List[Tuple[Optional[bytes], Predictions]]:
+    """
+    Sama seperti `predict_encoded` tapi untuk banyak gambar sekaligus.
+    Gambar yang gagal di-decode dapat (None, []) di posisinya, sisanya tetap diproses.
+    """
+    return predict_encoded_batch_timed(images_bytes, batch_size, conf_threshold, iou_threshold)[0]
+
+
+def predict_encoded_batch_timed(
+    images_bytes: List,
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45
+) -> Tuple[List[Tuple[Optional[bytes], Predictions]], Timings]:
     """
-    # Inference
-    results = model(
-        image, 
-        imgsz=640, 
-        conf=conf_threshold, 
-        iou=iou_threshold,
-        verbose=False
-    )[0]
-
-    # Gambar hasil dengan mask + box (warna cantik)
-    annotated_image = results.plot()  # langsung BGR
-
-    # Ambil data koordinat (untuk backend proses lebih lanjut)
-    predictions = []
-    if results.boxes is not None:
-        for box, mask in zip(results.boxes, results.masks or []):
-            pred = {
-                "confidence": float(box.conf.cpu().numpy()),
-                "bbox": [int(x) for x in box.xyxy[0].cpu().numpy()],   # [x1, y1, x2, y2]
-                "polygon": []  # default
-            }
-            if mask is not None:
-                # mask.xy[0] = list of [x,y] points (polygon)
-                pred["polygon"] = [[float(x), float(y)] for x, y in mask.xy[0]]
-            predictions.append(pred)
-
-    return annotated_image, predictions
+    Sama seperti `predict_encoded_batch`, ditambah durasi tiap langkah dalam detik:
+    {"decode": [per gambar], "inference": [per forward pass], "plot": [per gambar], "encode": [per gambar]}.
+    Durasi dikembalikan, bukan langsung dicatat ke metrics, supaya tetap sampai ke
+    proses utama walaupun fungsi ini jalan di process pool.
+    """
+    timings: Timings = {}
+    decoded = []
+    for b in images_bytes:
+        started = time.perf_counter()
+        decoded.append(decode_image(b))
+        _timed(timings, "decode", started)
+    valid = [i for i, (image, _) in enumerate(decoded) if image is not None]
+
+    outputs: List[Tuple[Optional[bytes], Predictions]] = [(None, [])] * len(images_bytes)
+    results = predict_solar_panel_batch(
+        [decoded[i][0] for i in valid], batch_size, conf_threshold, iou_threshold, timings=timings, output_format="raw"
+    )
+    for i, (annotated_image, predictions) in zip(valid, results):
+        started = time.perf_counter()
+        encoded = _encode_jpeg(annotated_image)
+        _timed(timings, "encode", started)
+        image, factor = decoded[i]
+        # Ukuran gambar asli, sebelum decode yang di-downscale
+        image_size = (image.shape[1] * factor, image.shape[0] * factor)
+        outputs[i] = (encoded, format_predictions(_scale_predictions(predictions, factor), image_size))
+    return outputs, timings
 
 
 # ================== CONTOH PENGGUNAAN ==================
 if __name__ == "__main__":
     # Test cepat (hapus kalau sudah dipakai backend)
+    import cv2
+
     img_path = r"C:/Users/user\Downloads/ITB HACKATON\solar-panel-seg-local/cirata.jpg"  # ganti gambar test kamu
     img = cv2.imread(img_path)
     
@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from py_app_service.config import (
+    EVENTS_HISTORY_SIZE,
+    EVENTS_CLIENT_BUFFER,
+    EVENTS_HEARTBEAT_INTERVAL,
+    EVENTS_MAX_SUBSCRIBERS,
+)
+from py_app_service.utils.metrics import Counter, Gauge
+from py_app_service.utils.responses import dumps
+
+events_published = Counter("events_published_total", "Events published to the /events hub", ["event"])
+events_dropped = Counter("events_dropped_total", "Events dropped from slow /events subscribers' buffers")
+
+HEARTBEAT = b": ping\n\n"
+
+
+class HubFull(Exception):
+    """EVENTS_MAX_SUBSCRIBERS streams are already open."""
+
+
+def _frame(event_id: Optional[int], event: str, data: Dict[str, Any]) -> bytes:
+    # Compact JSON has no newlines, so it fits on one ``data:`` line
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+class Subscription:
+    """
+    One ``/events`` stream: the topics it follows and a bounded buffer of
+    encoded frames. When the client reads slower than events arrive, the oldest
+    frames are dropped and a ``dropped`` event tells it how many, so it can
+    refetch instead of silently missing updates.
+    """
+
+    def __init__(self, topics: Set[str], buffer_size: int):
+        self.topics = topics
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def push(self, frame: bytes):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+            events_dropped.inc()
+        self.buffer.append(frame)
+        self._ready.set()
+
+    async def frames(self, heartbeat: float) -> AsyncIterator[bytes]:
+        """Buffered frames as they arrive, and a comment line after ``heartbeat`` idle seconds."""
+        while True:
+            if not self.buffer:
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+            if self.dropped:
+                yield _frame(None, "dropped", {"count": self.dropped})
+                self.dropped = 0
+            while self.buffer:
+                yield self.buffer.popleft()
+
+
+class EventHub:
+    """
+    In-process publish/subscribe for the ``/events`` Server-Sent Events stream.
+
+    ``publish`` encodes an event once and appends the same bytes to the buffer
+    of every subscription following its topic: exact topics (``training:abc``,
+    ``ledger``) are a dict lookup and prefix patterns (``training:*``) a scan of
+    the few patterns in use, so idle connections cost nothing per event.
+
+    Event ids are consecutive integers starting from the process start time in
+    microseconds, so they keep increasing across restarts. The last
+    EVENTS_HISTORY_SIZE events are kept for clients reconnecting with
+    ``Last-Event-ID``; a client further behind than that (or from before a
+    restart) gets a ``resync`` event instead and should refetch.
+    """
+
+    def __init__(
+        self,
+        history_size: int = EVENTS_HISTORY_SIZE,
+        buffer_size: int = EVENTS_CLIENT_BUFFER,
+        max_subscribers: int = EVENTS_MAX_SUBSCRIBERS,
+    ):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._next_id = time.time_ns() // 1000
+        # (id, topic, frame), ids consecutive
+        self.history: deque = deque(maxlen=history_size)
+        self._exact: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._prefix: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.subscribers = 0
+
+    @property
+    def full(self) -> bool:
+        return self.subscribers >= self.max_subscribers
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def publish(self, topic: str, event: str, data: Dict[str, Any]) -> int:
+        event_id = self._next_id
+        self._next_id += 1
+        frame = _frame(event_id, event, {"topic": topic, **data})
+        self.history.append((event_id, topic, frame))
+        events_published.inc(event=event)
+        for subscription in self._exact.get(topic, ()):
+            subscription.push(frame)
+        for prefix, subscriptions in self._prefix.items():
+            if topic.startswith(prefix):
+                for subscription in subscriptions:
+                    subscription.push(frame)
+        return event_id
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Follow ``topics`` (a trailing ``*`` matches any suffix). With
+        ``last_event_id``, the events after it that are still in the history are
+        queued first.
+        """
+        if self.full:
+            raise HubFull(f"{self.subscribers} event streams are already open")
+        subscription = Subscription(set(topics), self.buffer_size)
+        if last_event_id is not None:
+            self._replay(subscription, last_event_id)
+        for topic in subscription.topics:
+            if topic.endswith("*"):
+                self._prefix[topic[:-1]].add(subscription)
+            else:
+                self._exact[topic].add(subscription)
+        self.subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop following; a no-op the second time."""
+        if subscription.closed:
+            return
+        subscription.closed = True
+        for topic in subscription.topics:
+            index, key = (self._prefix, topic[:-1]) if topic.endswith("*") else (self._exact, topic)
+            subscriptions = index.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del index[key]
+        self.subscribers -= 1
+
+    def _replay(self, subscription: Subscription, last_event_id: int):
+        oldest = self.history[0][0] if self.history else self._next_id
+        if last_event_id + 1 < oldest or last_event_id > self.last_id:
+            # Missed events are gone (or the id is from another run): start over from here
+            subscription.push(_frame(self.last_id, "resync", {"reason": "history_expired"}))
+            return
+        prefixes = tuple(topic[:-1] for topic in subscription.topics if topic.endswith("*"))
+        for _, topic, frame in itertools.islice(self.history, last_event_id + 1 - oldest, None):
+            if topic in subscription.topics or (prefixes and topic.startswith(prefixes)):
+                subscription.push(frame)
+
+    async def stream(
+        self,
+        subscription: Subscription,
+        retry_ms: Optional[int] = None,
+        heartbeat: float = EVENTS_HEARTBEAT_INTERVAL,
+    ) -> AsyncIterator[bytes]:
+        """
+        An SSE body for ``subscription``, unsubscribed when it ends. Subscribe
+        before the response starts, so a full hub can still be refused with a
+        status code.
+        """
+        try:
+            if retry_ms is not None:
+                yield f"retry: {retry_ms}\n\n".encode()
+            async for frame in subscription.frames(heartbeat):
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_hub = EventHub()
+
+Gauge("events_subscribers", "Open /events streams", callback=lambda: {(): event_hub.subscribers})
@@ -0,0 +1,260 @@
+import math
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from py_app_service.config import GEO_ENABLED, GEO_CELL_DEGREES
+from py_app_service.services.project_feed import ProjectFeed, project_feed
+from py_app_service.utils.metrics import Gauge
+
+EARTH_RADIUS_KM = 6371.0088
+# Length of one degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _haversine_km_array(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    phi1, phi2 = math.radians(lat), np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class GeoGrid:
+    """
+    Uniform lat/lon grid of points: each id lives in one ``cell_degrees`` square
+    cell, so a radius or box query only looks at the points of the cells it
+    overlaps instead of every point. Each cell's points are also kept as NumPy
+    arrays (rebuilt lazily after a change to that cell) so distances are
+    computed a cell at a time.
+    """
+
+    def __init__(self, cell_degrees: float = GEO_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._columns = math.ceil(360 / cell_degrees)
+        self._cells: Dict[Cell, Dict[str, Tuple[float, float]]] = {}
+        self._points: Dict[str, Tuple[float, float, Cell]] = {}
+        # {cell: (ids, lats, lons)}
+        self._arrays: Dict[Cell, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        row = math.floor((lat + 90) / self.cell_degrees)
+        column = math.floor((lon + 180) / self.cell_degrees) % self._columns
+        return row, column
+
+    def upsert(self, point_id: str, lat: float, lon: float):
+        self.remove(point_id)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[point_id] = (lat, lon)
+        self._points[point_id] = (lat, lon, cell)
+        self._arrays.pop(cell, None)
+
+    def remove(self, point_id: str):
+        point = self._points.pop(point_id, None)
+        if point is None:
+            return
+        cell = point[2]
+        points = self._cells[cell]
+        del points[point_id]
+        if not points:
+            del self._cells[cell]
+        self._arrays.pop(cell, None)
+
+    def build_arrays(self):
+        """Build every cell's arrays up front, so the first queries don't pay for it."""
+        for cell in self._cells:
+            self._cell_arrays(cell)
+
+    def _cell_arrays(self, cell: Cell) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(cell)
+        if arrays is None:
+            points = self._cells.get(cell)
+            if not points:
+                return None
+            coordinates = np.array(list(points.values()), dtype=np.float64).reshape(-1, 2)
+            arrays = self._arrays[cell] = (np.array(list(points), dtype=object), coordinates[:, 0], coordinates[:, 1])
+        return arrays
+
+    def _cells_in(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Iterator[Cell]:
+        first_row, first_column = self._cell(max(min_lat, -90.0), min_lon)
+        last_row, last_column = self._cell(min(max_lat, 90.0), max_lon)
+        # A box across the antimeridian wraps around to the first columns
+        columns = last_column - first_column if last_column >= first_column else last_column + self._columns - first_column
+        if max_lon - min_lon >= 360 - self.cell_degrees:
+            columns = self._columns - 1
+        for row in range(first_row, last_row + 1):
+            for step in range(columns + 1):
+                yield row, (first_column + step) % self._columns
+
+    def _candidates(
+        self, min_lat: float, min_lon: float, max_lat: float, max_lon: float
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        wraps = min_lon > max_lon
+        for cell in self._cells_in(min_lat, min_lon, max_lat, max_lon + (360 if wraps else 0)):
+            arrays = self._cell_arrays(cell)
+            if arrays is not None:
+                yield arrays
+
+    def within_box(
+        self, min_lat: float, min_lon: float, max_lat: float, max_lon: float, lat: float, lon: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ``(distances_km, ids)`` of the points in the box, nearest to (``lat``, ``lon``)
+        first; ``min_lon > max_lon`` means the box crosses the antimeridian.
+        """
+        wraps = min_lon > max_lon
+        ids, distances = [], []
+        for cell_ids, lats, lons in self._candidates(min_lat, min_lon, max_lat, max_lon):
+            in_lon = (lons >= min_lon) | (lons <= max_lon) if wraps else (lons >= min_lon) & (lons <= max_lon)
+            inside = in_lon & (lats >= min_lat) & (lats <= max_lat)
+            ids.append(cell_ids[inside])
+            distances.append(_haversine_km_array(lat, lon, lats[inside], lons[inside]))
+        return _sorted(distances, ids)
+
+    def near(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """``(distances_km, ids)`` of every point within ``radius_km``, nearest first."""
+        lat_delta = radius_km / KM_PER_DEGREE
+        min_lat, max_lat = lat - lat_delta, lat + lat_delta
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90.0)))
+        if min_lat <= -90 or max_lat >= 90 or cos_lat <= radius_km / (KM_PER_DEGREE * 180):
+            # Reaches a pole or half way around: every longitude
+            min_lon, max_lon = -180.0, 180.0 - 1e-9
+        else:
+            lon_delta = lat_delta / cos_lat
+            min_lon = (lon - lon_delta + 180) % 360 - 180
+            max_lon = (lon + lon_delta + 180) % 360 - 180
+        ids, distances = [], []
+        for cell_ids, lats, lons in self._candidates(min_lat, min_lon, max_lat, max_lon):
+            cell_distances = _haversine_km_array(lat, lon, lats, lons)
+            inside = cell_distances <= radius_km
+            ids.append(cell_ids[inside])
+            distances.append(cell_distances[inside])
+        return _sorted(distances, ids)
+
+
+def _sorted(distances: List[np.ndarray], ids: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    if not ids:
+        return np.empty(0), np.empty(0, dtype=object)
+    distances, ids = np.concatenate(distances), np.concatenate(ids)
+    order = np.argsort(distances, kind="stable")
+    return distances[order], ids[order]
+
+
+def _location(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    location = record.get("location") or {}
+    lat, lon = location.get("lat"), location.get("lon")
+    if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        return None
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return None
+    return float(lat), float(lon)
+
+
+class ProjectGeoIndex:
+    """
+    In-memory spatial index of projects for ``GET /projects/near`` and
+    ``GET /projects/bbox``, holding the PocketBase records themselves so a query
+    never goes upstream.
+
+    Fed by the shared project feed (``services/project_feed.py``), which loads
+    on the first query and then refreshes projects changed outside this
+    service; the project routers also call ``upsert`` / ``remove`` after their
+    writes. Disabled (GEO_ENABLED), it never loads anything.
+    """
+
+    def __init__(
+        self,
+        feed: ProjectFeed = project_feed,
+        cell_degrees: float = GEO_CELL_DEGREES,
+        enabled: bool = GEO_ENABLED,
+    ):
+        self.feed = feed
+        self.cell_degrees = cell_degrees
+        self.enabled = enabled
+        self.grid = GeoGrid(cell_degrees)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.loaded_at: Optional[float] = None
+        if enabled:
+            feed.register(self)
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+    async def ensure_loaded(self):
+        if self.loaded_at is None:
+            await self.feed.ensure_loaded()
+
+    def replace(self, records: List[Dict[str, Any]]):
+        # Built aside and swapped in, so queries keep using the old index meanwhile
+        grid, indexed = GeoGrid(self.cell_degrees), {}
+        for record in records:
+            location = _location(record)
+            if location is not None:
+                grid.upsert(record["id"], *location)
+                indexed[record["id"]] = record
+        grid.build_arrays()
+        self.grid, self.records = grid, indexed
+        self.loaded_at = time.time()
+
+    def upsert(self, record: Dict[str, Any]):
+        """Index a created or updated project (or drop it if it lost its location)."""
+        if self.loaded_at is None:
+            # The first load will include it
+            return
+        existing = self.records.get(record.get("id"))
+        if existing is not None and existing.get("updated", "") > record.get("updated", ""):
+            return
+        location = _location(record)
+        if location is None:
+            self.remove(record.get("id"))
+        else:
+            self.grid.upsert(record["id"], *location)
+            self.records[record["id"]] = record
+
+    def remove(self, record_id: str):
+        self.grid.remove(record_id)
+        self.records.pop(record_id, None)
+
+    def near(
+        self, lat: float, lon: float, radius_km: float, offset: int = 0, limit: Optional[int] = None
+    ) -> Tuple[int, List[Tuple[float, Dict[str, Any]]]]:
+        """Total within ``radius_km`` and the ``offset:offset + limit`` slice of ``(distance_km, record)``, nearest first."""
+        return self._page(*self.grid.near(lat, lon, radius_km), offset, limit)
+
+    def within_box(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        lat: float,
+        lon: float,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List[Tuple[float, Dict[str, Any]]]]:
+        """Like ``near`` for the projects in the box, nearest to (``lat``, ``lon``) first."""
+        return self._page(*self.grid.within_box(min_lat, min_lon, max_lat, max_lon, lat, lon), offset, limit)
+
+    def _page(self, distances: np.ndarray, ids: np.ndarray, offset: int, limit: Optional[int]):
+        end = len(ids) if limit is None else offset + limit
+        # Only the requested page is turned back into Python objects
+        page = zip(distances[offset:end].tolist(), ids[offset:end].tolist())
+        return len(ids), [(distance, self.records[i]) for distance, i in page]
+
+
+project_geo_index = ProjectGeoIndex()
+
+Gauge("geo_index_projects", "Projects in the in-memory geo index", callback=lambda: {(): len(project_geo_index)})
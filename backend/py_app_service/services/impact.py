@@ -0,0 +1,260 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from py_app_service.config import IMPACT_ENABLED
+from py_app_service.services.project_feed import ProjectFeed, project_feed
+from py_app_service.utils.metrics import Gauge
+
+# Stats name -> path to it in a PocketBase project record
+METRICS = {
+    "co2Yearly": ("metrics", "co2Yearly"),
+    "energyMWh": ("metrics", "energyMWh"),
+    "trees": ("metrics", "trees"),
+    "jobsConstruction": ("metrics", "jobs", "construction"),
+    "jobsOps": ("metrics", "jobs", "ops"),
+    "sroi": ("metrics", "sroi"),
+    "irr": ("metrics", "irr"),
+    "multiplier": ("metrics", "multiplier"),
+    "needed": ("quickMetrics", "needed"),
+    "beneficiaries": ("quickMetrics", "beneficiaries"),
+}
+_COLUMN = {name: i for i, name in enumerate(METRICS)}
+
+# group_by value -> PocketBase field holding the project's labels
+GROUP_FIELDS = {"sdgs": "sgds", "maqasid": "maqasid", "type": "type"}
+
+
+def _number(record: Dict[str, Any], path: Sequence[str]) -> float:
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return np.nan
+        value = value.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+def _labels(record: Dict[str, Any], field: str) -> List[str]:
+    value = record.get(field)
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple)):
+        return sorted({str(v) for v in value})
+    return [str(value)]
+
+
+class ImpactColumns:
+    """
+    Project metrics as columns: one float64 row per project (NaN where a metric
+    is missing) plus, per group-by field, a boolean row x label membership
+    matrix, since ``sdgs`` and ``maqasid`` hold several labels per project.
+
+    Rows are written in place on upsert and a removed row is filled with the
+    last one, so the live rows are always ``[:len(self)]`` and every statistic
+    is a NumPy reduction over them.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._values = np.full((capacity, len(METRICS)), np.nan)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # {group_by: {label: column}} and {group_by: membership matrix}
+        self._labels: Dict[str, Dict[str, int]] = {group: {} for group in GROUP_FIELDS}
+        self._members: Dict[str, np.ndarray] = {group: np.zeros((capacity, 8), dtype=bool) for group in GROUP_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._rows
+
+    def _grow(self):
+        capacity = len(self._values) * 2
+        values = np.full((capacity, len(METRICS)), np.nan)
+        values[: len(self._values)] = self._values
+        self._values = values
+        for group, members in self._members.items():
+            grown = np.zeros((capacity, members.shape[1]), dtype=bool)
+            grown[: len(members)] = members
+            self._members[group] = grown
+
+    def _label_column(self, group: str, label: str) -> int:
+        columns = self._labels[group]
+        column = columns.get(label)
+        if column is None:
+            column = columns[label] = len(columns)
+            members = self._members[group]
+            if column >= members.shape[1]:
+                grown = np.zeros((len(members), members.shape[1] * 2), dtype=bool)
+                grown[:, : members.shape[1]] = members
+                self._members[group] = grown
+        return column
+
+    def upsert(self, record: Dict[str, Any]):
+        record_id = record["id"]
+        row = self._rows.get(record_id)
+        if row is None:
+            if len(self._ids) == len(self._values):
+                self._grow()
+            row = self._rows[record_id] = len(self._ids)
+            self._ids.append(record_id)
+        self._values[row] = [_number(record, path) for path in METRICS.values()]
+        for group, field in GROUP_FIELDS.items():
+            columns = [self._label_column(group, label) for label in _labels(record, field)]
+            members = self._members[group]
+            members[row] = False
+            members[row, columns] = True
+
+    def remove(self, record_id: str):
+        row = self._rows.pop(record_id, None)
+        if row is None:
+            return
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            self._values[row] = self._values[last]
+            for members in self._members.values():
+                members[row] = members[last]
+        self._ids.pop()
+        self._values[last] = np.nan
+        for members in self._members.values():
+            members[last] = False
+
+    def summary(self, percentiles: Sequence[float] = (), group_by: Optional[str] = None) -> Dict[str, Any]:
+        size = len(self._ids)
+        values = self._values[:size]
+        result = {"total": _summarize(values, percentiles), "groupBy": group_by, "groups": {}}
+        if group_by is not None:
+            members = self._members[group_by][:size]
+            for label, column in sorted(self._labels[group_by].items()):
+                mask = members[:, column]
+                if mask.any():
+                    result["groups"][label] = _summarize(values[mask], percentiles)
+        return result
+
+
+def _summarize(values: np.ndarray, percentiles: Sequence[float]) -> Dict[str, Any]:
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    filled = np.where(present, values, 0.0)
+    sums = filled.sum(axis=0)
+    mins = np.where(present, values, np.inf).min(axis=0, initial=np.inf)
+    maxs = np.where(present, values, -np.inf).max(axis=0, initial=-np.inf)
+    if percentiles and len(values):
+        # NaN sorts last, so each column's first `count` sorted values are its values
+        ordered = np.sort(values, axis=0)
+        ranks = np.asarray(percentiles) / 100 * np.maximum(counts - 1, 0)[:, None]
+        low, high = np.floor(ranks).astype(int), np.ceil(ranks).astype(int)
+        columns = np.arange(values.shape[1])[:, None]
+        fraction = ranks - low
+        quantiles = ordered[low, columns] * (1 - fraction) + ordered[high, columns] * fraction
+    else:
+        quantiles = np.full((values.shape[1], len(percentiles)), np.nan)
+
+    # SROI weighted by the funding each project needs
+    sroi, weights = values[:, _COLUMN["sroi"]], values[:, _COLUMN["needed"]]
+    weighted = ~np.isnan(sroi) & (weights > 0)
+    funding = float(weights[weighted].sum())
+
+    metrics = {}
+    for name, column in _COLUMN.items():
+        count = int(counts[column])
+        metrics[name] = {
+            "count": count,
+            "sum": float(sums[column]),
+            "mean": float(sums[column] / count) if count else None,
+            "min": float(mins[column]) if count else None,
+            "max": float(maxs[column]) if count else None,
+            "percentiles": {
+                f"p{q:g}": float(quantiles[column, i]) if count else None for i, q in enumerate(percentiles)
+            },
+        }
+    return {
+        "projects": len(values),
+        "metrics": metrics,
+        "sroiWeightedByFunding": float((sroi[weighted] * weights[weighted]).sum() / funding) if funding else None,
+    }
+
+
+class ImpactStore:
+    """
+    Portfolio statistics for ``GET /projects/stats`` from an in-memory columnar
+    copy of every project's metrics, so dashboards don't download every project.
+
+    Fed like the geo index, by the shared project feed (loaded on the first
+    query, then refreshed), and written through by the project routers.
+    Results are cached until the next change. Disabled (IMPACT_ENABLED), it
+    never loads anything.
+    """
+
+    def __init__(self, feed: ProjectFeed = project_feed, enabled: bool = IMPACT_ENABLED):
+        self.feed = feed
+        self.enabled = enabled
+        self.columns = ImpactColumns()
+        # {id: updated} of the projects in `columns`
+        self.updated: Dict[str, str] = {}
+        self.loaded_at: Optional[float] = None
+        self._results: Dict[tuple, Dict[str, Any]] = {}
+        if enabled:
+            feed.register(self)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    async def ensure_loaded(self):
+        if self.loaded_at is None:
+            await self.feed.ensure_loaded()
+
+    def replace(self, records: List[Dict[str, Any]]):
+        # Built aside and swapped in, so queries keep using the old columns meanwhile
+        columns, updated = ImpactColumns(), {}
+        for record in records:
+            columns.upsert(record)
+            updated[record["id"]] = record.get("updated", "")
+        self.columns, self.updated = columns, updated
+        self._results.clear()
+        self.loaded_at = time.time()
+
+    def upsert(self, record: Dict[str, Any]):
+        """Add a created project or replace an updated one's metrics."""
+        record_id = record.get("id")
+        if self.loaded_at is None:
+            # The first load will include it
+            return
+        if record_id is None or self.updated.get(record_id, "") > record.get("updated", ""):
+            return
+        self.columns.upsert(record)
+        self.updated[record_id] = record.get("updated", "")
+        self._results.clear()
+
+    def remove(self, record_id: str):
+        if record_id in self.columns:
+            self.columns.remove(record_id)
+            self.updated.pop(record_id, None)
+            self._results.clear()
+
+    def stats(self, percentiles: Sequence[float] = (50, 90), group_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Count, sum, mean, min, max and ``percentiles`` of every metric in METRICS,
+        plus SROI weighted by funding needed, over all projects and per
+        ``group_by`` label (a project with several SDGs counts in each).
+        """
+        if group_by is not None and group_by not in GROUP_FIELDS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_FIELDS)}")
+        key = (tuple(percentiles), group_by)
+        result = self._results.get(key)
+        if result is None:
+            if len(self._results) >= 64:
+                self._results.clear()
+            result = self._results[key] = self.columns.summary(percentiles, group_by)
+        return result
+
+
+impact_store = ImpactStore()
+
+Gauge("impact_store_projects", "Projects in the in-memory impact store", callback=lambda: {(): len(impact_store)})
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from py_app_service.config import (
+    INFERENCE_EXECUTOR,
+    INFERENCE_WORKERS,
+    INFERENCE_BATCH_SIZE,
+    TRAINING_BATCH_SIZE,
+    TRAINING_BATCH_MAX_WAIT,
+)
+from py_app_service.services import compvis
+from py_app_service.utils.metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+inference_step_seconds = Histogram(
+    "inference_step_duration_seconds",
+    "Time per step on the inference executor: decode, plot and encode per image, inference per forward pass",
+    ["step"],
+)
+inference_batch_images = Histogram(
+    "inference_batch_images", "Images per batch sent to the inference executor", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+class ModelStatus(str, Enum):
+    not_loaded = "not_loaded"
+    loading = "loading"
+    ready = "ready"
+    failed = "failed"
+
+
+class ModelState:
+    """
+    What the app knows about the model on the executor workers, for the health
+    endpoints. The model itself lives in the workers (possibly other processes).
+    """
+
+    def __init__(self):
+        self.status = ModelStatus.not_loaded
+        self.error: Optional[str] = None
+        self.checksum: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "checksum": self.checksum,
+            "load_seconds": self.load_seconds,
+        }
+
+
+model_state = ModelState()
+
+Gauge(
+    "inference_model_ready", "1 once the model is loaded on the inference workers",
+    callback=lambda: {(): model_state.status is ModelStatus.ready},
+)
+
+# Dedicated pool for decode/inference/plot/encode, so YOLO never runs on the event loop
+_executor: Optional[Executor] = None
+
+
+def start_inference_executor(kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS) -> Executor:
+    """
+    ``kind`` is "thread" or "process". Creating the pool is cheap: workers start
+    on first use and each loads its own copy of the model lazily, on its first
+    inference or in ``warm_up_model``.
+    """
+    global _executor
+    if _executor is not None:
+        return _executor
+
+    if kind == "thread":
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+    elif kind == "process":
+        # spawn, not fork: forking a process that already initialised torch can deadlock
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        raise ValueError(f"Unknown inference executor: {kind}")
+
+    logger.info(f"Started {kind} inference executor with {workers} worker(s)")
+    return _executor
+
+
+async def warm_up_model(workers: int = INFERENCE_WORKERS):
+    """
+    Load the model on every executor worker and run one empty forward pass, so
+    the first real batch doesn't pay for it. Meant to run as a background task
+    after startup: the API serves requests meanwhile and readiness doesn't wait.
+    """
+    executor = start_inference_executor()
+    loop = asyncio.get_running_loop()
+    model_state.status = ModelStatus.loading
+    started = time.monotonic()
+    try:
+        # Concurrent submissions each get a fresh worker until the pool is full
+        checksums = await asyncio.gather(*(loop.run_in_executor(executor, compvis.warm_up) for _ in range(workers)))
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        model_state.status = ModelStatus.failed
+        model_state.error = str(e)
+        return
+    model_state.status = ModelStatus.ready
+    model_state.error = None
+    model_state.checksum = checksums[0]
+    model_state.load_seconds = time.monotonic() - started
+    logger.info(f"Model warmed up on {workers} worker(s) in {model_state.load_seconds:.1f}s")
+
+
+def shutdown_inference_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_inference(
+    image_bytes: bytes,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45,
+) -> Tuple[Optional[bytes], List[Dict]]:
+    """Run ``compvis.predict_encoded`` on the inference executor and await the result."""
+    return (await run_inference_batch([image_bytes], 1, conf_threshold, iou_threshold))[0]
+
+
+async def run_inference_batch(
+    images_bytes: List[bytes],
+    batch_size: int = INFERENCE_BATCH_SIZE,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45,
+) -> List[Tuple[Optional[bytes], List[Dict]]]:
+    """Run ``compvis.predict_encoded_batch`` on the inference executor; results keep input order."""
+    executor = start_inference_executor()
+    loop = asyncio.get_running_loop()
+    outputs, timings = await loop.run_in_executor(
+        executor, compvis.predict_encoded_batch_timed, images_bytes, batch_size, conf_threshold, iou_threshold
+    )
+    if timings.get("inference") and model_state.status is not ModelStatus.ready:
+        # Loaded lazily by this batch rather than by warm-up
+        model_state.status = ModelStatus.ready
+        model_state.error = None
+    inference_batch_images.observe(len(images_bytes))
+    for step, durations in timings.items():
+        for duration in durations:
+            inference_step_seconds.observe(duration, step=step)
+    return outputs
+
+
+class InferenceBatcher:
+    """
+    Collects single-image requests into micro-batches for ``run_inference_batch``.
+
+    A batch is sent once it holds ``max_batch_size`` images or ``max_wait``
+    seconds after its first image arrived, whichever comes first. Up to
+    ``INFERENCE_WORKERS`` batches run at once while the next one is collected.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = TRAINING_BATCH_SIZE,
+        max_wait: float = TRAINING_BATCH_MAX_WAIT,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batches: set = set()
+
+    @property
+    def pending(self) -> int:
+        """Images waiting to be collected into a batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> int:
+        return len(self._batches)
+
+    async def predict(self, image_bytes: bytes) -> Tuple[Optional[bytes], List[Dict]]:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(INFERENCE_WORKERS)
+            self._task = asyncio.create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_bytes, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch):
+        images = [image for image, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            results = await run_inference_batch(
+                images, conf_threshold=self.conf_threshold, iou_threshold=self.iou_threshold
+            )
+        except Exception as e:
+            logger.error(f"Inference batch of {len(batch)} failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                # The caller may have given up (cancelled) while the batch ran
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(self._task, *self._batches, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+        self._task = None
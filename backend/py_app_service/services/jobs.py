@@ -0,0 +1,331 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from py_app_service.config import (
+    JOB_HISTORY_SIZE,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+    JOB_RETRY_BACKOFF_MAX,
+    TRAINING_CONCURRENCY,
+    TRAINING_FAILED_COOLDOWN,
+)
+from py_app_service.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobSkipped(Exception):
+    """
+    Raised by a handler that has nothing to do for this job (the message says
+    why): the job ends ``skipped`` rather than ``succeeded``, and isn't retried.
+    """
+
+
+@dataclass
+class Delivery:
+    job_id: str
+    record_id: str
+    attempts: int
+    payload: Optional[Dict[str, Any]]
+    ack: Callable[[], Awaitable[None]]
+    # Hand the message back to the queue as it was, for another attempt right away
+    requeue: Callable[[], Awaitable[None]]
+
+
+async def _noop():
+    return None
+
+
+class InMemoryJobBackend:
+    """Default backend: a plain asyncio.Queue, nothing survives a restart."""
+
+    async def start(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._timers: set = set()
+
+    async def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, job: Job):
+        delivery = Delivery(job.id, job.record_id, job.attempts, job.payload, _noop, _noop)
+        delivery.requeue = lambda: self._queue.put(delivery)
+        await self._queue.put(delivery)
+
+    async def put_later(self, job: Job, delay: float):
+        timer = asyncio.create_task(self._put_after(job, delay))
+        self._timers.add(timer)
+        timer.add_done_callback(self._timers.discard)
+
+    async def _put_after(self, job: Job, delay: float):
+        await asyncio.sleep(delay)
+        await self.put(job)
+
+    async def get(self) -> Delivery:
+        return await self._queue.get()
+
+
+class RabbitJobBackend:
+    """
+    Durable backend on the RabbitMQ from docker-compose. A message is acked only
+    after its job finished or its retry was published, so jobs held by a
+    process that dies are redelivered to another one.
+
+    Retries wait in ``{queue}.retry.{ms}`` queues, one per backoff delay, whose
+    messages expire after that delay and are dead-lettered back onto the job
+    queue. A retry survives restarts like any other message, and a queue-wide
+    TTL means a long delay never holds up a shorter one behind it.
+    """
+
+    def __init__(self, queue_name: str, prefetch: int):
+        self.queue_name = queue_name
+        self.prefetch = prefetch
+        self._retry_queues: set = set()
+
+    async def start(self):
+        import aio_pika
+        from py_app_service.database.rabbit import get_rabbit
+
+        self._message_cls = aio_pika.Message
+        self._persistent = aio_pika.DeliveryMode.PERSISTENT
+        self._deliveries: asyncio.Queue = asyncio.Queue()
+        self._channel = await (await get_rabbit()).channel()
+        await self._channel.set_qos(prefetch_count=self.prefetch)
+        self._queue = await self._channel.declare_queue(self.queue_name, durable=True)
+        self._consumer_tag = await self._queue.consume(self._on_message)
+
+    async def stop(self):
+        await self._queue.cancel(self._consumer_tag)
+        await self._channel.close()
+
+    def qsize(self) -> int:
+        return self._deliveries.qsize()
+
+    async def _on_message(self, message):
+        data = json.loads(message.body)
+        await self._deliveries.put(Delivery(
+            data["job_id"],
+            data["record_id"],
+            data["attempts"],
+            data.get("payload"),
+            message.ack,
+            lambda: message.nack(requeue=True),
+        ))
+
+    async def _publish(self, job: Job, routing_key: str):
+        body = json.dumps(
+            {"job_id": job.id, "record_id": job.record_id, "attempts": job.attempts, "payload": job.payload}
+        ).encode()
+        await self._channel.default_exchange.publish(
+            self._message_cls(body, delivery_mode=self._persistent),
+            routing_key=routing_key,
+        )
+
+    async def put(self, job: Job):
+        await self._publish(job, self.queue_name)
+
+    async def put_later(self, job: Job, delay: float):
+        delay_ms = max(int(delay * 1000), 1)
+        retry_queue = f"{self.queue_name}.retry.{delay_ms}"
+        if retry_queue not in self._retry_queues:
+            await self._channel.declare_queue(retry_queue, durable=True, arguments={
+                "x-message-ttl": delay_ms,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": self.queue_name,
+            })
+            self._retry_queues.add(retry_queue)
+        await self._publish(job, retry_queue)
+
+    async def get(self) -> Delivery:
+        return await self._deliveries.get()
+
+
+class JobQueue:
+    """
+    Runs ``handler(record_id, payload)`` for submitted records with at most
+    ``concurrency`` jobs at a time.
+
+    - Submitting a record that already has an active job returns that job.
+    - A handler exception is retried with exponential backoff up to
+      ``max_attempts`` times, then the job is marked failed.
+    - A handler raising ``JobSkipped`` ends the job as skipped, with its reason.
+    - Idle workers block on the backend; nothing polls.
+
+    Job status is tracked in-process, for the last ``JOB_HISTORY_SIZE`` jobs,
+    and final failures for ``failed_ttl`` seconds. ``on_status(job)`` is called
+    whenever a job is queued or changes status.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Optional[Dict[str, Any]]], Awaitable[None]],
+        backend=None,
+        concurrency: int = TRAINING_CONCURRENCY,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        backoff: float = JOB_RETRY_BACKOFF,
+        backoff_max: float = JOB_RETRY_BACKOFF_MAX,
+        on_status: Optional[Callable[[Job], None]] = None,
+        failed_ttl: float = TRAINING_FAILED_COOLDOWN,
+    ):
+        self.handler = handler
+        self.backend = backend if backend is not None else InMemoryJobBackend()
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.on_status = on_status
+        self.failed_ttl = failed_ttl
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_record: Dict[str, str] = {}
+        # Oldest first
+        self._failed_at: Dict[str, float] = {}
+        self._workers: list = []
+        self.running = 0
+
+    async def start(self):
+        await self.backend.start()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.backend.stop()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def get_for_record(self, record_id: str) -> Optional[Job]:
+        job_id = self._active_by_record.get(record_id)
+        return self.jobs.get(job_id) if job_id else None
+
+    def qsize(self) -> int:
+        return self.backend.qsize()
+
+    def recently_failed(self, record_id: str, within: float) -> bool:
+        failed_at = self._failed_at.get(record_id)
+        return failed_at is not None and time.time() - failed_at < within
+
+    async def submit(self, record_id: str, payload: Optional[Dict[str, Any]] = None) -> Job:
+        existing = self.get_for_record(record_id)
+        if existing is not None:
+            return existing
+
+        now = time.time()
+        job = Job(id=uuid.uuid4().hex, record_id=record_id, created_at=now, updated_at=now, payload=payload)
+        self._remember(job)
+        await self.backend.put(job)
+        self._notify(job)
+        return job
+
+    def _remember(self, job: Job):
+        self.jobs[job.id] = job
+        self._active_by_record[job.record_id] = job.id
+        while len(self.jobs) > JOB_HISTORY_SIZE:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest.active:
+                break
+            del self.jobs[oldest_id]
+
+    def _job_for(self, delivery: Delivery) -> Job:
+        job = self.jobs.get(delivery.job_id)
+        if job is None:
+            # Published by another process (durable backend)
+            now = time.time()
+            job = Job(
+                id=delivery.job_id,
+                record_id=delivery.record_id,
+                attempts=delivery.attempts,
+                created_at=now,
+                updated_at=now,
+                payload=delivery.payload,
+            )
+            self._remember(job)
+        return job
+
+    def _set_status(self, job: Job, status: JobStatus, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.updated_at = time.time()
+        if not job.active and self._active_by_record.get(job.record_id) == job.id:
+            del self._active_by_record[job.record_id]
+        self._notify(job)
+
+    def _notify(self, job: Job):
+        if self.on_status is not None:
+            try:
+                self.on_status(job)
+            except Exception as e:
+                logger.warning(f"Job status listener failed for job {job.id}: {e}")
+
+    async def _work(self):
+        while True:
+            delivery = await self.backend.get()
+            job = self._job_for(delivery)
+            job.attempts += 1
+            job.next_attempt_at = None
+            self._set_status(job, JobStatus.running)
+            self.running += 1
+            try:
+                await self.handler(job.record_id, job.payload)
+            except asyncio.CancelledError:
+                # Shutting down: leave the delivery unacked so a durable backend redelivers it
+                self.running -= 1
+                raise
+            except JobSkipped as e:
+                self.running -= 1
+                self._set_status(job, JobStatus.skipped, str(e))
+                await delivery.ack()
+            except Exception as e:
+                self.running -= 1
+                await self._on_failure(job, delivery, e)
+            else:
+                self.running -= 1
+                self._set_status(job, JobStatus.succeeded)
+                self._failed_at.pop(job.record_id, None)
+                await delivery.ack()
+
+    async def _on_failure(self, job: Job, delivery: Delivery, error: Exception):
+        if job.attempts >= self.max_attempts:
+            logger.error(f"Job {job.id} for record {job.record_id} failed after {job.attempts} attempts: {error}")
+            self._set_status(job, JobStatus.failed, str(error))
+            self._remember_failure(job.record_id)
+            await delivery.ack()
+            return
+
+        delay = min(self.backoff * 2 ** (job.attempts - 1), self.backoff_max)
+        logger.warning(f"Job {job.id} for record {job.record_id} failed ({error}), retrying in {delay:.1f}s")
+        self._set_status(job, JobStatus.retrying, str(error))
+        job.next_attempt_at = time.time() + delay
+        try:
+            # Published (with its attempt count) before the delivery is acked, so a
+            # durable backend always holds one or the other
+            await self.backend.put_later(job, delay)
+        except Exception as e:
+            logger.warning(f"Could not schedule retry of job {job.id} ({e}), requeueing it now")
+            job.next_attempt_at = None
+            await delivery.requeue()
+            return
+        await delivery.ack()
+
+    def _remember_failure(self, record_id: str):
+        now = time.time()
+        self._failed_at.pop(record_id, None)
+        self._failed_at[record_id] = now
+        # Forget failures past their cooldown, oldest first
+        while self._failed_at:
+            oldest_id, failed_at = next(iter(self._failed_at.items()))
+            if now - failed_at < self.failed_ttl:
+                break
+            del self._failed_at[oldest_id]
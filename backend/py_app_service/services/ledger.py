@@ -0,0 +1,559 @@
+import asyncio
+import fcntl
+import heapq
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from py_app_service.config import (
+    LEDGER_ENABLED,
+    LEDGER_WAKAF_ADDRESS,
+    LEDGER_TOKEN_ADDRESS,
+    LEDGER_SYNC_INTERVAL,
+    LEDGER_REORG_DEPTH,
+    LEDGER_PAGE_SIZE,
+    LEDGER_STATE_PATH,
+    LEDGER_PROJECT_WALLETS,
+)
+from py_app_service.database.indexer import IndexerError, get_indexer
+from py_app_service.services.events import event_hub
+from py_app_service.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = "0x" + "0" * 40
+STATE_VERSION = 2
+
+# Ponder GraphQL list fields read by the ledger (tables in blockchain_indexer/ponder.schema.ts)
+_QUERIES = {
+    "transfer": (
+        "mocKIDRTransfers",
+        "id from to value blockNumber blockTimestamp",
+    ),
+    "moneyOut": (
+        "wakafMoneyOutEvents",
+        "id nazir sendTo amount tokenAddress reason blockNumber blockTimestamp",
+    ),
+}
+_QUERY_TEMPLATE = """
+query($from: BigInt!, $after: String, $limit: Int!) {
+  %s(where: {blockNumber_gt: $from}, orderBy: "blockNumber", orderDirection: "asc", limit: $limit, after: $after) {
+    items { %s }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+
+def _event(kind: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise a Ponder row: ints for amounts and blocks, lowercase addresses, chain position."""
+    # Ponder ids are "{blockNumber}-{logIndex}" (blockchain_indexer/src/index.ts)
+    block = int(item["blockNumber"])
+    log_index = int(str(item["id"]).rsplit("-", 1)[-1])
+    event = {"kind": kind, "id": item["id"], "block": block, "log": log_index, "timestamp": int(item["blockTimestamp"])}
+    if kind == "transfer":
+        event.update(sender=item["from"].lower(), to=item["to"].lower(), value=int(item["value"]))
+    else:
+        event.update(
+            nazir=item["nazir"].lower(),
+            sendTo=item["sendTo"].lower(),
+            amount=int(item["amount"]),
+            token=item["tokenAddress"].lower(),
+            reason=item.get("reason", ""),
+        )
+    return event
+
+
+# /events topic for ledger updates
+LEDGER_TOPIC = "ledger"
+
+
+def _public(event: Dict[str, Any]) -> Dict[str, Any]:
+    """An event as published: amounts as strings, like Ponder's BigInt."""
+    amount = "value" if event["kind"] == "transfer" else "amount"
+    return {**event, amount: str(event[amount])}
+
+
+# Daily bucket fields holding token amounts (the rest are counts)
+_AMOUNTS = ("donated", "paidOut", "transferVolume")
+
+
+def _day(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class LedgerState:
+    """
+    Donation ledger folded from indexer events, all amounts as Python ints
+    (token base units):
+
+    - ``balances``: token balance per address, from every transfer
+    - ``received`` / ``sent``: total transferred to and from each address (mints
+      aren't sent by anyone)
+    - ``donors``: ``[total, count]`` of transfers into the wakaf contract per sender
+    - ``nazirs`` / ``recipients``: ``[total, count]`` of moneyOut payouts per
+      nazir and per recipient (the project's wallet)
+    - ``daily``: per UTC day, donated / paid out amounts and counts plus transfer volume
+
+    ``apply(event, -1)`` exactly undoes ``apply(event)``, which is what the
+    reorg rewind relies on.
+    """
+
+    def __init__(self, wakaf_address: str = LEDGER_WAKAF_ADDRESS, token_address: str = LEDGER_TOKEN_ADDRESS):
+        self.wakaf_address = wakaf_address.lower()
+        self.token_address = token_address.lower()
+        self.balances: Dict[str, int] = defaultdict(int)
+        self.received: Dict[str, int] = defaultdict(int)
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.donors: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self.nazirs: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self.recipients: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self.daily: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"donated": 0, "donations": 0, "paidOut": 0, "payouts": 0, "transferVolume": 0}
+        )
+        self.totals = {"donated": 0, "donations": 0, "paidOut": 0, "payouts": 0, "events": 0}
+
+    def counts(self, event: Dict[str, Any]) -> bool:
+        # Payouts in other tokens aren't part of the IDR ledger
+        return event["kind"] == "transfer" or event["token"] == self.token_address
+
+    def apply(self, event: Dict[str, Any], sign: int = 1):
+        day = self.daily[_day(event["timestamp"])]
+        self.totals["events"] += sign
+        if event["kind"] == "transfer":
+            value = event["value"] * sign
+            if event["sender"] != ZERO_ADDRESS:
+                _add(self.balances, event["sender"], -value)
+                _add(self.sent, event["sender"], value)
+            _add(self.balances, event["to"], value)
+            _add(self.received, event["to"], value)
+            day["transferVolume"] += value
+            if event["to"] == self.wakaf_address:
+                _add_pair(self.donors, event["sender"], value, sign)
+                self.totals["donated"] += value
+                self.totals["donations"] += sign
+                day["donated"] += value
+                day["donations"] += sign
+        else:
+            amount = event["amount"] * sign
+            _add_pair(self.nazirs, event["nazir"], amount, sign)
+            _add_pair(self.recipients, event["sendTo"], amount, sign)
+            self.totals["paidOut"] += amount
+            self.totals["payouts"] += sign
+            day["paidOut"] += amount
+            day["payouts"] += sign
+        if not any(day.values()):
+            del self.daily[_day(event["timestamp"])]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "balances": dict(self.balances),
+            "received": dict(self.received),
+            "sent": dict(self.sent),
+            "donors": dict(self.donors),
+            "nazirs": dict(self.nazirs),
+            "recipients": dict(self.recipients),
+            "daily": dict(self.daily),
+            "totals": self.totals,
+        }
+
+    def load_json(self, data: Dict[str, Any]):
+        self.balances.update(data["balances"])
+        self.received.update(data["received"])
+        self.sent.update(data["sent"])
+        self.donors.update(data["donors"])
+        self.nazirs.update(data["nazirs"])
+        self.recipients.update(data["recipients"])
+        self.daily.update(data["daily"])
+        self.totals.update(data["totals"])
+
+
+def _add(values: Dict[str, int], key: str, amount: int):
+    total = values[key] + amount
+    if total:
+        values[key] = total
+    else:
+        del values[key]
+
+
+def _add_pair(values: Dict[str, List[int]], key: str, amount: int, count: int):
+    pair = values[key]
+    pair[0] += amount
+    pair[1] += count
+    if not pair[1] and not pair[0]:
+        del values[key]
+
+
+class Ledger:
+    """
+    On-chain donation ledger kept in step with the Ponder indexer, for the
+    ``/ledger`` endpoints, so dashboards stop pulling whole event tables.
+
+    Each sync reads only events above ``finalized_block`` (a ``blockNumber``
+    cursor, paged with Ponder's ``after`` cursors). Events within
+    LEDGER_REORG_DEPTH blocks of the head stay in a journal: if the indexer's
+    view of those blocks changed (a reorg), the journal is rewound back to the
+    first difference and the new events are applied instead. Deeper events are
+    final and only live on in the folded totals. State, cursor and journal are
+    written to LEDGER_STATE_PATH after every change, so a restart resumes from
+    there instead of re-reading the chain.
+
+    With several API processes on a host, only the one holding the state file's
+    lock (``{state_path}.lock``) follows the indexer and writes the file; the
+    others reload the file when it changes, and take the lock over if its
+    holder exits. Until the file exists they sync in memory on first use.
+
+    Once loaded, every event folded in and every rewind is also published on
+    the ``ledger`` topic of ``/events``, in every process.
+    """
+
+    def __init__(
+        self,
+        state_path: Optional[str] = LEDGER_STATE_PATH,
+        reorg_depth: int = LEDGER_REORG_DEPTH,
+        sync_interval: float = LEDGER_SYNC_INTERVAL,
+        page_size: int = LEDGER_PAGE_SIZE,
+        wakaf_address: str = LEDGER_WAKAF_ADDRESS,
+        token_address: str = LEDGER_TOKEN_ADDRESS,
+        project_wallets: Dict[str, List[str]] = LEDGER_PROJECT_WALLETS,
+        enabled: bool = LEDGER_ENABLED,
+    ):
+        self.state_path = state_path
+        self.enabled = enabled
+        self.project_wallets = project_wallets
+        self.reorg_depth = reorg_depth
+        self.sync_interval = sync_interval
+        self.page_size = page_size
+        self.wakaf_address = wakaf_address
+        self.token_address = token_address
+        self._reset()
+        self.rewound = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Open while this process holds the state file's lock
+        self._lock_fd: Optional[int] = None
+        # st_mtime_ns of the state file last loaded
+        self._loaded_mtime: Optional[int] = None
+
+    def _reset(self):
+        self.state = LedgerState(self.wakaf_address, self.token_address)
+        # Events at or below this block are folded for good; None until the first sync
+        self.finalized_block: Optional[int] = None
+        self.head_block: Optional[int] = None
+        # Applied events above finalized_block, in chain order
+        self.journal: List[Dict[str, Any]] = []
+        self.synced_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.synced_at is not None
+
+    @property
+    def leader(self) -> bool:
+        """Whether this process follows the indexer and writes the state file."""
+        return self._lock_fd is not None or not self.state_path
+
+    async def start(self):
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._try_lead)
+        await asyncio.to_thread(self.load)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def ensure_loaded(self):
+        if not self.loaded and not self.leader:
+            await self.follow()
+        if not self.loaded:
+            await self.sync()
+
+    def _try_lead(self) -> bool:
+        """Take the state file's lock if no other process holds it. The OS drops it when the holder exits."""
+        if self.leader:
+            return True
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        fd = os.open(f"{self.state_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"Ledger: this process follows the indexer and writes {self.state_path}")
+        return True
+
+    async def follow(self) -> int:
+        """
+        Reload the state file if the leading process rewrote it, publishing the
+        events it added and rewound since the last load. Returns the number added.
+        """
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if mtime == self._loaded_mtime:
+            return 0
+        async with self._lock:
+            live = self.loaded
+            journal = self.journal
+            if not await asyncio.to_thread(self.load):
+                return 0
+            if not live:
+                return 0
+            old = {_key(event) for event in journal}
+            new = {_key(event) for event in self.journal}
+            rewound = [event for event in journal if event["block"] > self.finalized_block and _key(event) not in new]
+            added = [event for event in self.journal if _key(event) not in old]
+            if rewound:
+                self.rewound += len(rewound)
+                event_hub.publish(
+                    LEDGER_TOPIC,
+                    "rewind",
+                    {"fromBlock": rewound[0]["block"], "ids": [event["id"] for event in rewound]},
+                )
+            for event in added:
+                event_hub.publish(LEDGER_TOPIC, event["kind"], _public(event))
+            return len(added)
+
+    async def sync(self) -> int:
+        """Fold in new events (rewinding reorged ones). Returns the number of events applied."""
+        async with self._lock:
+            # The first sync from scratch replays the whole chain; don't publish that
+            live = self.loaded
+            since = -1 if self.finalized_block is None else self.finalized_block
+            fetched = await self._fetch(since)
+
+            # Keep the journal up to the first event that differs from the indexer's. Whole
+            # events are compared: ids are "{block}-{logIndex}", which a reorged block reuses
+            keep = 0
+            while keep < min(len(self.journal), len(fetched)) and self.journal[keep] == fetched[keep]:
+                keep += 1
+            for event in reversed(self.journal[keep:]):
+                self.state.apply(event, -1)
+            if len(self.journal) > keep:
+                self.rewound += len(self.journal) - keep
+                logger.warning(f"Ledger: rewound {len(self.journal) - keep} events from block {self.journal[keep]['block']}")
+                if live:
+                    event_hub.publish(
+                        LEDGER_TOPIC,
+                        "rewind",
+                        {"fromBlock": self.journal[keep]["block"], "ids": [event["id"] for event in self.journal[keep:]]},
+                    )
+            for event in fetched[keep:]:
+                self.state.apply(event)
+                if live:
+                    event_hub.publish(LEDGER_TOPIC, event["kind"], _public(event))
+            changed = len(self.journal) != keep or len(fetched) != keep
+            self.journal = fetched
+
+            if fetched:
+                self.head_block = max(self.head_block or 0, fetched[-1]["block"])
+            if self.head_block is not None:
+                finalized = self.head_block - self.reorg_depth
+                if self.finalized_block is None or finalized > self.finalized_block:
+                    self.finalized_block = finalized
+                    self.journal = [event for event in self.journal if event["block"] > finalized]
+            self.synced_at = time.time()
+            if changed:
+                await self._save()
+            return len(fetched) - keep
+
+    async def _fetch(self, since: int) -> List[Dict[str, Any]]:
+        """Every counted event above block ``since``, in chain order (block, then log index)."""
+        events = []
+        for kind in _QUERIES:
+            async for items in self._pages(kind, since):
+                events.extend(event for event in (_event(kind, item) for item in items) if self.state.counts(event))
+        events.sort(key=lambda event: (event["block"], event["log"]))
+        return events
+
+    async def _pages(self, kind: str, since: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        field, selection = _QUERIES[kind]
+        query = _QUERY_TEMPLATE % (field, selection)
+        after = None
+        while True:
+            variables = {"from": str(since), "after": after, "limit": self.page_size}
+            result = await get_indexer().query({"query": query, "variables": variables})
+            if result.get("errors"):
+                raise IndexerError(f"Indexer error: {result['errors']}")
+            page = result["data"][field]
+            yield page["items"]
+            if not page["pageInfo"]["hasNextPage"]:
+                return
+            after = page["pageInfo"]["endCursor"]
+
+    def load(self) -> bool:
+        """Restore state saved by an earlier run, if there is one for this contract and token."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path) as f:
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+                data = json.load(f)
+            if data.get("version") != STATE_VERSION or (data["wakafAddress"], data["tokenAddress"]) != (
+                self.wakaf_address.lower(),
+                self.token_address.lower(),
+            ):
+                logger.warning(f"Ledger: ignoring {self.state_path}, it was written for another version or contract")
+                return False
+            self._reset()
+            self.state.load_json(data["state"])
+            self.finalized_block = data["finalizedBlock"]
+            self.head_block = data["headBlock"]
+            self.journal = data["journal"]
+            self.synced_at = data["syncedAt"]
+            self._loaded_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ledger: could not load {self.state_path}, starting over: {e}")
+            self._reset()
+            return False
+        logger.info(f"Ledger: resumed at block {self.finalized_block} (head {self.head_block})")
+        return True
+
+    async def _save(self):
+        # Only the lock holder writes; a process that synced in memory keeps its state to itself
+        if not self.state_path or not await asyncio.to_thread(self._try_lead):
+            return
+        data = json.dumps(
+            {
+                "version": STATE_VERSION,
+                "wakafAddress": self.wakaf_address.lower(),
+                "tokenAddress": self.token_address.lower(),
+                "finalizedBlock": self.finalized_block,
+                "headBlock": self.head_block,
+                "journal": self.journal,
+                "syncedAt": self.synced_at,
+                "state": self.state.to_json(),
+            },
+            separators=(",", ":"),
+        )
+        await asyncio.to_thread(_write_atomic, self.state_path, data.encode())
+
+    async def _run(self):
+        while True:
+            try:
+                if not self.leader:
+                    await self.follow()
+                # Took over from a holder that exited: carry on from the file just reloaded
+                if self.leader or await asyncio.to_thread(self._try_lead):
+                    await self.sync()
+            except Exception as e:
+                logger.error(f"Ledger sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    # Read side: plain lookups on the folded state; amounts as strings, like Ponder's BigInt
+
+    def summary(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "wakafAddress": state.wakaf_address,
+            "tokenAddress": state.token_address,
+            "wakafBalance": str(state.balances.get(state.wakaf_address, 0)),
+            "donated": str(state.totals["donated"]),
+            "donations": state.totals["donations"],
+            "paidOut": str(state.totals["paidOut"]),
+            "payouts": state.totals["payouts"],
+            "donors": len(state.donors),
+            "nazirs": len(state.nazirs),
+            "recipients": len(state.recipients),
+            "events": state.totals["events"],
+            "headBlock": self.head_block,
+            "finalizedBlock": self.finalized_block,
+            "syncedAt": self.synced_at,
+        }
+
+    def account(self, address: str) -> Dict[str, Any]:
+        address = address.lower()
+        state = self.state
+        donated = state.donors.get(address, [0, 0])
+        paid_out = state.nazirs.get(address, [0, 0])
+        received = state.recipients.get(address, [0, 0])
+        return {
+            "address": address,
+            "balance": str(state.balances.get(address, 0)),
+            "donated": str(donated[0]),
+            "donations": donated[1],
+            "paidOutAsNazir": str(paid_out[0]),
+            "payoutsAsNazir": paid_out[1],
+            "receivedPayouts": str(received[0]),
+            "payoutsReceived": received[1],
+        }
+
+    def project(self, project_id: str) -> Dict[str, Any]:
+        """Totals over a project's wallets (LEDGER_PROJECT_WALLETS)."""
+        state = self.state
+        wallets = [address.lower() for address in self.project_wallets.get(project_id, [])]
+        payouts = [state.recipients.get(address, [0, 0]) for address in wallets]
+        return {
+            "projectId": project_id,
+            "wallets": wallets,
+            "balance": str(sum(state.balances.get(address, 0) for address in wallets)),
+            "inflow": str(sum(state.received.get(address, 0) for address in wallets)),
+            "outflow": str(sum(state.sent.get(address, 0) for address in wallets)),
+            "receivedPayouts": str(sum(pair[0] for pair in payouts)),
+            "payoutsReceived": sum(pair[1] for pair in payouts),
+        }
+
+    def projects(self) -> List[Dict[str, Any]]:
+        return [self.project(project_id) for project_id in self.project_wallets]
+
+    def top(self, kind: str, limit: int) -> List[Dict[str, Any]]:
+        """Largest ``balances``, ``donors``, ``nazirs`` or ``recipients``."""
+        if kind == "balances":
+            rows = heapq.nlargest(limit, self.state.balances.items(), key=lambda item: item[1])
+            return [{"address": address, "amount": str(amount)} for address, amount in rows]
+        rows = heapq.nlargest(limit, getattr(self.state, kind).items(), key=lambda item: item[1][0])
+        return [{"address": address, "amount": str(pair[0]), "count": pair[1]} for address, pair in rows]
+
+    def daily(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day buckets with ``start <= day <= end`` (``YYYY-MM-DD``), oldest first."""
+        days = sorted(day for day in self.state.daily if (start is None or day >= start) and (end is None or day <= end))
+        return [
+            {
+                "day": day,
+                **{key: str(value) if key in _AMOUNTS else value for key, value in self.state.daily[day].items()},
+            }
+            for day in days
+        ]
+
+
+def _key(event: Dict[str, Any]) -> tuple:
+    """A journal event, hashable. Whole events, not ids: a reorged block reuses its ids."""
+    return tuple(sorted(event.items()))
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+ledger = Ledger()
+
+Gauge(
+    "ledger_head_block",
+    "Highest block folded into the donation ledger",
+    callback=lambda: {} if ledger.head_block is None else {(): ledger.head_block},
+)
@@ -0,0 +1,373 @@
+import asyncio
+import logging
+import math
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from py_app_service.config import (
+    MIRROR_ENABLED,
+    MIRROR_SYNC_INTERVAL,
+    MIRROR_FULL_SYNC_INTERVAL,
+    MIRROR_MAX_STALENESS,
+    POCKETBASE_PROJECTS_COLLECTION,
+    POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+    POCKETBASE_PAGE_SIZE,
+)
+from py_app_service.database.mongo import get_database
+from py_app_service.database.pocketbase import get_pocketbase, PocketBaseError
+from py_app_service.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Sort and field names the mirror can serve itself; anything fancier
+# (@random, modifiers like :excerpt, expand) goes to PocketBase
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# PocketBase's default page size
+DEFAULT_PER_PAGE = 30
+
+# Mirror bookkeeping stored next to each record, hidden from responses: the
+# sync pass that last saw it, and when it was last written
+_RUN_FIELD = "_mirrorRun"
+_WRITTEN_FIELD = "_mirroredAt"
+
+
+class CollectionMirror:
+    """
+    Read-model copy of one PocketBase collection in MongoDB (collection
+    ``pb_{name}``, one document per record with ``_id`` = record id).
+
+    ``sync()`` backfills every record the first time, then only fetches records
+    whose ``updated`` is at or after the newest one already mirrored. Records
+    deleted in PocketBase don't show up in that listing, so every
+    MIRROR_FULL_SYNC_INTERVAL the sync walks the whole collection again and
+    drops what it didn't see. The cursor is kept in ``mirror_state`` so a
+    restart resumes incrementally.
+
+    Reads are served from the mirror only while ``fresh``: its last successful
+    sync is under ``max_staleness`` seconds old. Callers fall back to
+    PocketBase otherwise. Writes go to PocketBase first and are then applied
+    here with ``upsert`` / ``delete`` (write-through); an upsert never replaces
+    a newer copy of the record.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        indexes: Sequence[Sequence[Tuple[str, int]]] = (),
+        enabled: bool = MIRROR_ENABLED,
+        max_staleness: float = MIRROR_MAX_STALENESS,
+        full_sync_interval: float = MIRROR_FULL_SYNC_INTERVAL,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.indexes = [list(index) for index in indexes]
+        self.max_staleness = max_staleness
+        self.full_sync_interval = full_sync_interval
+        self.cursor: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.full_synced_at: Optional[float] = None
+        self.syncs = 0
+        self.synced_records = 0
+        self.served = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def collection(self):
+        return get_database()[f"pb_{self.name}"]
+
+    @property
+    def _state(self):
+        return get_database()["mirror_state"]
+
+    @property
+    def staleness(self) -> Optional[float]:
+        return None if self.synced_at is None else time.time() - self.synced_at
+
+    @property
+    def fresh(self) -> bool:
+        staleness = self.staleness
+        return staleness is not None and staleness <= self.max_staleness
+
+    async def ensure_indexes(self):
+        for keys in [[("updated", 1)], [(_RUN_FIELD, 1)], *self.indexes]:
+            await self.collection.create_index(keys)
+
+    async def sync(self, full: Optional[bool] = None) -> int:
+        """Pull changes from PocketBase; returns how many records were written."""
+        async with self._lock:
+            if self.cursor is None:
+                state = await self._state.find_one({"_id": self.name})
+                if state is not None:
+                    self.cursor = state.get("cursor")
+                    self.full_synced_at = state.get("fullSyncedAt")
+            if full is None:
+                full = (
+                    self.cursor is None
+                    or self.full_synced_at is None
+                    or time.time() - self.full_synced_at > self.full_sync_interval
+                )
+
+            run = uuid.uuid4().hex
+            started = time.time()
+            written = 0
+            cursor = self.cursor
+            filter = None if full or cursor is None else f'updated >= "{cursor}"'
+            async for items in get_pocketbase().iter_pages(
+                self.name, per_page=POCKETBASE_PAGE_SIZE, filter=filter, sort="updated"
+            ):
+                if not items:
+                    continue
+                written += await self._write(items, run)
+                cursor = max(cursor or "", *(item.get("updated", "") for item in items))
+
+            now = time.time()
+            if full:
+                # Whatever this pass didn't see is gone from PocketBase, unless it
+                # was written through after the pass started
+                removed = await self.collection.delete_many(
+                    {_RUN_FIELD: {"$ne": run}, _WRITTEN_FIELD: {"$lt": started}}
+                )
+                if removed.deleted_count:
+                    logger.info(f"Mirror {self.name}: dropped {removed.deleted_count} deleted records")
+                self.full_synced_at = now
+            self.cursor = cursor
+            await self._state.replace_one(
+                {"_id": self.name},
+                {"cursor": cursor, "fullSyncedAt": self.full_synced_at, "syncedAt": now},
+                upsert=True,
+            )
+            self.synced_at = now
+            self.syncs += 1
+            self.synced_records += written
+            return written
+
+    async def _write(self, records: List[Dict[str, Any]], run: Optional[str] = None) -> int:
+        from pymongo import ReplaceOne
+        from pymongo.errors import BulkWriteError
+
+        operations = [
+            ReplaceOne(
+                # Only replace an older (or equally old) copy; a newer one makes the
+                # filter miss and the upsert hit a duplicate _id, which is skipped
+                {"_id": record["id"], "updated": {"$lte": record.get("updated", "")}},
+                {**record, "_id": record["id"], _RUN_FIELD: run, _WRITTEN_FIELD: time.time()},
+                upsert=True,
+            )
+            for record in records
+        ]
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            details = e.details
+            if run is not None:
+                # Still seen in this pass, keep it out of the full-sync cleanup. Errors
+                # point at their operation by index; drivers differ on what else they carry
+                stale = [records[error["index"]]["id"] for error in details["writeErrors"]]
+                await self.collection.update_many({"_id": {"$in": stale}}, {"$set": {_RUN_FIELD: run}})
+            return details.get("nUpserted", 0) + details.get("nModified", 0)
+        return result.upserted_count + result.modified_count
+
+    async def upsert(self, record: Dict[str, Any]):
+        """Write-through after creating or updating ``record`` in PocketBase; no-op while disabled."""
+        await self.upsert_many([record])
+
+    async def upsert_many(self, records: List[Dict[str, Any]]):
+        """``upsert`` for several records in one bulk write."""
+        if not self.enabled or not records:
+            return
+        try:
+            await self._write(records)
+        except Exception as e:
+            # PocketBase has the writes; the next sync picks them up
+            logger.warning(f"Mirror {self.name}: write-through of {len(records)} record(s) failed: {e}")
+
+    async def delete(self, record_id: str):
+        """Write-through after deleting the record in PocketBase; no-op while disabled."""
+        if not self.enabled:
+            return
+        try:
+            await self.collection.delete_one({"_id": record_id})
+        except Exception as e:
+            logger.warning(f"Mirror {self.name}: write-through delete of {record_id} failed: {e}")
+
+    async def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """The mirrored record, or None if it isn't here (yet): fall back to PocketBase then."""
+        record = await self.collection.find_one({"_id": record_id}, _projection(None))
+        if record is not None:
+            self.served += 1
+        return record
+
+    async def list(
+        self,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One page in PocketBase's list shape, or None if the sort or fields need
+        PocketBase itself. Filters are never translated; callers with a filter
+        go to PocketBase.
+        """
+        sort_keys = _sort(sort)
+        projection = _projection(fields)
+        if sort_keys is None or projection is None:
+            return None
+        page = page or 1
+        per_page = per_page or DEFAULT_PER_PAGE
+        total = await self.collection.count_documents({})
+        cursor = self.collection.find({}, projection).sort(sort_keys).skip((page - 1) * per_page).limit(per_page)
+        items = await cursor.to_list(length=per_page)
+        self.served += 1
+        return {
+            "page": page,
+            "perPage": per_page,
+            "totalItems": total,
+            "totalPages": math.ceil(total / per_page),
+            "items": items,
+        }
+
+    def iter_pages(
+        self,
+        per_page: int = POCKETBASE_PAGE_SIZE,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+        updated_since: Optional[str] = None,
+    ) -> Optional[AsyncIterator[List[Dict[str, Any]]]]:
+        """
+        Like ``PocketBaseClient.iter_pages`` without a filter (other than
+        ``updated >= updated_since``), or None if PocketBase has to serve it.
+        """
+        sort_keys = _sort(sort)
+        projection = _projection(fields)
+        if sort_keys is None or projection is None:
+            return None
+        self.served += 1
+        query = {} if updated_since is None else {"updated": {"$gte": updated_since}}
+
+        async def pages():
+            cursor = self.collection.find(query, projection).sort(sort_keys).batch_size(per_page)
+            page, yielded = [], False
+            async for record in cursor:
+                page.append(record)
+                if len(page) == per_page:
+                    yield page
+                    page, yielded = [], True
+            # Always at least one (possibly empty) page, like PocketBase
+            if page or not yielded:
+                yield page
+
+        return pages()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fresh": self.fresh,
+            "staleness": self.staleness,
+            "cursor": self.cursor,
+            "syncs": self.syncs,
+            "syncedRecords": self.synced_records,
+            "served": self.served,
+        }
+
+
+def _sort(sort: Optional[str]) -> Optional[List[Tuple[str, int]]]:
+    keys: List[Tuple[str, int]] = []
+    for part in (sort or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        direction = -1 if part.startswith("-") else 1
+        name = part.lstrip("+-")
+        if not _FIELD_RE.match(name):
+            return None
+        keys.append((name, direction))
+    if not keys:
+        keys.append(("created", 1))
+    # Stable paging for equal keys
+    keys.append(("_id", 1))
+    return keys
+
+
+def _projection(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    if not fields:
+        return {"_id": 0, _RUN_FIELD: 0, _WRITTEN_FIELD: 0}
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if not all(_FIELD_RE.match(name) for name in names):
+        return None
+    return {"_id": 0, **{name: 1 for name in names}}
+
+
+class MirrorSync:
+    """Keeps every mirror in sync from a background task (see app.py lifespan)."""
+
+    def __init__(self, mirrors: Dict[str, CollectionMirror], interval: float = MIRROR_SYNC_INTERVAL):
+        self.mirrors = mirrors
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if any(mirror.enabled for mirror in self.mirrors.values()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sync_all(self):
+        for mirror in self.mirrors.values():
+            if not mirror.enabled:
+                continue
+            started = time.perf_counter()
+            try:
+                written = await mirror.sync()
+            except PocketBaseError as e:
+                logger.error(f"Mirror {mirror.name}: sync from PocketBase failed: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Mirror {mirror.name}: sync failed: {e}")
+                continue
+            if written:
+                logger.info(f"Mirror {mirror.name}: synced {written} records in {time.perf_counter() - started:.2f}s")
+
+    async def _run(self):
+        for mirror in self.mirrors.values():
+            if not mirror.enabled:
+                continue
+            try:
+                await mirror.ensure_indexes()
+            except Exception as e:
+                logger.error(f"Mirror {mirror.name}: could not create indexes: {e}")
+        while True:
+            await self.sync_all()
+            await asyncio.sleep(self.interval)
+
+
+project_mirror = CollectionMirror(
+    POCKETBASE_PROJECTS_COLLECTION,
+    indexes=[[("created", 1), ("_id", 1)], [("type", 1)], [("verified", 1)]],
+)
+selected_project_mirror = CollectionMirror(
+    POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+    indexes=[[("created", 1), ("_id", 1)], [("isTrained", 1)], [("field", 1)]],
+)
+mirror_sync = MirrorSync({m.name: m for m in (project_mirror, selected_project_mirror)})
+
+
+def read_mirror(mirror: CollectionMirror) -> Optional[CollectionMirror]:
+    """``mirror`` if reads may be served from it right now, else None (use PocketBase)."""
+    return mirror if mirror.enabled and mirror.fresh else None
+
+
+Gauge(
+    "mirror_staleness_seconds", "Seconds since the MongoDB mirror of a collection last synced", ["collection"],
+    callback=lambda: {
+        (m.name,): m.staleness for m in mirror_sync.mirrors.values() if m.enabled and m.staleness is not None
+    },
+)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from py_app_service.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Window for the "recent" throughput figure
+RATE_WINDOW_SECONDS = 60.0
+
+stage_seconds = Histogram("pipeline_stage_duration_seconds", "Time one item spent in a pipeline stage's handler", ["stage"])
+
+
+class PipelineItem:
+    """One unit of work moving through the stages; ``future`` resolves when the last stage is done."""
+
+    def __init__(self, data: Any):
+        self.data = data
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class Stage:
+    """
+    ``concurrency`` workers taking items from a bounded ``inbox``, running
+    ``handler`` on each and passing them on to ``outbox``. A full outbox blocks
+    the workers, which in turn lets the inbox fill up: that is the backpressure
+    that keeps a slow stage from letting work pile up in memory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[None]],
+        concurrency: int,
+        queue_size: int,
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.outbox: Optional[asyncio.Queue] = None
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        self._completed_at: deque = deque()
+        self._started_at = time.monotonic()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self.inbox.empty():
+            item = self.inbox.get_nowait()
+            if not item.future.done():
+                item.future.cancel()
+
+    async def _work(self):
+        while True:
+            item: PipelineItem = await self.inbox.get()
+            if item.future.done():
+                # The submitter gave up on it
+                continue
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                await self.handler(item.data)
+            except asyncio.CancelledError:
+                if not item.future.done():
+                    item.future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                self.in_flight -= 1
+                self.busy_seconds += elapsed
+                stage_seconds.observe(elapsed, stage=self.name)
+
+            self._record_completion()
+            if self.outbox is not None:
+                await self.outbox.put(item)
+            elif not item.future.done():
+                item.future.set_result(item.data)
+
+    def _record_completion(self):
+        now = time.monotonic()
+        self.processed += 1
+        self._completed_at.append(now)
+        while self._completed_at and now - self._completed_at[0] > RATE_WINDOW_SECONDS:
+            self._completed_at.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._completed_at and now - self._completed_at[0] > RATE_WINDOW_SECONDS:
+            self._completed_at.popleft()
+        uptime = max(now - self._started_at, 1e-9)
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.inbox.qsize(),
+            "queue_size": self.inbox.maxsize,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_second": len(self._completed_at) / min(uptime, RATE_WINDOW_SECONDS),
+            "busy_ratio": self.busy_seconds / (uptime * self.concurrency),
+        }
+
+
+class Pipeline:
+    """Chains stages so that each one's outbox is the next one's inbox."""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.outbox = next_stage.inbox
+        self.running = False
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        self.running = True
+
+    async def stop(self):
+        self.running = False
+        for stage in self.stages:
+            await stage.stop()
+
+    async def run(self, data: Any) -> Any:
+        """Push ``data`` through every stage and return it once the last one is done."""
+        if not self.running:
+            self.start()
+        item = PipelineItem(data)
+        await self.stages[0].inbox.put(item)
+        try:
+            return await item.future
+        except asyncio.CancelledError:
+            item.future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in self.stages}
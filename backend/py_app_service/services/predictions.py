@@ -0,0 +1,193 @@
+"""
+Output formats for segmentation predictions (see ``compvis``).
+
+Inference produces "raw" predictions: one dict per detection holding NumPy
+arrays, ``{"confidence": float, "bbox": int32[4], "polygon": float32[K, 2]}``.
+``format_predictions`` turns them into what gets stored in ``trainData``:
+
+- ``verbose``: the original format, ``[{"confidence", "bbox": [x1, y1, x2, y2],
+  "polygon": [[x, y], ...]}, ...]``, kept for compatibility.
+- ``compact``: one object for the whole image. Polygons are simplified with
+  ``tolerance`` pixels, all coordinates are packed into flat arrays, and
+  aggregate stats are included::
+
+      {
+        "format": "compact", "encoding": "int16" | "float32" | "polyline",
+        "imageSize": [w, h],
+        "stats": {"count": n, "areaPx": total polygon area, "coverage": areaPx / (w * h)},
+        "confidence": [n floats],
+        "bbox": base64 array of n * 4 values (float32 with that encoding, else int16),
+        "polygonLengths": [vertices per polygon],
+        "polygons": base64 array of all vertices (x, y, x, y, ...), or for
+                    "polyline" a list of Google encoded polylines, one per polygon
+      }
+
+Base64 arrays are little-endian. Images too large for int16 coordinates fall
+back to float32. ``decode_compact`` reverses the packing.
+"""
+import base64
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from py_app_service.config import PREDICTION_FORMAT, PREDICTION_ENCODING, PREDICTION_SIMPLIFY_TOLERANCE
+
+Predictions = Union[List[Dict], Dict[str, Any]]
+
+ENCODINGS = ("int16", "float32", "polyline")
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def format_predictions(
+    predictions: List[Dict],
+    image_size: Tuple[int, int],
+    output_format: Optional[str] = None,
+    encoding: str = PREDICTION_ENCODING,
+    tolerance: float = PREDICTION_SIMPLIFY_TOLERANCE,
+) -> Predictions:
+    """Convert raw predictions for an image of ``image_size`` (w, h) to ``output_format``."""
+    output_format = output_format or PREDICTION_FORMAT
+    if output_format == "raw":
+        return predictions
+    if output_format == "verbose":
+        return [
+            {
+                "confidence": float(pred["confidence"]),
+                "bbox": np.asarray(pred["bbox"]).astype(int).tolist(),
+                "polygon": np.asarray(pred["polygon"], dtype=np.float32).reshape(-1, 2).tolist(),
+            }
+            for pred in predictions
+        ]
+    if output_format == "compact":
+        return to_compact(predictions, image_size, encoding, tolerance)
+    raise ValueError(f"Unknown prediction format: {output_format}")
+
+
+def to_compact(
+    predictions: List[Dict],
+    image_size: Tuple[int, int],
+    encoding: str = PREDICTION_ENCODING,
+    tolerance: float = PREDICTION_SIMPLIFY_TOLERANCE,
+) -> Dict[str, Any]:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown prediction encoding: {encoding} (choose from {', '.join(ENCODINGS)})")
+    width, height = image_size
+    if max(width, height) > _INT16_MAX:
+        # Integer coordinates wouldn't fit in int16
+        encoding = "float32"
+
+    polygons = [simplify_polygon(pred["polygon"], tolerance) for pred in predictions]
+    lengths = np.array([len(p) for p in polygons], dtype=np.int64)
+    vertices = np.concatenate(polygons) if polygons else np.empty((0, 2), dtype=np.float32)
+    boxes = np.array([pred["bbox"] for pred in predictions], dtype=np.float32).reshape(-1, 4)
+    confidences = np.array([pred["confidence"] for pred in predictions], dtype=np.float64)
+
+    area = float(polygon_areas(vertices, lengths).sum())
+    if encoding == "polyline":
+        offsets = np.cumsum(lengths)[:-1]
+        packed_polygons: Any = [encode_polyline(p) for p in np.split(vertices, offsets)] if len(lengths) else []
+    else:
+        packed_polygons = _b64(_pack(vertices, encoding))
+
+    return {
+        "format": "compact",
+        "encoding": encoding,
+        "imageSize": [int(width), int(height)],
+        "stats": {
+            "count": len(predictions),
+            "areaPx": round(area, 1),
+            "coverage": round(area / (width * height), 6) if width and height else 0.0,
+        },
+        "confidence": np.round(confidences, 4).tolist(),
+        "bbox": _b64(_pack(boxes, "float32" if encoding == "float32" else "int16")),
+        "polygonLengths": lengths.tolist(),
+        "polygons": packed_polygons,
+    }
+
+
+def decode_compact(compact: Dict[str, Any]) -> List[Dict]:
+    """Raw predictions back from a compact object (polygons as simplified and quantised)."""
+    box_dtype = "<f4" if compact["encoding"] == "float32" else "<i2"
+    boxes = np.frombuffer(base64.b64decode(compact["bbox"]), dtype=box_dtype).reshape(-1, 4).astype(np.int32)
+    lengths = compact["polygonLengths"]
+    if compact["encoding"] == "polyline":
+        polygons = [decode_polyline(p) for p in compact["polygons"]]
+    else:
+        dtype = "<i2" if compact["encoding"] == "int16" else "<f4"
+        vertices = np.frombuffer(base64.b64decode(compact["polygons"]), dtype=dtype).reshape(-1, 2).astype(np.float32)
+        polygons = np.split(vertices, np.cumsum(lengths)[:-1]) if lengths else []
+    return [
+        {"confidence": confidence, "bbox": box, "polygon": polygon}
+        for confidence, box, polygon in zip(compact["confidence"], boxes, polygons)
+    ]
+
+
+def simplify_polygon(polygon, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification (``cv2.approxPolyDP``); ``tolerance`` is in pixels."""
+    points = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+    if tolerance <= 0 or len(points) < 4:
+        return points
+    import cv2
+
+    return cv2.approxPolyDP(points.reshape(-1, 1, 2), tolerance, True).reshape(-1, 2)
+
+
+def polygon_areas(vertices: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Shoelace area of every polygon, for polygons stored back to back in ``vertices``."""
+    if not len(lengths):
+        return np.zeros(0)
+    x = vertices[:, 0].astype(np.float64)
+    y = vertices[:, 1].astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # Index of each vertex's successor, wrapping around within its own polygon
+    successor = np.arange(len(x)) + 1
+    ends = starts + lengths - 1
+    successor[ends[lengths > 0]] = starts[lengths > 0]
+    cross = x * y[successor] - x[successor] * y
+    nonempty = lengths > 0
+    areas = np.zeros(len(lengths))
+    areas[nonempty] = np.abs(np.add.reduceat(cross, starts[nonempty])) / 2
+    return areas
+
+
+def encode_polyline(points: np.ndarray) -> str:
+    """
+    Google encoded polyline of integer-rounded (x, y) points, vectorised: deltas
+    are zigzag encoded and split into 5-bit chunks, each chunk becomes one
+    printable character.
+    """
+    values = np.round(np.asarray(points, dtype=np.float64)).astype(np.int64).reshape(-1, 2)
+    if not len(values):
+        return ""
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    shifts = 5 * np.arange(7)
+    chunks = (zigzag[:, None] >> shifts) & 0x1F
+    count = 1 + ((zigzag[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    columns = np.arange(7)
+    # Every chunk but a value's last has the continuation bit set
+    chunks |= (columns < (count[:, None] - 1)) * 0x20
+    return (chunks[columns < count[:, None]] + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    values = []
+    value = shift = 0
+    for char in encoded.encode("ascii"):
+        chunk = char - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if not chunk & 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    return np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0).astype(np.float32)
+
+
+def _pack(vertices: np.ndarray, encoding: str) -> np.ndarray:
+    if encoding == "int16":
+        return np.round(vertices).astype("<i2")
+    return vertices.astype("<f4")
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from py_app_service.config import (
+    POCKETBASE_PROJECTS_COLLECTION,
+    PROJECT_FEED_REFRESH_INTERVAL,
+    PROJECT_FEED_FULL_REFRESH_INTERVAL,
+)
+from py_app_service.database.pocketbase import get_pocketbase
+from py_app_service.services.mirror import CollectionMirror, project_mirror, read_mirror
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectFeed:
+    """
+    The projects collection, fed to the in-memory views built on it (the geo
+    index and the impact store) so they share one load and one refresh loop
+    instead of each scanning the collection.
+
+    A view registers itself and implements ``replace(records)`` (everything,
+    after a full load) and ``upsert(record)`` (one changed record). Nothing is
+    fetched until a view is first queried and calls ``ensure_loaded``; only then
+    does the background refresh start, so a process that never serves those
+    routes never polls. Every PROJECT_FEED_REFRESH_INTERVAL the records whose
+    ``updated`` moved on are upserted, and every PROJECT_FEED_FULL_REFRESH_INTERVAL
+    the collection is reloaded, which drops projects deleted elsewhere.
+
+    Records are read from the MongoDB mirror while it is enabled and fresh,
+    from PocketBase otherwise.
+    """
+
+    def __init__(
+        self,
+        collection: str = POCKETBASE_PROJECTS_COLLECTION,
+        mirror: Optional[CollectionMirror] = project_mirror,
+        refresh_interval: float = PROJECT_FEED_REFRESH_INTERVAL,
+        full_refresh_interval: float = PROJECT_FEED_FULL_REFRESH_INTERVAL,
+    ):
+        self.collection = collection
+        self.mirror = mirror
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.views: list = []
+        self.cursor: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, view):
+        self.views.append(view)
+
+    async def ensure_loaded(self):
+        """Load on first use, then keep refreshing in the background."""
+        if self.loaded_at is None:
+            async with self._lock:
+                if self.loaded_at is None:
+                    await self._load()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self, full: bool = False) -> int:
+        """Reload every project (``full``) or just those updated since the last refresh."""
+        async with self._lock:
+            if full or self.loaded_at is None or self.cursor is None:
+                return await self._load()
+            changed = 0
+            async for items in self._pages(since=self.cursor):
+                for record in items:
+                    for view in self.views:
+                        view.upsert(record)
+                    self.cursor = max(self.cursor, record.get("updated", ""))
+                    changed += 1
+            return changed
+
+    def _pages(self, since: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        mirror = read_mirror(self.mirror) if self.mirror is not None else None
+        pages = mirror.iter_pages(sort="updated", updated_since=since) if mirror is not None else None
+        if pages is None:
+            filter = f'updated >= "{since}"' if since is not None else None
+            pages = get_pocketbase().iter_pages(self.collection, filter=filter, sort="updated")
+        return pages
+
+    async def _load(self) -> int:
+        records = []
+        async for items in self._pages():
+            records.extend(items)
+        # Each view builds aside and swaps in, so its queries keep using the old copy meanwhile
+        for view in self.views:
+            view.replace(records)
+        self.cursor = max((record.get("updated", "") for record in records), default=None)
+        self.loaded_at = time.time()
+        logger.info(f"Loaded {len(records)} projects for {len(self.views)} in-memory views")
+        return len(records)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                full = self.loaded_at is None or time.time() - self.loaded_at > self.full_refresh_interval
+                await self.refresh(full=full)
+            except Exception as e:
+                logger.error(f"Project feed refresh failed: {e}")
+
+
+project_feed = ProjectFeed()
@@ -0,0 +1,299 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from py_app_service.config import (
+    POCKETBASE_PROJECTS_COLLECTION,
+    PROJECTS_BULK_BATCH_SIZE,
+    PROJECTS_BULK_CONCURRENCY,
+    PROJECTS_BULK_MAX_ITEM_BYTES,
+)
+from py_app_service.database.pocketbase import PocketBaseError, get_pocketbase, id_filters
+from py_app_service.models.project import ProjectBulkItem, ProjectCreate
+from py_app_service.services.geo import project_geo_index
+from py_app_service.services.impact import impact_store
+from py_app_service.services.mirror import project_mirror
+
+_item_adapter = TypeAdapter(ProjectBulkItem)
+_decoder = json.JSONDecoder()
+
+# PocketBase's default record id: 15 characters of [a-z0-9]
+_ID_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+_ID_LENGTH = 15
+
+
+def project_to_pb(project: ProjectCreate, new: bool = True) -> Dict[str, Any]:
+    """
+    Map a ProjectCreate onto the PocketBase projects schema. For an update
+    (``new=False``) the schedule dates aren't generated, and an image that
+    wasn't given is left as stored.
+    """
+    # PocketBase schema provided:
+    # "location": {"lon": 0, "lat": 0}, "address": "test", "type": "test", "verified": true,
+    # "metrics": "JSON", "quickMetrics": "JSON", "sgds": "JSON", "maqasid": "JSON",
+    # "neededFund": 123, "currentFund": 123, "projectStartedAt": "...", "finishEstimationAt": "..."
+    data = {
+        "location": {
+            "lon": project.location.longitude,
+            "lat": project.location.latitude
+        },
+        "address": project.location.address,
+        "type": project.type,
+        "verified": project.verified,
+        "metrics": project.metrics.model_dump(), # PB JSON field
+        "quickMetrics": project.quickMetrics.model_dump(), # PB JSON field
+        "sgds": [str(sdg) for sdg in project.sdgs], # PB JSON field
+        "maqasid": project.maqasid, # PB JSON field
+        "neededFund": project.quickMetrics.needed, # Assuming mapping from quickMetrics
+        "currentFund": project.quickMetrics.beneficiaries, # Default or calculated?
+        "title": project.title,
+        "imageFile": project.image,
+    }
+    if new:
+        now = datetime.utcnow()
+        started_at = now - timedelta(days=random.randint(13, 30))
+        finish_at = now + timedelta(days=random.randint(180, 550))
+        data["projectStartedAt"] = started_at.isoformat() + "Z"
+        data["finishEstimationAt"] = finish_at.isoformat() + "Z"
+    elif "image" not in project.model_fields_set:
+        del data["imageFile"]
+    return data
+
+
+def record_id_for(key: str) -> str:
+    """
+    Deterministic PocketBase record id for an idempotency key: creating the same
+    key twice hits PocketBase's unique id check instead of making a duplicate.
+    """
+    number = int.from_bytes(hashlib.sha256(key.encode()).digest(), "big")
+    chars = []
+    for _ in range(_ID_LENGTH):
+        number, index = divmod(number, len(_ID_ALPHABET))
+        chars.append(_ID_ALPHABET[index])
+    return "".join(chars)
+
+
+def _is_duplicate_id(error: PocketBaseError) -> bool:
+    return error.status_code == 400 and "validation_not_unique" in error.body
+
+
+async def parse_items(
+    chunks: AsyncIterator[bytes], ndjson: bool, max_item_bytes: int = PROJECTS_BULK_MAX_ITEM_BYTES
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    ``(index, item)`` for each item of an NDJSON body (one object per line) or a
+    JSON array body, read as it arrives either way. An item that isn't valid
+    JSON comes out as a ``ValueError`` in its place; in an array, that (or an
+    item over ``max_item_bytes``) also ends the parse, since the items after it
+    can't be found.
+    """
+    if not ndjson:
+        async for index, item in _parse_array(chunks, max_item_bytes):
+            yield index, item
+        return
+
+    index, buffer = 0, b""
+
+    def decode(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return e
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, decode(line)
+                index += 1
+    if buffer.strip():
+        yield index, decode(buffer)
+
+
+async def _parse_array(chunks: AsyncIterator[bytes], max_item_bytes: int) -> AsyncIterator[Tuple[int, Any]]:
+    # Decoded a chunk at a time; only the item being read is kept in the buffer
+    chunks = chunks.__aiter__()
+    text, ended, index, opened = "", False, 0, False
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    async def more() -> bool:
+        nonlocal text, ended
+        try:
+            text += decoder.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            text += decoder.decode(b"", final=True)
+            ended = True
+        return not ended
+
+    while True:
+        text = text.lstrip()
+        if not opened:
+            if not text and await more():
+                continue
+            if not text.startswith("["):
+                yield index, ValueError("Expected a JSON array of projects")
+                return
+            text, opened = text[1:], True
+            continue
+        if index and text.startswith(","):
+            text = text[1:].lstrip()
+        if text.startswith("]"):
+            return
+        try:
+            item, end = _decoder.raw_decode(text)
+            # A value running to the end of what arrived (a number, say) may continue in the next chunk
+            complete = ended or text[end:].strip()
+        except ValueError as e:
+            item, end, complete = e, None, ended
+        if not complete:
+            if len(text.encode()) > max_item_bytes:
+                yield index, ValueError(f"Item is not valid JSON or is larger than {max_item_bytes} bytes")
+                return
+            await more()
+            continue
+        yield index, item
+        if end is None:
+            return
+        index += 1
+        text = text[end:]
+        if not text.lstrip().startswith((",", "]")):
+            yield index, ValueError("Expected ',' or ']' after an item")
+            return
+
+
+class ProjectImport:
+    """
+    Bulk create projects from ``(index, item)`` pairs (see ``parse_items``),
+    yielding one result per item: ``{"index", "status", "id", "externalId"}``
+    plus ``"error"`` where it failed. Status is ``created``, ``exists`` (an
+    earlier run already created it), ``invalid`` or ``failed``.
+
+    Items are validated and written a batch at a time, with at most
+    ``concurrency`` creates in flight. Idempotency: an item's ``externalId``
+    (or, when the request has an Idempotency-Key but the item has no
+    externalId, the key plus a hash of the item's content) is hashed into its
+    PocketBase record id, so a retried import finds the records it already
+    made, one filtered list request per batch, and never duplicates them, even
+    if the retry reorders or leaves out items. Items with neither get a random
+    id and no such guarantee.
+    """
+
+    def __init__(
+        self,
+        idempotency_key: Optional[str] = None,
+        batch_size: int = PROJECTS_BULK_BATCH_SIZE,
+        concurrency: int = PROJECTS_BULK_CONCURRENCY,
+    ):
+        self.idempotency_key = idempotency_key
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.counts: Dict[str, int] = {"created": 0, "exists": 0, "invalid": 0, "failed": 0}
+        # {item content hash: items with it so far}, for Idempotency-Key record ids
+        self._occurrences: Dict[str, int] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(self, items: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        batch: List[Tuple[int, Any]] = []
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                for result in await self._import_batch(batch):
+                    yield result
+                batch = []
+        if batch:
+            for result in await self._import_batch(batch):
+                yield result
+
+    def _key(self, item: ProjectBulkItem) -> Optional[str]:
+        if item.externalId:
+            return f"external:{item.externalId}"
+        if self.idempotency_key:
+            # By content rather than position, so a retry may reorder or drop items;
+            # identical items are told apart by how many came before them
+            digest = hashlib.sha256(item.model_dump_json(exclude={"externalId"}).encode()).hexdigest()
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+            return f"request:{self.idempotency_key}:{digest}:{occurrence}"
+        return None
+
+    async def _import_batch(self, batch: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        # [(index, item, record id or None)]
+        valid: List[Tuple[int, ProjectBulkItem, Optional[str]]] = []
+        for index, raw in batch:
+            if isinstance(raw, Exception):
+                results.append(self._result(index, "invalid", error=str(raw)))
+                continue
+            try:
+                item = _item_adapter.validate_python(raw)
+            except ValidationError as e:
+                results.append(self._result(index, "invalid", error=e.errors(include_url=False, include_input=False)))
+                continue
+            key = self._key(item)
+            valid.append((index, item, record_id_for(key) if key else None))
+
+        existing = await self._existing([record_id for _, _, record_id in valid if record_id])
+        to_create = []
+        for index, item, record_id in valid:
+            if record_id in existing:
+                results.append(self._result(index, "exists", record_id, item.externalId))
+            else:
+                to_create.append((index, item, record_id))
+
+        created = await asyncio.gather(*(self._create(*entry) for entry in to_create))
+        results.extend(result for result, _ in created)
+        records = [record for _, record in created if record is not None]
+        await project_mirror.upsert_many(records)
+        for record in records:
+            project_geo_index.upsert(record)
+            impact_store.upsert(record)
+        results.sort(key=lambda result: result["index"])
+        return results
+
+    async def _existing(self, record_ids: List[str]) -> set:
+        found = set()
+        for chunk, filter in id_filters(record_ids):
+            try:
+                result = await get_pocketbase().list_records(
+                    POCKETBASE_PROJECTS_COLLECTION, per_page=len(chunk), filter=filter, fields="id"
+                )
+            except PocketBaseError:
+                # Not fatal: creating them anyway still can't duplicate a deterministic id
+                continue
+            found.update(record["id"] for record in result.get("items", []))
+        return found
+
+    async def _create(self, index: int, item: ProjectBulkItem, record_id: Optional[str]):
+        data = project_to_pb(item)
+        if record_id is not None:
+            data["id"] = record_id
+        async with self._semaphore:
+            try:
+                record = await get_pocketbase().create_record(POCKETBASE_PROJECTS_COLLECTION, json=data)
+            except PocketBaseError as e:
+                if record_id is not None and _is_duplicate_id(e):
+                    # Created meanwhile, e.g. by an overlapping retry of this import
+                    return self._result(index, "exists", record_id, item.externalId), None
+                return self._result(index, "failed", record_id, item.externalId, error=str(e)), None
+        return self._result(index, "created", record["id"], item.externalId), record
+
+    def _result(
+        self,
+        index: int,
+        status: str,
+        record_id: Optional[str] = None,
+        external_id: Optional[str] = None,
+        error: Any = None,
+    ) -> Dict[str, Any]:
+        self.counts[status] += 1
+        result = {"index": index, "status": status, "id": record_id, "externalId": external_id}
+        if error is not None:
+            result["error"] = error
+        return result
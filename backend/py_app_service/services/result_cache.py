@@ -0,0 +1,154 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from py_app_service.config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# After an eviction pass the cache is trimmed down to this share of the limit,
+# so we don't evict again on the very next write
+_EVICT_TO = 0.9
+
+
+class ResultCache:
+    """
+    On-disk, content-addressed cache of inference results.
+
+    Entries are keyed by the SHA-256 of the image bytes together with the model
+    checksum and the conf/iou thresholds, and hold the predictions JSON plus
+    the annotated JPEG. Reads refresh an entry's mtime, and eviction removes
+    the least recently used entries once the directory grows past
+    ``max_bytes``.
+
+    Several worker processes can share one directory: files are written to a
+    temp name and renamed into place, and only one process evicts at a time
+    (guarded by an flock on ``.lock``).
+    """
+
+    def __init__(self, directory: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._approx_bytes: Optional[int] = None
+
+    @staticmethod
+    def key(
+        image_bytes,
+        model_checksum: str,
+        conf_threshold: float,
+        iou_threshold: float,
+        variant: str = "",
+    ) -> str:
+        """``variant`` covers any other setting that changes the output for the same image."""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return hashlib.sha256(
+            f"{digest}:{model_checksum}:{conf_threshold}:{iou_threshold}:{variant}".encode()
+        ).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".jpg"
+
+    def get(self, key: str) -> Optional[Tuple[bytes, List[Dict]]]:
+        json_path, jpg_path = self._paths(key)
+        try:
+            with open(json_path, "rb") as f:
+                predictions = json.load(f)
+            with open(jpg_path, "rb") as f:
+                encoded_image = f.read()
+            os.utime(json_path)
+            os.utime(jpg_path)
+        except (FileNotFoundError, ValueError):
+            # Missing, half-evicted or unreadable entry
+            self.misses += 1
+            return None
+        self.hits += 1
+        return encoded_image, predictions
+
+    def put(self, key: str, encoded_image: bytes, predictions: List[Dict]):
+        json_path, jpg_path = self._paths(key)
+        os.makedirs(os.path.dirname(json_path), exist_ok=True)
+        payload = json.dumps(predictions).encode()
+        # JPEG first: an entry only counts as present once its JSON is in place
+        self._write_atomic(jpg_path, encoded_image)
+        self._write_atomic(json_path, payload)
+
+        if self._approx_bytes is None:
+            self._approx_bytes = self._scan_size()
+        else:
+            self._approx_bytes += len(encoded_image) + len(payload)
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is already evicting
+                return
+            try:
+                entries = sorted(self._entries(), key=lambda entry: entry[1])
+                total = sum(size for _, _, size in entries)
+                target = self.max_bytes * _EVICT_TO
+                for path, _, size in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    if path.endswith(".json"):
+                        self.evictions += 1
+                self._approx_bytes = total
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "approx_bytes": self._approx_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
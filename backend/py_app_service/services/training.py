@@ -1,68 +1,213 @@
-import httpx
-import cv2
+import asyncio
 import numpy as np
 import io
-import os
 import json
 import logging
-from typing import List, Optional
-from py_app_service.config import POCKETBASE_BASE_URL, POCKETBASE_SELECTED_PROJECTS_COLLECTION
-from py_app_service.services.compvis import predict_solar_panel
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from py_app_service.config import (
+    POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+    POCKETBASE_UPLOAD_TIMEOUT,
+    TRAINING_CONCURRENCY,
+    TRAINING_RUNNER,
+    TRAINING_QUEUE_BACKEND,
+    TRAINING_QUEUE_NAME,
+    TRAINING_POLL_INTERVAL,
+    TRAINING_POLL_MAX_INTERVAL,
+    TRAINING_FAILED_COOLDOWN,
+    TRAINING_FETCH_CONCURRENCY,
+    JOB_HISTORY_SIZE,
+    TRAINING_DOWNLOAD_CONCURRENCY,
+    TRAINING_INFERENCE_CONCURRENCY,
+    TRAINING_UPLOAD_CONCURRENCY,
+    TRAINING_STAGE_QUEUE_SIZE,
+    TRAINING_MAX_IMAGE_BYTES,
+    RESULT_CACHE_ENABLED,
+    INFERENCE_DECODE_TARGET_SIZE,
+    INFERENCE_TILE_SIZE,
+    INFERENCE_TILE_OVERLAP,
+    PREDICTION_FORMAT,
+    PREDICTION_ENCODING,
+    PREDICTION_SIMPLIFY_TOLERANCE,
+)
+from py_app_service.database.pocketbase import (
+    get_pocketbase,
+    id_filters,
+    PocketBaseConnectionError,
+    PocketBaseError,
+    PocketBaseNotFound,
+)
+from py_app_service.models.job import Job, TrainingBatch, TrainingBatchStatus
+from py_app_service.services.claims import create_claims
+from py_app_service.services.jobs import JobQueue, JobSkipped, InMemoryJobBackend, RabbitJobBackend
+from py_app_service.services.events import event_hub
+from py_app_service.services.inference import InferenceBatcher
+from py_app_service.services.mirror import selected_project_mirror
+from py_app_service.services.pipeline import Pipeline, Stage
+from py_app_service.services.result_cache import ResultCache
+from py_app_service.services.training_bus import training_bus
+from py_app_service.services import compvis
+from py_app_service.utils.metrics import Gauge
 
 logger = logging.getLogger(__name__)
 
-async def fetch_image_as_numpy(url: str) -> Optional[np.ndarray]:
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url)
+class TrainingError(Exception):
+    """Processing a project failed; the job queue retries it with backoff."""
+
+class ClaimedElsewhere(JobSkipped):
+    """Another worker holds the record's claim; the job ends skipped, that worker trains it."""
+
+# The inference stage's workers share one batcher, so their images reach YOLO
+# as micro-batches instead of one forward pass each
+inference_batcher = InferenceBatcher()
+
+# Results of earlier runs on identical image bytes (same model and thresholds)
+result_cache = ResultCache() if RESULT_CACHE_ENABLED else None
+
+def _result_cache_key(content) -> str:
+    return ResultCache.key(
+        content,
+        compvis.model_checksum(),
+        inference_batcher.conf_threshold,
+        inference_batcher.iou_threshold,
+        # Downscaled decoding and tiling change the annotated image and the detections,
+        # the prediction format how they are stored
+        variant=(
+            f"decode{INFERENCE_DECODE_TARGET_SIZE}:tile{INFERENCE_TILE_SIZE}/{INFERENCE_TILE_OVERLAP}"
+            f":{PREDICTION_FORMAT}/{PREDICTION_ENCODING}/{PREDICTION_SIMPLIFY_TOLERANCE}"
+        ),
+    )
+
+async def fetch_image_bytes(url: str, max_bytes: int = TRAINING_MAX_IMAGE_BYTES) -> Optional[bytearray]:
+    """
+    Stream the image into a single buffer, preallocated from Content-Length when
+    the server sends one, instead of building up ``resp.content`` and copying it.
+    """
+    try:
+        async with get_pocketbase().http.stream("GET", url) as resp:
             if resp.status_code != 200:
                 logger.error(f"Failed to fetch image: {resp.status_code} {url}")
                 return None
-            image_array = np.asarray(bytearray(resp.content), dtype=np.uint8)
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-            return image
-        except Exception as e:
-            logger.error(f"Error downloading image: {e}")
-            return None
 
-async def process_project(project: dict):
-    project_id = project.get("id")
-    collection_id = project.get("collectionId")
-    before_train_filename = project.get("beforeTrain")
-    
-    if not before_train_filename:
-        logger.warning(f"Project {project_id} has no beforeTrain image.")
-        return
+            length = resp.headers.get("content-length")
+            if length is not None and length.isdigit():
+                if int(length) > max_bytes:
+                    logger.error(f"Image too large ({length} bytes): {url}")
+                    return None
+                buffer = bytearray(int(length))
+                view = memoryview(buffer)
+                filled = 0
+                async for chunk in resp.aiter_raw():
+                    view[filled:filled + len(chunk)] = chunk
+                    filled += len(chunk)
+                if filled != len(buffer):
+                    logger.error(f"Truncated image download ({filled}/{len(buffer)} bytes): {url}")
+                    return None
+                return buffer
 
-    # Construct image URL
-    if before_train_filename.startswith("http"):
-        image_url = before_train_filename
-    else:
-        image_url = f"{POCKETBASE_BASE_URL}/api/files/{collection_id}/{project_id}/{before_train_filename}"
+            buffer = bytearray()
+            async for chunk in resp.aiter_raw():
+                buffer += chunk
+                if len(buffer) > max_bytes:
+                    logger.error(f"Image too large (over {max_bytes} bytes): {url}")
+                    return None
+            return buffer
+    except Exception as e:
+        logger.error(f"Error downloading image: {e}")
+        return None
+
+async def fetch_image_as_numpy(url: str) -> Optional[np.ndarray]:
+    content = await fetch_image_bytes(url)
+    if content is None:
+        return None
+    image, _ = compvis.decode_image(content, target_size=0)
+    return image
+
+@dataclass
+class TrainingWork:
+    """A selected_project on its way through the download -> inference -> upload pipeline."""
+    project_id: str
+    filename: str
+    image_url: str
+    content: Optional[bytearray] = None
+    encoded_image: Optional[bytes] = None
+    predictions: Optional[list] = None
 
-    logger.info(f"Processing project {project_id} with image {image_url}")
 
+def training_topic(record_id: str) -> str:
+    """``/events`` topic carrying a selected project's job and stage events."""
+    return f"training:{record_id}"
+
+
+def _publish(record_id: str, event: str, data: Dict[str, Any]):
+    topic = training_topic(record_id)
+    event_hub.publish(topic, event, data)
+    # In a separate worker, the API processes republish it on their /events
+    training_bus.forward(topic, event, data)
+
+
+def _publish_stage(work: TrainingWork, stage: str):
+    _publish(work.project_id, "stage", {"recordId": work.project_id, "stage": stage})
+
+
+def _publish_job(job: Job):
+    _publish(
+        job.record_id,
+        "job",
+        {"recordId": job.record_id, "jobId": job.id, "status": job.status.value, "attempts": job.attempts,
+         "error": job.error},
+    )
+
+
+async def download_stage(work: TrainingWork):
+    _publish_stage(work, "download")
     # 1. Download Image
-    image = await fetch_image_as_numpy(image_url)
-    if image is None:
-        return
+    work.content = await fetch_image_bytes(work.image_url)
+    if work.content is None:
+        raise TrainingError(f"Could not download image {work.image_url}")
 
+
+async def inference_stage(work: TrainingWork):
+    _publish_stage(work, "inference")
     # 2. Run Inference
+    # Decode, inference, plot and JPEG encode all run on the inference executor,
+    # so the event loop keeps serving API requests meanwhile
     try:
-        annotated_image, predictions = predict_solar_panel(image)
+        cache_key = None
+        if result_cache is not None:
+            # Hashing and file reads are blocking; keep them off the event loop too
+            cache_key = await asyncio.to_thread(_result_cache_key, work.content)
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"Inference cache hit for project {work.project_id}")
+                work.encoded_image, work.predictions = cached
+                return
+
+        work.encoded_image, work.predictions = await inference_batcher.predict(work.content)
+        if cache_key is not None and work.encoded_image is not None:
+            try:
+                await asyncio.to_thread(result_cache.put, cache_key, work.encoded_image, work.predictions)
+            except OSError as e:
+                logger.warning(f"Could not write inference cache entry: {e}")
     except Exception as e:
-        logger.error(f"Error running inference on project {project_id}: {e}")
-        return
+        logger.error(f"Error running inference on project {work.project_id}: {e}")
+        raise TrainingError(f"Inference failed: {e}") from e
+    finally:
+        # The raw download isn't needed past this point; don't hold it while waiting to upload
+        work.content = None
+
+    if work.encoded_image is None:
+        logger.error(f"Failed to decode or encode image for project {work.project_id}")
+        raise TrainingError(f"Failed to decode or encode image for project {work.project_id}")
+
 
+async def upload_stage(work: TrainingWork):
+    _publish_stage(work, "upload")
     # 3. Prepare Upload
-    # Encode annotated image to memory buffer
-    success, encoded_image = cv2.imencode(".jpg", annotated_image)
-    if not success:
-        logger.error(f"Failed to encode annotated image for project {project_id}")
-        return
-    
-    image_bytes = io.BytesIO(encoded_image.tobytes())
-    image_bytes.name = f"after_{before_train_filename}" # Name is important for multipart
+    image_bytes = io.BytesIO(work.encoded_image)
+    image_bytes.name = f"after_{work.filename}" # Name is important for multipart
 
     # 4. Upload to PocketBase
     # We update the record with afterTrain image, isTrained=True, and trainData
@@ -80,71 +225,297 @@ async def process_project(project: dict):
     
     data = {
         "isTrained": "true",
-        "trainData": json.dumps(predictions) # Assuming 'trainData' is a JSON field in PB
+        "trainData": json.dumps(work.predictions) # Assuming 'trainData' is a JSON field in PB
     }
 
-    async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=60.0) as client:
-        try:
-            resp = await client.patch(
-                f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records/{project_id}",
-                data=data,
-                files=files
-            )
-            
-            if resp.status_code == 200:
-                logger.info(f"Successfully processed project {project_id}")
-            else:
-                logger.error(f"Failed to update project {project_id}: {resp.text}")
+    try:
+        record = await get_pocketbase().update_record(
+            POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+            work.project_id,
+            data=data,
+            files=files,
+            timeout=POCKETBASE_UPLOAD_TIMEOUT,
+        )
+        await selected_project_mirror.upsert(record)
+        logger.info(f"Successfully processed project {work.project_id}")
+    except PocketBaseConnectionError as e:
+        logger.error(f"Network error updating project {work.project_id}: {e}")
+        raise TrainingError(str(e)) from e
+    except PocketBaseError as e:
+        logger.error(f"Failed to update project {work.project_id}: {e.body}")
+        raise TrainingError(f"Failed to update project: {e.body}") from e
+    finally:
+        work.encoded_image = None
+
 
-        except httpx.HTTPError as e:
-            logger.error(f"Network error updating project {project_id}: {e}")
+# Each stage has its own workers and a bounded inbox, so downloads of the next
+# projects overlap inference of the current batch and uploads of the previous one
+training_pipeline = Pipeline([
+    Stage("download", download_stage, TRAINING_DOWNLOAD_CONCURRENCY, TRAINING_STAGE_QUEUE_SIZE),
+    Stage("inference", inference_stage, TRAINING_INFERENCE_CONCURRENCY, TRAINING_STAGE_QUEUE_SIZE),
+    Stage("upload", upload_stage, TRAINING_UPLOAD_CONCURRENCY, TRAINING_STAGE_QUEUE_SIZE),
+])
 
 
-async def process_training_job(target_ids: List[str] = None):
+async def process_project(project: dict):
+    project_id = project.get("id")
+    collection_id = project.get("collectionId")
+    before_train_filename = project.get("beforeTrain")
+    
+    if not before_train_filename:
+        logger.warning(f"Project {project_id} has no beforeTrain image.")
+        raise TrainingError(f"Project {project_id} has no beforeTrain image")
+
+    # Construct image URL
+    if before_train_filename.startswith("http"):
+        image_url = before_train_filename
+    else:
+        image_url = get_pocketbase().file_url(collection_id, project_id, before_train_filename)
+
+    logger.info(f"Processing project {project_id} with image {image_url}")
+
+    await training_pipeline.run(TrainingWork(project_id, before_train_filename, image_url))
+
+
+# Held while a record is being trained, so other training processes skip it
+training_claims = create_claims()
+
+
+async def train_record(record_id: str, record: Optional[dict] = None):
     """
-    target_ids: List of IDs to process. If ["*"] or None, process all pending.
+    Job handler: process one selected_project under a claim on it, fetching it
+    first if the submitter didn't (or if another process may have trained it
+    since the submitter's snapshot).
     """
-    while True:
-        logger.info("Starting training job...")
-    
-        async with httpx.AsyncClient(base_url=POCKETBASE_BASE_URL, timeout=30.0) as client:
-            projects_to_process = []
-            
-            if target_ids and "*" not in target_ids:
-                # Fetch specific projects
-                for pid in target_ids:
-                    try:
-                        resp = await client.get(f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records/{pid}")
-                        if resp.status_code == 200:
-                            proj = resp.json()
-                            if not proj.get("isTrained"):
-                                projects_to_process.append(proj)
-                    except Exception as e:
-                        logger.error(f"Error fetching project {pid}: {e}")
+    async with training_claims.claim(record_id) as claimed:
+        if not claimed:
+            raise ClaimedElsewhere(f"Project {record_id} is being trained by another worker")
+
+        if record is None or training_claims.shared:
+            try:
+                record = await get_pocketbase().get_record(POCKETBASE_SELECTED_PROJECTS_COLLECTION, record_id)
+            except PocketBaseNotFound:
+                logger.warning(f"Selected project {record_id} no longer exists, skipping")
+                return
+            except PocketBaseError as e:
+                raise TrainingError(f"Error fetching project {record_id}: {e}") from e
+
+        if record.get("isTrained"):
+            logger.info(f"Project {record_id} is already trained, skipping")
+            return
+
+        await process_project(record)
+
+
+# What a training job needs from a selected_project record
+TRAINING_RECORD_FIELDS = "id,collectionId,beforeTrain,isTrained"
+
+
+def _create_job_backend():
+    if TRAINING_QUEUE_BACKEND == "memory":
+        return InMemoryJobBackend()
+    if TRAINING_QUEUE_BACKEND == "rabbitmq":
+        return RabbitJobBackend(TRAINING_QUEUE_NAME, prefetch=TRAINING_CONCURRENCY)
+    raise ValueError(f"Unknown training queue backend: {TRAINING_QUEUE_BACKEND}")
+
+
+class TrainingScheduler:
+    """
+    Feeds pending selected_projects into the training job queue.
+
+    Scans PocketBase for ``isTrained=false`` records, sleeping
+    TRAINING_POLL_INTERVAL between scans and doubling that (up to
+    TRAINING_POLL_MAX_INTERVAL) while nothing is pending. ``wake()`` triggers a
+    scan right away, e.g. after a new upload.
+
+    Explicit ids go through ``submit`` instead, which looks them all up at once
+    rather than leaving every job to fetch its own record.
+    """
+
+    def __init__(self, queue: JobQueue, on_batch: Optional[Callable[[TrainingBatch], None]] = None):
+        self.queue = queue
+        # Called with each batch once it is resolved
+        self.on_batch = on_batch
+        self.batches: "OrderedDict[str, TrainingBatch]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._resolving: set = set()
+
+    async def start(self):
+        await self.queue.start()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in self._resolving:
+            task.cancel()
+        await asyncio.gather(*self._resolving, return_exceptions=True)
+        await self.queue.stop()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def submit(self, record_ids: List[str], batch_id: Optional[str] = None) -> TrainingBatch:
+        """
+        Queue training for explicit record ids and return the batch handle right
+        away. In the background, duplicate ids and ids with an active job are
+        dropped, the rest are fetched with chunked ``id="a" || id="b"`` filters,
+        TRAINING_FETCH_CONCURRENCY requests at a time, and already-trained or
+        missing records are skipped before anything is queued or downloaded.
+
+        ``batch_id`` keeps the id the API handed out for a batch sent over the
+        training bus.
+        """
+        batch = TrainingBatch.new(record_ids, batch_id)
+        self.batches[batch.id] = batch
+        while len(self.batches) > JOB_HISTORY_SIZE:
+            oldest_id, oldest = next(iter(self.batches.items()))
+            if oldest.status == TrainingBatchStatus.resolving:
+                break
+            del self.batches[oldest_id]
+
+        task = asyncio.create_task(self._resolve(batch))
+        self._resolving.add(task)
+        task.add_done_callback(self._resolving.discard)
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[TrainingBatch]:
+        return self.batches.get(batch_id)
+
+    async def _resolve(self, batch: TrainingBatch):
+        try:
+            lookup = []
+            for record_id in batch.record_ids:
+                job = self.queue.get_for_record(record_id)
+                if job is not None:
+                    batch.jobs[record_id] = job.id
+                else:
+                    lookup.append(record_id)
+
+            semaphore = asyncio.Semaphore(TRAINING_FETCH_CONCURRENCY)
+            await asyncio.gather(*(
+                self._resolve_chunk(batch, chunk, filter, semaphore) for chunk, filter in id_filters(lookup)
+            ))
+            batch.status = TrainingBatchStatus.submitted
+            logger.info(
+                f"Training batch {batch.id}: {len(batch.jobs)} jobs, {len(batch.skipped)} skipped, "
+                f"{batch.duplicates} duplicate ids"
+            )
+        except Exception as e:
+            logger.error(f"Training batch {batch.id} failed: {e}")
+            batch.status = TrainingBatchStatus.failed
+            batch.error = str(e)
+        batch.updated_at = time.time()
+        if self.on_batch is not None:
+            self.on_batch(batch)
+
+    async def _resolve_chunk(self, batch: TrainingBatch, chunk: List[str], filter: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                page = await get_pocketbase().list_records(
+                    POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+                    per_page=len(chunk),
+                    filter=filter,
+                    fields=TRAINING_RECORD_FIELDS,
+                )
+            except PocketBaseError as e:
+                # Queue them anyway; each job fetches its own record and retries with backoff
+                logger.warning(f"Could not look up {len(chunk)} selected projects, queueing them unchecked: {e}")
+                for record_id in chunk:
+                    batch.jobs[record_id] = (await self.queue.submit(record_id)).id
+                return
+
+        records = {record["id"]: record for record in page.get("items", [])}
+        for record_id in chunk:
+            record = records.get(record_id)
+            if record is None:
+                batch.skipped[record_id] = "not_found"
+            elif record.get("isTrained"):
+                batch.skipped[record_id] = "already_trained"
             else:
-                # Fetch all pending projects
-                # Filter by isTrained = false
-                try:
-                    # PocketBase filter syntax: isTrained=false
-                    resp = await client.get(
-                        f"/api/collections/{POCKETBASE_SELECTED_PROJECTS_COLLECTION}/records",
-                        params={"filter": "isTrained=false", "perPage": 50}
-                    )
-                    if resp.status_code == 200:
-                        projects_to_process = resp.json().get("items", [])
-                    else:
-                        logger.error(f"Error searching projects: {resp.text}")
-                except Exception as e:
-                    logger.error(f"Error fetching pending projects: {e}")
-
-            logger.info(f"Found {len(projects_to_process)} projects to process.")
-            
-            for project in projects_to_process:
-                await process_project(project)
-
-        logger.info("Training job finished.")
-
-        # Sleep for 10 seconds to avoid overwhelming the system
-        print("Sleeping for 50 seconds to avoid overwhelming the system")
-        await asyncio.sleep(50)
+                batch.jobs[record_id] = (await self.queue.submit(record_id, record)).id
+
+    async def scan(self) -> int:
+        """Queue every pending record that isn't already queued; returns how many were new."""
+        submitted = 0
+        try:
+            async for project in get_pocketbase().iter_records(
+                POCKETBASE_SELECTED_PROJECTS_COLLECTION,
+                # PocketBase filter syntax: isTrained=false. Training flips records out of
+                # this filter while we walk it, so page by cursor rather than page number
+                filter="isTrained=false",
+                fields=TRAINING_RECORD_FIELDS,
+                after=True,
+            ):
+                record_id = project["id"]
+                if self.queue.get_for_record(record_id) or self.queue.recently_failed(record_id, TRAINING_FAILED_COOLDOWN):
+                    continue
+                if training_claims.shared and await training_claims.is_claimed(record_id):
+                    # Another worker is on it
+                    continue
+                await self.queue.submit(record_id, project)
+                submitted += 1
+        except PocketBaseConnectionError as e:
+            logger.error(f"Error fetching pending projects: {e}")
+        except PocketBaseError as e:
+            logger.error(f"Error searching projects: {e.body}")
+        return submitted
+
+    async def _run(self):
+        interval = TRAINING_POLL_INTERVAL
+        while True:
+            self._wakeup.clear()
+            submitted = await self.scan()
+            if submitted:
+                logger.info(f"Queued {submitted} projects for training.")
+                interval = TRAINING_POLL_INTERVAL
+            else:
+                interval = min(interval * 2, TRAINING_POLL_MAX_INTERVAL)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                interval = TRAINING_POLL_INTERVAL
+            except asyncio.TimeoutError:
+                pass
+
+
+# Job status changes go out on /events, so clients don't poll for isTrained
+training_jobs = JobQueue(train_record, backend=_create_job_backend(), on_status=_publish_job)
+training_scheduler = TrainingScheduler(training_jobs)
+
+
+async def wake_training():
+    """Have pending projects scanned now: by this process's scheduler, or by the workers over the training bus."""
+    if TRAINING_RUNNER == "embedded":
+        training_scheduler.wake()
+        return
+    try:
+        await training_bus.wake()
+    except Exception as e:
+        # They still scan on their own schedule
+        logger.warning(f"Could not wake the training workers: {e}")
 
+# Queue depths and in-flight counts, read from their owners at scrape time
+Gauge(
+    "training_stage_queue_depth", "Items waiting in a training pipeline stage's inbox", ["stage"],
+    callback=lambda: {(stage.name,): stage.inbox.qsize() for stage in training_pipeline.stages},
+)
+Gauge(
+    "training_stage_in_flight", "Items a training pipeline stage is working on", ["stage"],
+    callback=lambda: {(stage.name,): stage.in_flight for stage in training_pipeline.stages},
+)
+Gauge(
+    "training_jobs", "Training jobs waiting in the queue or running", ["state"],
+    callback=lambda: {("queued",): training_jobs.qsize(), ("running",): training_jobs.running},
+)
+Gauge(
+    "inference_batcher_pending_images", "Images waiting to be collected into a micro-batch",
+    callback=lambda: {(): inference_batcher.pending},
+)
+Gauge(
+    "inference_batches_running", "Micro-batches running on the inference executor",
+    callback=lambda: {(): inference_batcher.running},
+)
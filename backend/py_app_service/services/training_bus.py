@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from py_app_service.config import EVENTS_HISTORY_SIZE, JOB_HISTORY_SIZE, TRAINING_BUS_PREFIX
+from py_app_service.database.redis import get_redis
+from py_app_service.models.job import Job, TrainingBatch
+from py_app_service.services.events import event_hub
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingBus:
+    """
+    Redis channels between the API and separate training workers
+    (TRAINING_RUNNER = "worker"), so the training routes behave as they do
+    when training is embedded:
+
+    - ``{prefix}wake`` (pub/sub): every worker scans for pending projects now
+    - ``{prefix}batches`` (list): explicit-id batches from POST /training/process;
+      one worker pops each and resolves it as the embedded scheduler would
+    - ``{prefix}updates`` (pub/sub): the workers' ``training:{id}`` events and
+      batch updates. Every API process republishes the events on its own
+      ``/events`` hub and keeps the latest job and batch states for
+      GET /training/jobs/{id} and /training/batches/{id}.
+
+    The API side runs ``start_relay``, the workers ``serve``.
+    """
+
+    def __init__(
+        self,
+        prefix: str = TRAINING_BUS_PREFIX,
+        history_size: int = JOB_HISTORY_SIZE,
+        outbox_size: int = EVENTS_HISTORY_SIZE,
+    ):
+        self.wake_channel = f"{prefix}wake"
+        self.batch_list = f"{prefix}batches"
+        self.update_channel = f"{prefix}updates"
+        self.history_size = history_size
+        self.outbox_size = outbox_size
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.batches: "OrderedDict[str, TrainingBatch]" = OrderedDict()
+        # Updates waiting to be published; only set while serving
+        self._outbox: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._outbox = None
+
+    # API side
+
+    async def start_relay(self):
+        self._tasks = [asyncio.create_task(self._listen(self.update_channel, self._on_update))]
+
+    async def wake(self):
+        await get_redis().publish(self.wake_channel, b"wake")
+
+    async def submit(self, record_ids: List[str]) -> TrainingBatch:
+        """Hand explicit ids to whichever worker pops them first; the batch is resolved there."""
+        batch = TrainingBatch.new(record_ids)
+        self._keep(self.batches, batch.id, batch)
+        await get_redis().lpush(self.batch_list, json.dumps({"id": batch.id, "ids": record_ids}))
+        return batch
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Optional[TrainingBatch]:
+        return self.batches.get(batch_id)
+
+    async def _on_update(self, raw: bytes):
+        update = json.loads(raw)
+        if update["kind"] == "batch":
+            batch = TrainingBatch(**update["batch"])
+            self._keep(self.batches, batch.id, batch)
+            return
+        event_hub.publish(update["topic"], update["event"], update["data"])
+        if update["event"] == "job":
+            data = update["data"]
+            previous = self.jobs.get(data["jobId"])
+            now = time.time()
+            job = Job(
+                id=data["jobId"],
+                record_id=data["recordId"],
+                status=data["status"],
+                attempts=data["attempts"],
+                error=data["error"],
+                created_at=previous.created_at if previous is not None else now,
+                updated_at=now,
+            )
+            self._keep(self.jobs, job.id, job)
+
+    def _keep(self, items: OrderedDict, key: str, value):
+        items.pop(key, None)
+        items[key] = value
+        while len(items) > self.history_size:
+            items.popitem(last=False)
+
+    # Worker side
+
+    async def serve(self, scheduler):
+        """Take wake-ups and batches for ``scheduler`` and publish what this worker does."""
+        self._outbox = asyncio.Queue(maxsize=self.outbox_size)
+        scheduler.on_batch = self.publish_batch
+
+        async def wake(_raw: bytes):
+            scheduler.wake()
+
+        self._tasks = [
+            asyncio.create_task(self._listen(self.wake_channel, wake)),
+            asyncio.create_task(self._take_batches(scheduler)),
+            asyncio.create_task(self._send()),
+        ]
+
+    def forward(self, topic: str, event: str, data: Dict[str, Any]):
+        """Pass an ``/events`` event on to the API processes; a no-op unless serving."""
+        self._put({"kind": "event", "topic": topic, "event": event, "data": data})
+
+    def publish_batch(self, batch: TrainingBatch):
+        self._put({"kind": "batch", "batch": batch.model_dump(mode="json")})
+
+    def _put(self, update: Dict[str, Any]):
+        if self._outbox is None:
+            return
+        try:
+            self._outbox.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Training bus: Redis is falling behind, dropping an update")
+
+    async def _send(self):
+        while True:
+            update = await self._outbox.get()
+            try:
+                await get_redis().publish(self.update_channel, json.dumps(update))
+            except Exception as e:
+                logger.warning(f"Training bus: could not publish an update: {e}")
+
+    async def _take_batches(self, scheduler):
+        while True:
+            try:
+                _, raw = await get_redis().brpop(self.batch_list)
+            except Exception as e:
+                logger.error(f"Training bus: could not read batches ({e}), retrying")
+                await asyncio.sleep(1.0)
+                continue
+            request = json.loads(raw)
+            scheduler.submit(request["ids"], batch_id=request["id"])
+
+    async def _listen(self, channel: str, handle: Callable[[bytes], Awaitable[None]]):
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub()
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        await handle(message["data"])
+                    except Exception as e:
+                        logger.warning(f"Training bus: bad message on {channel}: {e}")
+            except Exception as e:
+                logger.error(f"Training bus: lost {channel} ({e}), resubscribing")
+                await asyncio.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+
+training_bus = TrainingBus()
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from py_app_service.config import CACHE_BACKEND, CACHE_MAX_ENTRIES
+
+_MISSING = object()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with a per-entry TTL. Values are stored as-is."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str):
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+
+class RedisCacheBackend:
+    """
+    Shared cache in the Redis from docker-compose. Values must be JSON-serialisable;
+    expiry and eviction are left to Redis itself.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        # Not tracked locally; Redis owns the keyspace
+        return 0
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    @property
+    def _redis(self):
+        from py_app_service.database.redis import get_redis
+        return get_redis()
+
+    async def get(self, key: str) -> Any:
+        raw = await self._redis.get(self._key(key))
+        if raw is None:
+            return _MISSING
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._redis.set(self._key(key), json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._redis.delete(self._key(key))
+
+    async def delete_prefix(self, prefix: str):
+        keys = [k async for k in self._redis.scan_iter(match=self._key(prefix) + "*")]
+        if keys:
+            await self._redis.delete(*keys)
+
+
+def create_backend(name: str, backend: str = CACHE_BACKEND):
+    if backend == "memory":
+        return MemoryCacheBackend()
+    if backend == "redis":
+        return RedisCacheBackend(name)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+class ResponseCache:
+    """
+    Read-through cache for mapped API responses.
+
+    ``get_or_load`` collapses concurrent misses for the same key into a single
+    call to ``loader`` (single-flight). Invalidation bumps a generation counter
+    so a load that raced with a write is returned to its callers but not stored.
+    """
+
+    def __init__(self, name: str, ttl: float, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend if backend is not None else create_backend(name)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._generation = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        caches[name] = self
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """``cacheable`` can veto storing a loaded value; it is still returned to every waiter."""
+        value = await self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so the loop doesn't warn when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if generation == self._generation and self.ttl > 0 and (cacheable is None or cacheable(value)):
+            await self.backend.set(key, value, self.ttl)
+        future.set_result(value)
+        return value
+
+    async def invalidate(self, key: str):
+        self._generation += 1
+        await self.backend.delete(key)
+
+    async def invalidate_prefix(self, prefix: str):
+        self._generation += 1
+        await self.backend.delete_prefix(prefix)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.backend.evictions,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+# Every ResponseCache registers itself here so /cache/stats can report on it
+caches: Dict[str, ResponseCache] = {}
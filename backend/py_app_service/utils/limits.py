@@ -0,0 +1,74 @@
+from typing import Dict
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as-is (413)
+    # instead of turning it into a generic 400
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body too large (limit {limit} bytes)")
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies over a per-route limit with 413 before they are
+    parsed. A declared Content-Length is checked up front. Chunked uploads are
+    counted as they stream in and cut off as soon as they pass the limit.
+
+    ``limits`` maps ``(method, path)`` to the maximum body size in bytes.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[tuple, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get((scope["method"], scope["path"].rstrip("/")))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await _reject(limit, scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestTooLarge(limit)
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            if not response_started:
+                await _reject(limit, scope, receive, send)
+
+
+async def _reject(limit: int, scope: Scope, receive: Receive, send: Send):
+    response = JSONResponse(
+        {"detail": RequestTooLarge(limit).detail},
+        status_code=413,
+        headers={"Connection": "close"},
+    )
+    await response(scope, receive, send)
@@ -0,0 +1,273 @@
+import bisect
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a fast cache hit up to a slow upload or a cold model load
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    Base for the in-process metrics below, rendered on ``GET /metrics`` in the
+    Prometheus text format. Label values are passed as keyword arguments and
+    must match ``labels``. Updates take a lock so executor threads can record too.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        registry[name] = self
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labels, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Either set it directly, or pass ``callback``
+    returning ``{label values tuple: value}`` to read it from its owner at scrape
+    time (queue depths, pool sizes).
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextlib.contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterator[str]:
+        values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception as e:
+                # e.g. its owner isn't started yet; don't fail the whole scrape over one gauge
+                logger.debug(f"Skipping gauge {self.name}: {e}")
+        for key, value in values.items():
+            yield f"{self.name}{self._format_labels(tuple(str(v) for v in key))} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # {label values: [per-bucket counts..., +Inf count, sum]}
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, state in list(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket{self._format_labels(key, ('le', le))} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{self._format_labels(key)} {_format_value(state[-1])}"
+            yield f"{self.name}_count{self._format_labels(key)} {_format_value(cumulative)}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in registry.values()) + "\n"
+
+
+# Every metric registers itself here so /metrics can export it
+registry: Dict[str, Metric] = {}
+
+
+# Shared metrics recorded across the app. Router-, service- and pipeline-specific
+# gauges are declared next to what they measure.
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, by router and route template",
+    ["router", "method", "route", "status"],
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served", ["router"])
+upstream_request_seconds = Histogram(
+    "upstream_request_duration_seconds",
+    "Time for a call to an upstream service (PocketBase per collection, the indexer)",
+    ["service", "collection", "method", "status"],
+)
+upstream_requests_in_flight = Gauge("upstream_requests_in_flight", "Upstream calls waiting for a response", ["service"])
+
+
+@contextlib.contextmanager
+def time_upstream(service: str, collection: str, method: str) -> Iterator[dict]:
+    """
+    Time one upstream call. Set ``outcome["status"]`` to the response status
+    inside the block; connection errors are recorded as "error".
+    """
+    outcome = {"status": "error"}
+    started = time.perf_counter()
+    upstream_requests_in_flight.inc(service=service)
+    try:
+        yield outcome
+    finally:
+        upstream_requests_in_flight.dec(service=service)
+        upstream_request_seconds.observe(
+            time.perf_counter() - started,
+            service=service, collection=collection, method=method, status=str(outcome["status"]),
+        )
+
+
+class MetricsMiddleware:
+    """
+    Records request latency and in-flight counts per router. The route label is
+    the matched path template (``/projects/{id}``) so ids don't blow up the label
+    set; unmatched paths are grouped under ``router="unmatched"``.
+
+    ``on_request_done(scope, started, duration)`` is called after every request,
+    e.g. to hand slow ones to the sampling profiler.
+    """
+
+    def __init__(self, app: ASGIApp, on_request_done: Optional[Callable[[Scope, float, float], None]] = None):
+        self.app = app
+        self.on_request_done = on_request_done
+        self._routers: Optional[set] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._routers is None:
+            # Starlette puts the app on the scope before running the middleware stack
+            self._routers = {_router_for_path(route.path) for route in scope["app"].routes}
+        router = _router_for_path(scope["path"])
+        if router not in self._routers:
+            router = "unmatched"
+        status = 500
+
+        async def tracking_send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_wall = time.time()
+        started = time.perf_counter()
+        http_requests_in_flight.inc(router=router)
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec(router=router)
+            # FastAPI stores the matched route on the scope during routing
+            route = scope.get("route")
+            http_request_seconds.observe(
+                duration,
+                router=router if route is not None else "unmatched",
+                method=scope["method"],
+                route=route.path if route is not None else "",
+                status=str(status),
+            )
+            if self.on_request_done is not None:
+                self.on_request_done(scope, started_wall, duration)
+
+
+def _router_for_path(path: str) -> str:
+    # "/projects/abc" -> "projects", "/" -> "root"
+    return path.strip("/").split("/", 1)[0] or "root"
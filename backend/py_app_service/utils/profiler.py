@@ -0,0 +1,136 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+from starlette.types import Scope
+
+from py_app_service.config import (
+    PROFILE_SLOW_REQUEST_SECONDS,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_WINDOW_SECONDS,
+    PROFILE_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+Stack = Tuple[str, ...]
+
+
+class StackSampler:
+    """
+    Opt-in sampling profiler for slow requests.
+
+    A daemon thread snapshots the event loop thread's Python stack every
+    ``interval`` seconds into a ring buffer covering the last ``window`` seconds.
+    When a request takes longer than ``slow_request_seconds``, the samples
+    taken while it ran are folded (one ``frame;frame;frame count`` line per
+    distinct stack, the input format of flamegraph.pl and speedscope), the top
+    stacks are logged and the whole profile is written to ``directory``.
+
+    Every request shares the one event loop, so the samples show whatever was
+    running on it, which is what makes a request slow in the first place:
+    blocking code in any handler shows up here.
+    """
+
+    def __init__(
+        self,
+        slow_request_seconds: float = PROFILE_SLOW_REQUEST_SECONDS,
+        interval: float = PROFILE_SAMPLE_INTERVAL,
+        window: float = PROFILE_WINDOW_SECONDS,
+        directory: str = PROFILE_DIR,
+        top: int = 5,
+    ):
+        self.slow_request_seconds = slow_request_seconds
+        self.interval = interval
+        self.directory = directory
+        self.top = top
+        self.dumps = 0
+        self._samples: Deque[Tuple[float, Stack]] = collections.deque(maxlen=max(int(window / interval), 1))
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.slow_request_seconds > 0
+
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling ``thread_id``, by default the calling thread (call it from the event loop)."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._target = thread_id if thread_id is not None else threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler on: dumping stacks of requests slower than {self.slow_request_seconds}s")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._samples.append((time.time(), _stack(frame)))
+
+    def folded(self, started: float, ended: float) -> Dict[Stack, int]:
+        counts: Dict[Stack, int] = collections.Counter()
+        for taken_at, stack in list(self._samples):
+            if started <= taken_at <= ended:
+                counts[stack] += 1
+        return counts
+
+    def on_request_done(self, scope: Scope, started: float, duration: float):
+        """``MetricsMiddleware`` hook: dump the hot stacks of a request that ran too long."""
+        if self._thread is None or duration < self.slow_request_seconds:
+            return
+        counts = self.folded(started, started + duration)
+        if not counts:
+            return
+        request = f"{scope['method']} {scope['path']}"
+        total = sum(counts.values())
+        hottest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[: self.top]
+        lines = [f"Slow request {request} took {duration:.3f}s; {total} samples, hottest stacks:"]
+        for stack, count in hottest:
+            lines.append(f"  {count * 100 / total:5.1f}%  {' <- '.join(reversed(stack[-4:]))}")
+        path = self._write(request, counts)
+        if path is not None:
+            lines.append(f"  full profile: {path}")
+        logger.warning("\n".join(lines))
+
+    def _write(self, request: str, counts: Dict[Stack, int]) -> Optional[str]:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.dumps:04d}-" + "".join(
+            c if c.isalnum() else "_" for c in request
+        )[:80]
+        path = os.path.join(self.directory, name + ".folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w") as f:
+                for stack, count in counts.items():
+                    f.write(f"{';'.join(stack)} {count}\n")
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {e}")
+            return None
+        self.dumps += 1
+        return path
+
+
+def _stack(frame) -> Stack:
+    # Outermost frame first, as the folded format expects
+    frames: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+profiler = StackSampler()
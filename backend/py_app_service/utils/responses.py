@@ -0,0 +1,26 @@
+from typing import Any
+
+from fastapi.responses import Response
+
+# orjson is optional: pydantic-core's encoder (always installed with pydantic v2)
+# is the fallback and is nearly as fast for plain dicts and lists
+try:
+    import orjson
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content)
+except ImportError:  # pragma: no cover - depends on the environment
+    from pydantic_core import to_json
+
+    def dumps(content: Any) -> bytes:
+        return to_json(content)
+
+
+class EncodedJSONResponse(Response):
+    """
+    A body that is already encoded JSON (bytes or str), sent as is. Returning it
+    from a route skips FastAPI's ``response_model`` validation and encoding, so
+    the route's ``response_model`` only documents it.
+    """
+
+    media_type = "application/json"
@@ -0,0 +1,54 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from py_app_service.utils.responses import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def ndjson_response(
+    pages: AsyncIterator[List[Dict[str, Any]]],
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> StreamingResponse:
+    """
+    Stream paged records as newline-delimited JSON, one record per line.
+
+    The first page is awaited before the response starts so upstream errors can
+    still be turned into a proper status code by the caller. Later failures can
+    only end the stream early.
+    """
+    first = await pages.__anext__()
+
+    def encode_item(item: Dict[str, Any]) -> bytes:
+        value = transform(item) if transform else item
+        # transform may return the record already encoded
+        return value if isinstance(value, bytes) else dumps(value)
+
+    def encode(items: List[Dict[str, Any]]) -> bytes:
+        return b"".join(encode_item(item) + b"\n" for item in items)
+
+    async def body():
+        try:
+            yield encode(first)
+            async for items in pages:
+                yield encode(items)
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator is still reading the request body,
+    e.g. results streamed back while NDJSON items stream in. StreamingResponse
+    listens for the client disconnecting by calling ``receive`` alongside the
+    body, which would swallow the request's remaining chunks, so this one leaves
+    ``receive`` to the iterator: a disconnect shows up there (or as a failed send).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
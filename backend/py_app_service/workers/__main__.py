@@ -0,0 +1,58 @@
+"""
+The training worker as its own process, without the API:
+
+    python -m py_app_service.workers
+
+Run any number of them (with TRAINING_RUNNER = "worker" so the API processes
+don't train too). They split the pending selected_projects between them
+through the claims in TRAINING_CLAIM_BACKEND: "file" for processes on one
+host, "redis" across hosts. With TRAINING_QUEUE_BACKEND = "rabbitmq" they also
+share one durable job queue. The API reaches them over the training bus
+(services/training_bus.py) on Redis.
+"""
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from py_app_service.database.mongo import close_mongo
+from py_app_service.database.pocketbase import init_pocketbase, close_pocketbase
+from py_app_service.database.rabbit import close_rabbit
+from py_app_service.database.redis import close_redis
+from py_app_service.services.training import training_scheduler
+from py_app_service.services.training_bus import training_bus
+from py_app_service.workers.training import start_training, stop_training
+
+logger = logging.getLogger(__name__)
+
+
+async def run(stop: Optional[asyncio.Event] = None):
+    """Train until ``stop`` is set, or until SIGINT/SIGTERM."""
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_pocketbase()
+    await start_training()
+    await training_bus.serve(training_scheduler)
+    logger.info("Training worker started")
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Training worker stopping")
+        await training_bus.stop()
+        await stop_training()
+        await close_pocketbase()
+        close_mongo()
+        await close_redis()
+        await close_rabbit()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
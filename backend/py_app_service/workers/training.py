@@ -0,0 +1,62 @@
+import asyncio
+import fcntl
+import os
+from typing import Optional
+
+from py_app_service.config import INFERENCE_WARM_UP, TRAINING_CLAIM_BACKEND, TRAINING_CLAIM_DIR
+from py_app_service.services.inference import start_inference_executor, shutdown_inference_executor, warm_up_model
+from py_app_service.services.training import training_scheduler, training_pipeline, inference_batcher
+
+_warm_up: Optional[asyncio.Task] = None
+# Held while this process trains on "memory" claims
+_memory_claims_lock: Optional[int] = None
+
+
+def _lock_memory_claims() -> int:
+    """
+    Hold a lock that keeps a second process on "memory" claims from training:
+    it couldn't see this one's claims, so both would train every record.
+    """
+    os.makedirs(TRAINING_CLAIM_DIR, exist_ok=True)
+    fd = os.open(os.path.join(TRAINING_CLAIM_DIR, "memory-claims.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        raise RuntimeError(
+            'Another process is training on TRAINING_CLAIM_BACKEND = "memory"; '
+            'use "file" or "redis" claims to train in more than one'
+        )
+    return fd
+
+
+async def start_training():
+    """
+    Start training in this process: the inference executor, the pipeline's stage
+    workers, and the job queue with its scheduler scanning for pending projects.
+    Used by the API lifespan when TRAINING_RUNNER is "embedded", and by
+    ``python -m py_app_service.workers``. Refuses to start on "memory" claims
+    while another process trains on them.
+    """
+    global _warm_up, _memory_claims_lock
+    if TRAINING_CLAIM_BACKEND == "memory":
+        _memory_claims_lock = _lock_memory_claims()
+    start_inference_executor()
+    # The model loads lazily; warming it up in the background keeps startup fast
+    _warm_up = asyncio.create_task(warm_up_model()) if INFERENCE_WARM_UP else None
+    training_pipeline.start()
+    await training_scheduler.start()
+
+
+async def stop_training():
+    global _warm_up, _memory_claims_lock
+    if _warm_up is not None:
+        _warm_up.cancel()
+        _warm_up = None
+    await training_scheduler.stop()
+    await training_pipeline.stop()
+    await inference_batcher.close()
+    shutdown_inference_executor()
+    if _memory_claims_lock is not None:
+        os.close(_memory_claims_lock)
+        _memory_claims_lock = None